@@ -0,0 +1,259 @@
+import os
+
+
+def _env_int(nombre: str, defecto: int) -> int:
+    valor = os.getenv(nombre)
+    if valor is None or not valor.strip():
+        return defecto
+    return int(valor)
+
+
+def _env_float(nombre: str, defecto: float) -> float:
+    valor = os.getenv(nombre)
+    if valor is None or not valor.strip():
+        return defecto
+    return float(valor)
+
+
+def _env_bool(nombre: str, defecto: bool) -> bool:
+    valor = os.getenv(nombre)
+    if valor is None or not valor.strip():
+        return defecto
+    return valor.strip().lower() in ("1", "true", "yes", "si", "on")
+
+
+# ==============================
+# Pool de navegadores
+# ==============================
+# Cantidad máxima de drivers vivos por tipo de navegador
+POOL_SIZE_CHROME = _env_int("POOL_SIZE_CHROME", 2)
+POOL_SIZE_EDGE = _env_int("POOL_SIZE_EDGE", 2)
+# Un driver se recicla (quit + relanzar) después de N usos
+POOL_MAX_USES = _env_int("POOL_MAX_USES", 50)
+# Segundos máximos esperando un driver libre antes de rendirse
+POOL_ACQUIRE_TIMEOUT = _env_float("POOL_ACQUIRE_TIMEOUT", 30.0)
+# Lanzar los drivers al arrancar la API en lugar de en la primera petición
+POOL_WARMUP = _env_bool("POOL_WARMUP", True)
+
+# ==============================
+# Navegadores
+# ==============================
+# Motor de cada tipo de scraper ('chrome' | 'edge'). BROWSER_ENGINE fija los dos a la
+# vez: con un solo motor queda un único pool (y un solo binario) en memoria
+BROWSER_ENGINE = os.getenv("BROWSER_ENGINE", "")
+BROWSER_PUBLICACION = os.getenv("BROWSER_PUBLICACION", BROWSER_ENGINE or "chrome")
+BROWSER_PROFILE = os.getenv("BROWSER_PROFILE", BROWSER_ENGINE or "edge")
+# Perfil de opciones de lanzamiento: 'ligero' | 'completo' (ventana 1920x1080, sin recortes)
+BROWSER_OPTIONS = os.getenv("BROWSER_OPTIONS", "ligero")
+# Máximo de procesos renderer por navegador en el perfil 'ligero'
+BROWSER_RENDERER_LIMIT = _env_int("BROWSER_RENDERER_LIMIT", 2)
+# Caché de disco que heredan los drivers que reemplazan a uno reciclado ('' = sin caché fija)
+BROWSER_CACHE_DIR = os.getenv("BROWSER_CACHE_DIR", "data/browser_cache")
+BROWSER_CACHE_MB = _env_int("BROWSER_CACHE_MB", 64)
+# Pestañas (ventanas) por navegador del pool: >1 carga varias URLs a la vez en el
+# mismo proceso. El pool presta POOL_SIZE_* x BROWSER_TABS pestañas
+BROWSER_TABS = _env_int("BROWSER_TABS", 1)
+# Tope de espera de la carga de una pestaña (con varias pestañas get() no bloquea)
+BROWSER_TABS_LOAD_TIMEOUT = _env_float("BROWSER_TABS_LOAD_TIMEOUT", 30)
+
+# ==============================
+# Perfiles de salida (proxy + identidad)
+# ==============================
+# JSON con la lista de perfiles que se reparten entre los navegadores:
+# [{"name": "res-1", "proxy": "http://10.0.0.5:3128", "user_agent": "...",
+#   "viewport": [1366, 768], "cookies": "data/cookies/res-1.json"}]
+# Vacío = un único perfil de conexión directa
+EGRESS_PROFILES_PATH = os.getenv("EGRESS_PROFILES_PATH", "")
+# Peso de cada resultado en la puntuación de salud (media móvil exponencial, 0-1)
+EGRESS_SCORE_ALPHA = _env_float("EGRESS_SCORE_ALPHA", 0.2)
+# Un perfil con puntuación por debajo de esto (y al menos EGRESS_MIN_SAMPLES
+# resultados) se expulsa: sus navegadores se reciclan y no recibe nuevos
+EGRESS_MIN_SCORE = _env_float("EGRESS_MIN_SCORE", 0.4)
+EGRESS_MIN_SAMPLES = _env_int("EGRESS_MIN_SAMPLES", 5)
+# Segundos que dura una expulsión; después el perfil vuelve a prueba
+EGRESS_EVICTION_SECONDS = _env_float("EGRESS_EVICTION_SECONDS", 900)
+
+# ==============================
+# Sesiones
+# ==============================
+# Guardar cookies y localStorage de cada plataforma (por perfil de salida) y
+# restaurarlos en los navegadores del pool antes de navegar, para saltar los
+# avisos de consentimiento y muros de login de las sesiones anónimas
+SESSION_ENABLED = _env_bool("SESSION_ENABLED", True)
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "data/sesiones.sqlite3")
+# Segundos mínimos entre dos guardados de la sesión de una plataforma
+SESSION_SAVE_INTERVAL = _env_float("SESSION_SAVE_INTERVAL", 600)
+# Antigüedad máxima de una sesión guardada, aunque sus cookies duren más
+SESSION_MAX_AGE = _env_float("SESSION_MAX_AGE", 7 * 86400)
+# Si la sesión caduca en menos de esto, se vuelve a guardar en el siguiente scrape correcto
+SESSION_REFRESH_MARGIN = _env_float("SESSION_REFRESH_MARGIN", 3600)
+
+# ==============================
+# Ejecución de scrapes
+# ==============================
+# Scrapes simultáneos permitidos por plataforma
+SCRAPE_CONCURRENCY_FACEBOOK = _env_int("SCRAPE_CONCURRENCY_FACEBOOK", 2)
+SCRAPE_CONCURRENCY_INSTAGRAM = _env_int("SCRAPE_CONCURRENCY_INSTAGRAM", 2)
+SCRAPE_CONCURRENCY_TIKTOK = _env_int("SCRAPE_CONCURRENCY_TIKTOK", 2)
+# Peticiones que pueden esperar turno por plataforma; por encima se responde 429
+SCRAPE_QUEUE_MAX = _env_int("SCRAPE_QUEUE_MAX", 10)
+# Segundos máximos esperando turno en la cola; por encima se responde 503
+SCRAPE_QUEUE_TIMEOUT = _env_float("SCRAPE_QUEUE_TIMEOUT", 60.0)
+
+# ==============================
+# Ritmo y control adaptativo
+# ==============================
+# Scrapes por minuto permitidos en cada plataforma (token bucket; 0 = sin límite)
+RATE_PER_MINUTE_FACEBOOK = _env_float("RATE_PER_MINUTE_FACEBOOK", 30)
+RATE_PER_MINUTE_INSTAGRAM = _env_float("RATE_PER_MINUTE_INSTAGRAM", 30)
+RATE_PER_MINUTE_TIKTOK = _env_float("RATE_PER_MINUTE_TIKTOK", 60)
+# Scrapes que pueden salir seguidos antes de que se note el límite
+RATE_BURST = _env_int("RATE_BURST", 3)
+# AIMD: baja la concurrencia cuando crecen los errores o los resultados en cero
+# (muros de login) y la vuelve a subir, hasta SCRAPE_CONCURRENCY_*, cuando se recuperan
+AIMD_ENABLED = _env_bool("AIMD_ENABLED", True)
+# Resultados recientes que se miran para decidir
+AIMD_WINDOW = _env_int("AIMD_WINDOW", 20)
+# Proporción de resultados malos por encima de la cual se reduce la concurrencia
+AIMD_BAD_RATE = _env_float("AIMD_BAD_RATE", 0.3)
+# Proporción por debajo de la cual (con la ventana llena) se suma un hueco
+AIMD_GOOD_RATE = _env_float("AIMD_GOOD_RATE", 0.1)
+# Factor de reducción multiplicativa
+AIMD_DECREASE = _env_float("AIMD_DECREASE", 0.5)
+AIMD_MIN_CONCURRENCY = _env_int("AIMD_MIN_CONCURRENCY", 1)
+
+# ==============================
+# Espera de contenido tras driver.get
+# ==============================
+# Tope (segundos) esperando a que aparezcan los contadores de cada plataforma
+READY_TIMEOUT_FACEBOOK = _env_float("READY_TIMEOUT_FACEBOOK", 10.0)
+READY_TIMEOUT_INSTAGRAM = _env_float("READY_TIMEOUT_INSTAGRAM", 10.0)
+READY_TIMEOUT_TIKTOK = _env_float("READY_TIMEOUT_TIKTOK", 10.0)
+# Cada cuánto se vuelve a comprobar el DOM mientras se espera
+READY_POLL_INTERVAL = _env_float("READY_POLL_INTERVAL", 0.25)
+
+# ==============================
+# Caché de resultados
+# ==============================
+# 'memory' (por proceso) o 'sqlite' (sobrevive a reinicios)
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_PATH = os.getenv("CACHE_PATH", "data/cache.sqlite3")
+# Entradas máximas antes de expulsar la menos usada recientemente
+CACHE_MAX_ITEMS = _env_int("CACHE_MAX_ITEMS", 1000)
+# Vigencia (segundos) de cada tipo de resultado; 0 desactiva la caché
+CACHE_TTL_PROFILE = _env_float("CACHE_TTL_PROFILE", 3600.0)
+CACHE_TTL_POST = _env_float("CACHE_TTL_POST", 600.0)
+
+# ==============================
+# Historial de métricas
+# ==============================
+# Guardar cada resultado correcto como punto de una serie temporal (SQLite)
+HISTORY_ENABLED = _env_bool("HISTORY_ENABLED", True)
+HISTORY_PATH = os.getenv("HISTORY_PATH", "data/historial.sqlite3")
+# Niveles de frescura "nombre:segundos": con ?tier=<nombre> se devuelve el último
+# dato guardado si es más reciente que eso, y solo se scrapea si no lo es
+HISTORY_TIERS = os.getenv("HISTORY_TIERS", "realtime:0,hot:300,warm:3600,cold:86400")
+# Los puntos más antiguos que esto (segundos) se borran; 0 = guardarlos siempre
+HISTORY_MAX_AGE = _env_float("HISTORY_MAX_AGE", 90 * 86400)
+# Cada cuántos segundos, como mucho, se borran los puntos caducados al añadir uno nuevo
+HISTORY_PRUNE_INTERVAL = _env_float("HISTORY_PRUNE_INTERVAL", 3600)
+
+# ==============================
+# Lotes
+# ==============================
+# URLs máximas aceptadas en una sola petición /batch
+BATCH_MAX_URLS = _env_int("BATCH_MAX_URLS", 500)
+# Segundos entre frames de progreso en las respuestas en streaming
+STREAM_PROGRESS_INTERVAL = _env_float("STREAM_PROGRESS_INTERVAL", 5.0)
+
+# ==============================
+# Trabajos asíncronos
+# ==============================
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", "data/jobs.sqlite3")
+# Trabajadores que vacían la cola de trabajos
+JOBS_WORKERS = _env_int("JOBS_WORKERS", 3)
+# De ellos, cuántos atienden solo el carril 'interactive' (nunca quedan bloqueados por lotes)
+JOBS_INTERACTIVE_WORKERS = _env_int("JOBS_INTERACTIVE_WORKERS", 1)
+
+# ==============================
+# Refresco programado
+# ==============================
+# Refrescar en segundo plano las URLs de la lista de seguimiento
+SCHEDULER_ENABLED = _env_bool("SCHEDULER_ENABLED", True)
+SCHEDULER_DB_PATH = os.getenv("SCHEDULER_DB_PATH", "data/seguimiento.sqlite3")
+# Refrescos simultáneos como máximo (comparten los límites de cada plataforma con la API)
+SCHEDULER_CONCURRENCY = _env_int("SCHEDULER_CONCURRENCY", 1)
+# Intervalo por defecto y mínimo entre refrescos de una URL (segundos)
+SCHEDULER_DEFAULT_INTERVAL = _env_float("SCHEDULER_DEFAULT_INTERVAL", 3600)
+SCHEDULER_MIN_INTERVAL = _env_float("SCHEDULER_MIN_INTERVAL", 60)
+# Variación aleatoria de cada intervalo (0.1 = ±10%) para no sincronizar las URLs
+SCHEDULER_JITTER = _env_float("SCHEDULER_JITTER", 0.1)
+# Espera antes de reintentar una URL que falló o no tuvo hueco
+SCHEDULER_RETRY = _env_float("SCHEDULER_RETRY", 300)
+
+# ==============================
+# Página ligera
+# ==============================
+# Bloquear imágenes, vídeo, fuentes y rastreadores durante el scraping
+LEAN_PAGE = _env_bool("LEAN_PAGE", True)
+# Patrones de bloqueo que NO se aplican en cada plataforma (separados por comas),
+# para recursos de los que dependa algún contador. Ej: "*.woff2,*.woff2?*"
+LEAN_PAGE_ALLOW_FACEBOOK = os.getenv("LEAN_PAGE_ALLOW_FACEBOOK", "")
+LEAN_PAGE_ALLOW_INSTAGRAM = os.getenv("LEAN_PAGE_ALLOW_INSTAGRAM", "")
+LEAN_PAGE_ALLOW_TIKTOK = os.getenv("LEAN_PAGE_ALLOW_TIKTOK", "")
+
+# ==============================
+# Capturas de diagnóstico
+# ==============================
+# 'off', 'failure' (errores y métricas en cero), 'sample' (failure + muestreo) o 'always'
+SCREENSHOT_MODE = os.getenv("SCREENSHOT_MODE", "failure")
+# Fracción de scrapes correctos que se capturan en modo 'sample'
+SCREENSHOT_SAMPLE_RATE = _env_float("SCREENSHOT_SAMPLE_RATE", 0.01)
+SCREENSHOT_DIR = os.getenv("SCREENSHOT_DIR", "data/screenshots")
+# Capturas que se conservan; al superarlo se borran las más antiguas
+SCREENSHOT_MAX_FILES = _env_int("SCREENSHOT_MAX_FILES", 50)
+
+# ==============================
+# Logging
+# ==============================
+# Nivel general; DEBUG activa las líneas por elemento de los scrapers
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Nivel por plataforma (por defecto, el general)
+LOG_LEVEL_FACEBOOK = os.getenv("LOG_LEVEL_FACEBOOK", LOG_LEVEL)
+LOG_LEVEL_INSTAGRAM = os.getenv("LOG_LEVEL_INSTAGRAM", LOG_LEVEL)
+LOG_LEVEL_TIKTOK = os.getenv("LOG_LEVEL_TIKTOK", LOG_LEVEL)
+
+# ==============================
+# TikTok por HTTP
+# ==============================
+# Leer los contadores del JSON embebido en el HTML antes de abrir un navegador
+TIKTOK_HTTP = _env_bool("TIKTOK_HTTP", True)
+TIKTOK_HTTP_TIMEOUT = _env_float("TIKTOK_HTTP_TIMEOUT", 10)
+# Conexiones keep-alive que conserva la sesión HTTP compartida
+TIKTOK_HTTP_POOL = _env_int("TIKTOK_HTTP_POOL", 10)
+
+# ==============================
+# Motor de extracción
+# ==============================
+# 'js': las consultas se evalúan dentro del navegador (execute_script)
+# 'html': se descarga page_source una vez y se analiza con lxml fuera del navegador
+EXTRACTION_ENGINE = os.getenv("EXTRACTION_ENGINE", "js")
+# Procesos para analizar el HTML en paralelo con el motor 'html' (0 = en el mismo hilo)
+EXTRACTION_PROCESSES = _env_int("EXTRACTION_PROCESSES", 0)
+
+# ==============================
+# Reaper de navegadores
+# ==============================
+# Cada cuántos segundos se buscan navegadores huérfanos
+REAPER_INTERVAL = _env_float("REAPER_INTERVAL", 30)
+# Un navegador prestado que pasa más tiempo que esto con la misma URL se da por perdido y se mata
+REAPER_MAX_LEASE = _env_float("REAPER_MAX_LEASE", 300)
+# Margen tras quit() antes de matar procesos que sigan vivos
+REAPER_GRACE = _env_float("REAPER_GRACE", 10)
+
+# ==============================
+# Normalización de URLs
+# ==============================
+# Seguir por HTTP los enlaces cortos (vm.tiktok.com, fb.watch...) antes de scrapear
+URL_RESOLVE_SHORT = _env_bool("URL_RESOLVE_SHORT", True)
+URL_RESOLVE_TIMEOUT = _env_float("URL_RESOLVE_TIMEOUT", 5)
@@ -1,8 +1,45 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from app import config
 from app.routers.metricas import router as metricas_router
+from app.services.browser_pool import precalentar_pools, cerrar_pools
+from app.services.executor import cerrar_executor
+from app.services.extraccion import cerrar_procesos
+from app.services.jobs import iniciar_trabajadores, detener_trabajadores
+from app.services.logs import configurar_logging
+from app.services.procesos import REAPER
+from app.services.programador import obtener_programador
+from app.services.telemetria import exportar_metricas
+
+# Logs JSON por una cola, para que los hilos de scraping no esperen a stdout
+configurar_logging()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    REAPER.iniciar()
+    # Lanzar los navegadores antes de recibir tráfico
+    if config.POOL_WARMUP:
+        await asyncio.to_thread(precalentar_pools)
+    await iniciar_trabajadores()
+    if config.SCHEDULER_ENABLED:
+        obtener_programador().iniciar()
+    yield
+    await obtener_programador().detener()
+    await detener_trabajadores()
+    cerrar_executor()
+    cerrar_procesos()
+    await asyncio.to_thread(cerrar_pools)
+    # Lo que siga vivo (navegadores prestados o huérfanos) no sobrevive a la API
+    REAPER.detener()
+    await asyncio.to_thread(REAPER.matar_todo)
 
-app = FastAPI(title="API Métricas de Influencers")
+
+app = FastAPI(title="API Métricas de Influencers", lifespan=lifespan)
 
 origins = [
     "*"
@@ -22,3 +59,9 @@ app.add_middleware(
 )
 
 app.include_router(metricas_router, prefix="/metricas")
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Latencias por etapa del scraping en formato de texto de Prometheus"""
+    return PlainTextResponse(exportar_metricas(), media_type="text/plain; version=0.0.4")
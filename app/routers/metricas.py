@@ -1,48 +1,258 @@
-from fastapi import APIRouter, HTTPException
-from app.services.detectors import detectar_plataforma, Plataforma
-from app.services.profiles.scraper_profile_facebook import ProfileFacebookScraper
-from app.services.profiles.scraper_profile_instagram import ProfileInstagramScraper
-from app.services.profiles.scraper_profile_tiktok import ProfileTikTokScraper
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from app.services.browser_pool import PoolAgotadoError, estadisticas_pools
+from app.services.executor import (
+    ejecutar,
+    estadisticas_executor,
+    ColaLlenaError,
+    EsperaAgotadaError,
+)
+from app.services.espera import ESTADISTICAS_ESPERA
+from app.services.cache import CACHE_RESULTADOS
+from app import config
+from app.services.scrapers import scrapear_profile, scrapear_publicacion
+from app.services.batch import scrapear_lote, urls_unicas
+from app.services.streaming import con_progreso, como_ndjson, como_sse
+from app.services.jobs import crear_trabajo, obtener_cola
+from app.services.procesos import REAPER
+from app.services.egreso import obtener_egreso
+from app.services.sesiones import obtener_sesiones
+from app.services.urls import preparar_url, UrlInvalidaError
+from app.services.historial import frescura_de, obtener_historial
+from app.services.programador import obtener_programador
 
-from app.services.publicaciones.scraper_facebook import FacebookScraper
-from app.services.publicaciones.scraper_instagram import InstagramScraper
-from app.services.publicaciones.scraper_tiktok1 import TikTokScraper
+from typing import Literal
+import asyncio
 
 from pydantic import BaseModel
 
 class ProfileRequest(BaseModel):
     url: str
+    # Nivel de HISTORY_TIERS: si el historial tiene un dato así de reciente no se scrapea
+    tier: str | None = None
+
+class BatchRequest(BaseModel):
+    urls: list[str]
+
+class WatchRequest(BaseModel):
+    url: str
+    tipo: Literal['profile', 'publicacion']
+    # Segundos entre refrescos (por defecto SCHEDULER_DEFAULT_INTERVAL)
+    interval_s: float | None = None
+
+class JobRequest(BaseModel):
+    tipo: Literal['profile', 'publicacion']
+    urls: list[str]
+    # Por defecto los perfiles van al carril interactivo y las publicaciones al masivo
+    lane: Literal['interactive', 'bulk'] | None = None
 
 router = APIRouter()
 
 
-@router.post("/profile")
-async def get_metricas_profile(request: ProfileRequest):
-    plataforma = detectar_plataforma(request.url)
+async def _scrapear(tipo: str, funcion, url: str, ttl: float, nivel: str = None) -> dict:
+    # Validación y forma canónica antes de ocupar un hueco de concurrencia o un navegador
+    try:
+        destino = await preparar_url(url, tipo)
+        frescura = frescura_de(nivel) if nivel else None
+    except (UrlInvalidaError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    if plataforma == Plataforma.FACEBOOK:
-        service = ProfileFacebookScraper()
-    elif plataforma == Plataforma.INSTAGRAM:
-        service = ProfileInstagramScraper()
-    elif plataforma == Plataforma.TIKTOK:
-        service = ProfileTikTokScraper()
-    else:
-        raise HTTPException(status_code=400, detail="Plataforma no soportada")
+    plataforma = destino.plataforma
+    clave = f"{tipo}:{destino.clave}"
 
-    return service.get_profile(request.url)
+    if frescura is not None:
+        # Refresco incremental: manda la frescura del nivel, no el TTL de la caché
+        if frescura > 0 and config.HISTORY_ENABLED:
+            guardado = await asyncio.to_thread(obtener_historial().ultimo, clave, frescura)
+            if guardado is not None:
+                return guardado
+        ttl = 0
+    elif config.HISTORY_ENABLED:
+        # URL en seguimiento: el programador la mantiene fresca en el historial
+        intervalo = obtener_programador().lista.intervalo(clave)
+        if intervalo is not None:
+            guardado = await asyncio.to_thread(obtener_historial().ultimo, clave, 2 * intervalo)
+            if guardado is not None:
+                return guardado
+
+    try:
+        return await CACHE_RESULTADOS.obtener_o_calcular(
+            clave, ttl, lambda: ejecutar(plataforma, funcion, plataforma, destino.url)
+        )
+    except ColaLlenaError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    except (EsperaAgotadaError, PoolAgotadoError) as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+
+
+@router.post("/profile")
+async def get_metricas_profile(request: ProfileRequest):
+    return await _scrapear('profile', scrapear_profile, request.url, config.CACHE_TTL_PROFILE, request.tier)
 
 
 @router.post("/publicacion")
 async def get_metricas_publicacion(request: ProfileRequest):
-    plataforma = detectar_plataforma(request.url)
-
-    if plataforma == Plataforma.FACEBOOK:
-        service = FacebookScraper()
-    elif plataforma == Plataforma.INSTAGRAM:
-        service = InstagramScraper()
-    elif plataforma == Plataforma.TIKTOK:
-        service = TikTokScraper()
-    else:
-        raise HTTPException(status_code=400, detail="Plataforma no soportada")
-
-    return service.get_metrics(request.url)
+    return await _scrapear('publicacion', scrapear_publicacion, request.url, config.CACHE_TTL_POST, request.tier)
+
+
+def _respuesta_lote(tipo: str, urls: list, formato: str) -> StreamingResponse:
+    if not urls:
+        raise HTTPException(status_code=400, detail="La lista de URLs está vacía")
+    if len(urls) > config.BATCH_MAX_URLS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Máximo {config.BATCH_MAX_URLS} URLs por lote",
+        )
+
+    urls = urls_unicas(tipo, urls)
+    frames = con_progreso(scrapear_lote(tipo, urls), total=len(urls))
+
+    if formato == 'sse':
+        return StreamingResponse(
+            como_sse(frames),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+    return StreamingResponse(como_ndjson(frames), media_type="application/x-ndjson")
+
+
+def _formato(formato: str, accept: str) -> str:
+    if formato:
+        return formato
+    return 'sse' if 'text/event-stream' in (accept or '') else 'ndjson'
+
+
+@router.post("/profile/batch")
+async def get_metricas_profile_batch(
+    request: BatchRequest,
+    formato: Literal['ndjson', 'sse'] | None = None,
+    accept: str = Header(default=None),
+):
+    return _respuesta_lote('profile', request.urls, _formato(formato, accept))
+
+
+@router.post("/publicacion/batch")
+async def get_metricas_publicacion_batch(
+    request: BatchRequest,
+    formato: Literal['ndjson', 'sse'] | None = None,
+    accept: str = Header(default=None),
+):
+    return _respuesta_lote('publicacion', request.urls, _formato(formato, accept))
+
+
+@router.post("/jobs", status_code=202)
+async def crear_job(request: JobRequest):
+    if not request.urls:
+        raise HTTPException(status_code=400, detail="La lista de URLs está vacía")
+    if len(request.urls) > config.BATCH_MAX_URLS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Máximo {config.BATCH_MAX_URLS} URLs por trabajo",
+        )
+
+    lane = request.lane or ('interactive' if request.tipo == 'profile' else 'bulk')
+    id_trabajo = await crear_trabajo(request.tipo, request.urls, lane)
+
+    return {'id': id_trabajo, 'status': 'queued', 'lane': lane}
+
+
+@router.get("/jobs/{id_trabajo}")
+async def get_job(id_trabajo: str):
+    trabajo = await asyncio.to_thread(obtener_cola().obtener, id_trabajo)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail="Trabajo no encontrado")
+    return trabajo
+
+
+async def _clave_historial(tipo: str, url: str) -> str:
+    if not config.HISTORY_ENABLED:
+        raise HTTPException(status_code=404, detail="El historial está desactivado")
+    try:
+        destino = await preparar_url(url, tipo)
+    except UrlInvalidaError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return f"{tipo}:{destino.clave}"
+
+
+@router.get("/historial")
+async def get_historial(
+    url: str,
+    tipo: Literal['profile', 'publicacion'],
+    desde: float | None = Query(default=None, description="Epoch en segundos"),
+    hasta: float | None = Query(default=None, description="Epoch en segundos"),
+    limite: int = Query(default=1000, ge=1, le=10000),
+):
+    clave = await _clave_historial(tipo, url)
+    puntos = await asyncio.to_thread(obtener_historial().serie, clave, desde, hasta, limite)
+    return {'url': clave.split(':', 1)[1], 'tipo': tipo, 'points': puntos}
+
+
+@router.get("/historial/deltas")
+async def get_deltas(
+    url: str,
+    tipo: Literal['profile', 'publicacion'],
+    desde: float | None = Query(default=None, description="Epoch en segundos"),
+    hasta: float | None = Query(default=None, description="Epoch en segundos"),
+):
+    clave = await _clave_historial(tipo, url)
+    deltas = await asyncio.to_thread(obtener_historial().deltas, clave, desde, hasta)
+    return {'url': clave.split(':', 1)[1], 'tipo': tipo, 'metrics': deltas}
+
+
+@router.post("/watch")
+async def agregar_seguimiento(request: WatchRequest):
+    intervalo = request.interval_s or config.SCHEDULER_DEFAULT_INTERVAL
+    if intervalo < config.SCHEDULER_MIN_INTERVAL:
+        raise HTTPException(
+            status_code=400,
+            detail=f"El intervalo mínimo es {config.SCHEDULER_MIN_INTERVAL:.0f}s",
+        )
+    try:
+        destino = await preparar_url(request.url, request.tipo)
+    except UrlInvalidaError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    programador = obtener_programador()
+    entrada = await asyncio.to_thread(
+        programador.lista.agregar,
+        f"{request.tipo}:{destino.clave}",
+        request.tipo,
+        destino.plataforma.value,
+        destino.url,
+        intervalo,
+    )
+    programador.avisar()
+    return entrada
+
+
+@router.get("/watch")
+async def listar_seguimiento():
+    return await asyncio.to_thread(obtener_programador().lista.listar)
+
+
+@router.delete("/watch")
+async def quitar_seguimiento(url: str, tipo: Literal['profile', 'publicacion']):
+    try:
+        destino = await preparar_url(url, tipo)
+    except UrlInvalidaError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not await asyncio.to_thread(obtener_programador().lista.quitar, f"{tipo}:{destino.clave}"):
+        raise HTTPException(status_code=404, detail="La URL no está en seguimiento")
+    return {'url': destino.url, 'tipo': tipo, 'status': 'removed'}
+
+
+@router.get("/stats")
+async def get_stats():
+    return {
+        'pools': estadisticas_pools(),
+        'executor': estadisticas_executor(),
+        'waits': ESTADISTICAS_ESPERA.stats(),
+        'cache': await asyncio.to_thread(CACHE_RESULTADOS.stats),
+        'jobs': await asyncio.to_thread(obtener_cola().stats),
+        'processes': REAPER.stats(),
+        'egress': obtener_egreso().stats(),
+        'sessions': obtener_sesiones().stats() if config.SESSION_ENABLED else None,
+        'history': await asyncio.to_thread(obtener_historial().stats) if config.HISTORY_ENABLED else None,
+        'scheduler': await asyncio.to_thread(obtener_programador().stats),
+    }
@@ -0,0 +1,187 @@
+from collections import deque
+import asyncio
+import threading
+
+from app import config
+from app.services.cache import CACHE_RESULTADOS
+from app.services.executor import (
+    en_hilo,
+    esperar_tasa,
+    obtener_limite,
+    registrar_resultado,
+    ColaLlenaError,
+    EsperaAgotadaError,
+)
+from app.services.scrapers import SCRAPERS_PROFILE, SCRAPERS_PUBLICACION, extraer
+from app.services.urls import normalizar_url, preparar_url, UrlInvalidaError
+
+TIPOS = {
+    'profile': SCRAPERS_PROFILE,
+    'publicacion': SCRAPERS_PUBLICACION,
+}
+
+
+def ttl_de(tipo: str) -> float:
+    return config.CACHE_TTL_PROFILE if tipo == 'profile' else config.CACHE_TTL_POST
+
+
+def _resultado_error(url: str, mensaje: str) -> dict:
+    return {
+        'url': url,
+        'status': 'error',
+        'error_message': mensaje,
+    }
+
+
+def _abrir(clase):
+    return clase()
+
+
+def _cerrar(service):
+    try:
+        service.close()
+    except Exception:
+        pass
+
+
+def urls_unicas(tipo: str, urls: list) -> list:
+    """
+    Quita las URLs repetidas (misma clave de caché), conservando el orden.
+    Las inválidas se dejan pasar para que scrapear_lote informe del error.
+    """
+    vistas = set()
+    unicas = []
+    for url in urls:
+        try:
+            clave = f"{tipo}:{normalizar_url(url).clave}"
+        except UrlInvalidaError:
+            clave = f"{tipo}:{url}"
+        if clave not in vistas:
+            vistas.add(clave)
+            unicas.append(url)
+    return unicas
+
+
+async def _trabajador(tipo, plataforma, pendientes: deque, salida: asyncio.Queue, detener):
+    """
+    Toma un hueco de concurrencia de la plataforma, abre un scraper (un driver
+    del pool) y lo reutiliza para todas las URLs que alcance a sacar de la cola.
+    """
+    clases = TIPOS[tipo]
+    ttl = ttl_de(tipo)
+
+    limite = obtener_limite(plataforma)
+    try:
+        while pendientes and not detener.is_set():
+            async with limite:
+                service = None
+                try:
+                    # Si el controlador AIMD bajó el límite, se cede el hueco y se vuelve a la cola
+                    while pendientes and not detener.is_set() and not limite.sobrepasado():
+                        url, clave = pendientes.popleft()
+
+                        try:
+                            await esperar_tasa(plataforma)
+                        except EsperaAgotadaError:
+                            pendientes.appendleft((url, clave))
+                            raise
+
+                        try:
+                            if service is None:
+                                service = await en_hilo(_abrir, clases[plataforma])
+
+                            result = await en_hilo(extraer, service, plataforma, url)
+                        except Exception as e:
+                            result = _resultado_error(url, str(e))
+                        registrar_resultado(plataforma, result)
+
+                        if result.get('status') == 'success':
+                            if ttl > 0:
+                                await CACHE_RESULTADOS.escribir(clave, result, ttl)
+                        elif service is not None:
+                            # Puede que el navegador se haya caído: el pool lo revisa al devolverlo
+                            await en_hilo(_cerrar, service)
+                            service = None
+
+                        await salida.put(result)
+                finally:
+                    if service is not None:
+                        await en_hilo(_cerrar, service)
+    except (ColaLlenaError, EsperaAgotadaError):
+        # Otro trabajador de la plataforma puede seguir vaciando la cola
+        return
+
+
+async def scrapear_lote(tipo: str, urls: list):
+    """
+    Scrapea muchas URLs en paralelo y va entregando cada resultado en cuanto
+    termina (generador asíncrono). Las URLs se agrupan por plataforma y cada
+    plataforma usa como máximo su límite de concurrencia en trabajadores.
+
+    Args:
+        tipo (str): 'profile' o 'publicacion'.
+        urls (list): URLs a scrapear; los duplicados se scrapean una sola vez.
+
+    Yields:
+        dict: Resultado de cada URL con el formato de `status`/`error_message`.
+    """
+    ttl = ttl_de(tipo)
+    por_plataforma = {}
+
+    for url in urls_unicas(tipo, urls):
+        try:
+            destino = await preparar_url(url, tipo)
+        except UrlInvalidaError as e:
+            yield _resultado_error(url, str(e))
+            continue
+
+        clave = f"{tipo}:{destino.clave}"
+        plataforma = destino.plataforma
+        url = destino.url
+        cacheado = await CACHE_RESULTADOS.leer(clave) if ttl > 0 else None
+        if cacheado is not None:
+            yield cacheado
+            continue
+
+        por_plataforma.setdefault(plataforma, deque()).append((url, clave))
+
+    total = sum(len(p) for p in por_plataforma.values())
+    emitidos = 0
+
+    salida = asyncio.Queue()
+    detener = threading.Event()
+    tareas = {}
+
+    for plataforma, pendientes in por_plataforma.items():
+        n_trabajadores = min(obtener_limite(plataforma).limite, len(pendientes))
+        tareas[plataforma] = [
+            asyncio.create_task(_trabajador(tipo, plataforma, pendientes, salida, detener))
+            for _ in range(n_trabajadores)
+        ]
+
+    try:
+        while emitidos < total:
+            vivas = [t for ts in tareas.values() for t in ts if not t.done()]
+            if not vivas and salida.empty():
+                break
+
+            try:
+                result = await asyncio.wait_for(salida.get(), timeout=1.0)
+            except asyncio.TimeoutError:
+                continue
+
+            emitidos += 1
+            yield result
+
+        while not salida.empty():
+            emitidos += 1
+            yield salida.get_nowait()
+
+        # URLs que ningún trabajador pudo tomar (plataforma saturada)
+        for plataforma, pendientes in por_plataforma.items():
+            while pendientes:
+                url, _ = pendientes.popleft()
+                yield _resultado_error(url, f"Sin capacidad para scrapear {plataforma.value}, reintenta más tarde")
+    finally:
+        # Si el cliente se desconecta los trabajadores terminan la URL en curso y paran
+        detener.set()
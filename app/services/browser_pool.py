@@ -0,0 +1,411 @@
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options as ChromeOptions
+from selenium.webdriver.edge.service import Service as EdgeService
+from selenium.webdriver.edge.options import Options as EdgeOptions
+import functools
+import logging
+import os
+import queue
+import threading
+import time
+
+from app import config
+from app.services.egreso import obtener_egreso, cookies_cdp, perfil_vigente
+from app.services.pagina_ligera import ARGUMENTOS_NAVEGADOR
+from app.services.pestanas import GestorPestanas
+from app.services.procesos import REAPER
+
+logger = logging.getLogger(__name__)
+
+# User-agent de los perfiles de salida que no fijan uno propio
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
+)
+
+
+class PoolAgotadoError(Exception):
+    """No se liberó ningún driver dentro del tiempo de espera"""
+
+
+# Flags comunes a los dos motores (Chrome y Edge son Chromium y aceptan los mismos)
+ARGUMENTOS_BASE = [
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-notifications',
+    '--disable-infobars',
+]
+
+# Perfiles de opciones con nombre (BROWSER_OPTIONS)
+PERFILES = {
+    # Lo que usaban los scrapers de perfiles antes de unificar la fábrica
+    'completo': [
+        '--window-size=1920,1080',
+        '--disable-gpu',
+        '--disable-extensions',
+    ],
+    # Menos memoria por navegador: ventana pequeña (sigue por encima del corte
+    # de diseño móvil), sin GPU, sin extensiones ni tráfico en segundo plano
+    'ligero': [
+        '--window-size=1280,800',
+        '--disable-gpu',
+        '--disable-extensions',
+        '--disable-component-extensions-with-background-pages',
+        '--disable-background-networking',
+        '--disable-component-update',
+        '--disable-default-apps',
+        '--disable-sync',
+        '--no-first-run',
+        '--no-default-browser-check',
+        '--metrics-recording-only',
+    ],
+}
+
+_MOTORES = {
+    'chrome': (ChromeOptions, lambda opciones: webdriver.Chrome(options=opciones)),
+    # usa el msedgedriver del PATH
+    'edge': (EdgeOptions, lambda opciones: webdriver.Edge(service=EdgeService(), options=opciones)),
+}
+
+# Directorios de caché en uso por motor: un driver nuevo toma el primero libre,
+# así hereda la caché del que reemplaza sin compartirla con uno vivo
+_ranuras = {}
+_ranuras_lock = threading.Lock()
+
+
+def navegador_de(tipo: str) -> str:
+    """Motor configurado para un tipo de scraper ('profile' o 'publicacion')"""
+    return config.BROWSER_PROFILE if tipo == 'profile' else config.BROWSER_PUBLICACION
+
+
+def _tomar_ranura(navegador: str) -> int:
+    with _ranuras_lock:
+        ocupadas = _ranuras.setdefault(navegador, set())
+        ranura = 0
+        while ranura in ocupadas:
+            ranura += 1
+        ocupadas.add(ranura)
+        return ranura
+
+
+def _soltar_ranura(navegador: str, ranura: int):
+    with _ranuras_lock:
+        _ranuras.get(navegador, set()).discard(ranura)
+
+
+def opciones_navegador(
+    navegador: str, headless: bool = True, perfil: str = None, ranura: int = None, carga: str = 'normal',
+    egreso=None,
+):
+    """
+    Opciones de lanzamiento de `navegador` con el perfil `perfil` (por defecto
+    BROWSER_OPTIONS) y la identidad del perfil de salida `egreso`.
+    """
+    perfil = perfil or config.BROWSER_OPTIONS
+    if perfil not in PERFILES:
+        raise ValueError(f"Perfil de navegador desconocido: {perfil}")
+
+    opciones = _MOTORES[navegador][0]()
+    opciones.page_load_strategy = carga
+    if headless:
+        opciones.add_argument('--headless=new')
+
+    argumentos = ARGUMENTOS_BASE + PERFILES[perfil]
+    user_agent = USER_AGENT
+    if egreso is not None:
+        user_agent = egreso.user_agent or USER_AGENT
+        if egreso.ventana:
+            # La ventana del perfil de salida sustituye a la del perfil de opciones
+            argumentos = [a for a in argumentos if not a.startswith('--window-size=')]
+        argumentos = argumentos + egreso.argumentos()
+
+    for argumento in argumentos + [f'--user-agent={user_agent}']:
+        opciones.add_argument(argumento)
+
+    if perfil == 'ligero':
+        opciones.add_argument(f'--renderer-process-limit={config.BROWSER_RENDERER_LIMIT}')
+        if config.BROWSER_CACHE_DIR and ranura is not None:
+            directorio = os.path.abspath(os.path.join(config.BROWSER_CACHE_DIR, f'{navegador}-{ranura}'))
+            opciones.add_argument(f'--disk-cache-dir={directorio}')
+            opciones.add_argument(f'--disk-cache-size={config.BROWSER_CACHE_MB * 2**20}')
+
+    opciones.add_experimental_option("excludeSwitches", ["enable-automation"])
+    opciones.add_experimental_option('useAutomationExtension', False)
+
+    if config.LEAN_PAGE:
+        for argumento in ARGUMENTOS_NAVEGADOR:
+            opciones.add_argument(argumento)
+
+    return opciones
+
+
+def crear_driver(navegador: str, headless: bool = True, perfil: str = None, carga: str = 'normal'):
+    """
+    Única fábrica de WebDrivers: la usan los seis scrapers y los pools. Cada
+    navegador sale con un perfil de salida (proxy, user-agent, ventana y
+    cookies) elegido por obtener_egreso().
+
+    Args:
+        navegador (str): 'chrome' o 'edge' (ver navegador_de).
+        headless (bool): Sin ventana visible.
+        perfil (str): Perfil de PERFILES; por defecto BROWSER_OPTIONS.
+        carga (str): pageLoadStrategy; 'none' para que get() no espere la carga.
+    """
+    if navegador not in _MOTORES:
+        raise ValueError(f"Navegador no soportado: {navegador}")
+
+    egresos = obtener_egreso()
+    egreso = egresos.elegir()
+    ranura = _tomar_ranura(navegador)
+    try:
+        driver = _MOTORES[navegador][1](opciones_navegador(navegador, headless, perfil, ranura, carga, egreso))
+    except Exception:
+        _soltar_ranura(navegador, ranura)
+        raise
+
+    driver._ranura = (navegador, ranura)
+    driver._egreso = egreso
+    egresos.tomar(egreso)
+    REAPER.registrar(driver)
+
+    cookies = egreso.cookies_guardadas()
+    if cookies:
+        # Por CDP se pueden fijar antes de la primera navegación, sin visitar el dominio
+        try:
+            driver.execute_cdp_cmd('Network.setCookies', {'cookies': cookies_cdp(cookies)})
+        except Exception as e:
+            logger.warning("No se pudieron cargar las cookies del perfil %s: %s", egreso.nombre, e)
+    return driver
+
+
+def cerrar_driver(driver):
+    """quit() que nunca lanza; si deja procesos vivos, el reaper los termina"""
+    try:
+        driver.quit()
+    except Exception:
+        pass
+    finally:
+        REAPER.cerrado(driver)
+        ranura = getattr(driver, '_ranura', None)
+        if ranura is not None:
+            _soltar_ranura(*ranura)
+        # Solo el driver real tiene _egreso: una pestaña lo suelta al cerrarse su navegador
+        egreso = getattr(driver, '_egreso', None)
+        if egreso is not None:
+            obtener_egreso().soltar(egreso)
+
+
+class BrowserPool:
+    """
+    Pool de drivers headless ya lanzados que se prestan y se devuelven.
+
+    Un driver se recicla (quit) cuando supera `max_usos`, cuando deja de
+    responder al devolverlo o cuando su perfil de salida fue expulsado; el
+    reemplazo se lanza en el siguiente préstamo.
+    """
+
+    def __init__(self, nombre: str, fabrica, tamano: int, max_usos: int, timeout: float):
+        self.nombre = nombre
+        self._fabrica = fabrica
+        self.tamano = max(1, tamano)
+        self.max_usos = max(1, max_usos)
+        self.timeout = timeout
+        # GestorPestanas cuando los "drivers" del pool son pestañas de navegadores compartidos
+        self.pestanas = None
+
+        # LIFO: el driver devuelto más recientemente es el más "caliente"
+        self._libres = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._usos = {}
+        self._vivos = 0
+        self._en_uso = 0
+
+        self._prestamos = 0
+        self._creados = 0
+        self._reciclados = 0
+        self._fallos_creacion = 0
+        self._espera_total = 0.0
+        self._espera_max = 0.0
+
+    def precalentar(self):
+        """Lanza drivers hasta completar el tamaño del pool"""
+        while True:
+            with self._lock:
+                if self._vivos >= self.tamano:
+                    return
+                self._vivos += 1
+            driver = self._crear()
+            REAPER.devuelto(driver)
+            self._libres.put(driver)
+
+    def adquirir(self, timeout: float = None):
+        """Presta un driver; bloquea hasta `timeout` segundos si todos están en uso"""
+        timeout = self.timeout if timeout is None else timeout
+        inicio = time.monotonic()
+
+        driver = None
+        try:
+            driver = self._libres.get_nowait()
+        except queue.Empty:
+            crear = False
+            with self._lock:
+                if self._vivos < self.tamano:
+                    self._vivos += 1
+                    crear = True
+
+            if crear:
+                driver = self._crear()
+            else:
+                try:
+                    driver = self._libres.get(timeout=timeout)
+                except queue.Empty:
+                    raise PoolAgotadoError(
+                        f"Sin navegadores {self.nombre} libres tras {timeout:.0f}s"
+                    )
+
+        REAPER.prestado(driver)
+        espera = time.monotonic() - inicio
+        with self._lock:
+            self._en_uso += 1
+            self._prestamos += 1
+            self._espera_total += espera
+            self._espera_max = max(self._espera_max, espera)
+
+        return driver
+
+    def liberar(self, driver, roto: bool = False):
+        """Devuelve un driver al pool, reciclándolo si está gastado o caído"""
+        with self._lock:
+            self._en_uso -= 1
+            usos = self._usos.get(id(driver), 0) + 1
+            self._usos[id(driver)] = usos
+
+        if roto or usos >= self.max_usos or not perfil_vigente(driver) or not self._limpiar(driver):
+            self._reciclar(driver)
+            return
+
+        REAPER.devuelto(driver)
+        self._libres.put(driver)
+
+    def cerrar(self):
+        """Cierra todos los drivers libres (los prestados se cierran al devolverse)"""
+        while True:
+            try:
+                driver = self._libres.get_nowait()
+            except queue.Empty:
+                return
+            self._reciclar(driver, contar=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'browser': self.nombre,
+                'size': self.tamano,
+                'alive': self._vivos,
+                'in_use': self._en_uso,
+                'idle': self._libres.qsize(),
+                'max_uses': self.max_usos,
+                'checkouts': self._prestamos,
+                'created': self._creados,
+                'recycled': self._reciclados,
+                'create_failures': self._fallos_creacion,
+                'wait_avg_s': round(self._espera_total / self._prestamos, 4) if self._prestamos else 0.0,
+                'wait_max_s': round(self._espera_max, 4),
+                **(self.pestanas.stats() if self.pestanas else {}),
+            }
+
+    def _crear(self):
+        try:
+            driver = self._fabrica()
+        except Exception:
+            with self._lock:
+                self._vivos -= 1
+                self._fallos_creacion += 1
+            raise
+
+        with self._lock:
+            self._creados += 1
+            self._usos[id(driver)] = 0
+        return driver
+
+    def _limpiar(self, driver) -> bool:
+        """Deja el driver en una página vacía; si no responde, está caído"""
+        try:
+            driver.get("about:blank")
+            return True
+        except WebDriverException:
+            return False
+
+    def _reciclar(self, driver, contar: bool = True):
+        cerrar_driver(driver)
+
+        with self._lock:
+            self._usos.pop(id(driver), None)
+            self._vivos -= 1
+            if contar:
+                self._reciclados += 1
+
+
+_TAMANOS = {
+    'chrome': lambda: config.POOL_SIZE_CHROME,
+    'edge': lambda: config.POOL_SIZE_EDGE,
+}
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def obtener_pool(navegador: str) -> BrowserPool:
+    """Devuelve el pool del proceso para `navegador` ('chrome' o 'edge')"""
+    with _pools_lock:
+        pool = _pools.get(navegador)
+        if pool is None:
+            if config.BROWSER_TABS > 1:
+                # Cada préstamo es una pestaña; varias comparten un mismo proceso de navegador
+                gestor = GestorPestanas(
+                    navegador,
+                    functools.partial(crear_driver, navegador, carga='none'),
+                    cerrar_driver,
+                    config.BROWSER_TABS,
+                )
+                fabrica = gestor.crear_pestana
+                tamano = _TAMANOS[navegador]() * config.BROWSER_TABS
+            else:
+                gestor = None
+                fabrica = functools.partial(crear_driver, navegador)
+                tamano = _TAMANOS[navegador]()
+
+            pool = BrowserPool(
+                navegador,
+                fabrica,
+                tamano=tamano,
+                max_usos=config.POOL_MAX_USES,
+                timeout=config.POOL_ACQUIRE_TIMEOUT,
+            )
+            pool.pestanas = gestor
+            _pools[navegador] = pool
+        return pool
+
+
+def precalentar_pools():
+    """Lanza los drivers de los motores configurados (al arrancar la API)"""
+    for navegador in sorted({config.BROWSER_PUBLICACION, config.BROWSER_PROFILE}):
+        try:
+            obtener_pool(navegador).precalentar()
+            logger.info("Pool %s listo", navegador)
+        except Exception as e:
+            logger.warning("No se pudo precalentar el pool %s: %s", navegador, e)
+
+
+def cerrar_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.cerrar()
+
+
+def estadisticas_pools() -> dict:
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.nombre: pool.stats() for pool in pools}
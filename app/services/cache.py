@@ -0,0 +1,179 @@
+from collections import OrderedDict
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from app import config
+
+
+class MemoriaBackend:
+    """Caché LRU en memoria del proceso"""
+
+    def __init__(self, max_items: int):
+        self.max_items = max(1, max_items)
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: str):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+            valor, expira = entrada
+            if expira <= time.time():
+                del self._datos[clave]
+                return None
+            self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave: str, valor: dict, ttl: float):
+        with self._lock:
+            self._datos[clave] = (valor, time.time() + ttl)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.max_items:
+                self._datos.popitem(last=False)
+
+    def __len__(self):
+        return len(self._datos)
+
+
+class SqliteBackend:
+    """Caché LRU en un fichero SQLite, para conservar resultados entre reinicios"""
+
+    def __init__(self, ruta: str, max_items: int):
+        self.max_items = max(1, max_items)
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            " clave TEXT PRIMARY KEY,"
+            " valor TEXT NOT NULL,"
+            " expira REAL NOT NULL,"
+            " usado REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_usado ON cache (usado)")
+        self._conn.commit()
+
+    def obtener(self, clave: str):
+        ahora = time.time()
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT valor, expira FROM cache WHERE clave = ?", (clave,)
+            ).fetchone()
+            if fila is None:
+                return None
+            if fila[1] <= ahora:
+                self._conn.execute("DELETE FROM cache WHERE clave = ?", (clave,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE cache SET usado = ? WHERE clave = ?", (ahora, clave))
+            self._conn.commit()
+        return json.loads(fila[0])
+
+    def guardar(self, clave: str, valor: dict, ttl: float):
+        ahora = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (clave, valor, expira, usado) VALUES (?, ?, ?, ?)",
+                (clave, json.dumps(valor, ensure_ascii=False), ahora + ttl, ahora),
+            )
+            self._conn.execute(
+                "DELETE FROM cache WHERE clave IN ("
+                " SELECT clave FROM cache ORDER BY usado DESC LIMIT -1 OFFSET ?)",
+                (self.max_items,),
+            )
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+class ResultCache:
+    """
+    Caché de resultados de scraping con TTL y unión de peticiones en vuelo:
+    si llegan N peticiones de la misma URL a la vez, solo una scrapea y las
+    demás esperan su resultado.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        # SQLite bloquea (disco y lock): se consulta desde un hilo, no en el event loop
+        self._en_hilo = isinstance(backend, SqliteBackend)
+        self._en_vuelo = {}
+        self._aciertos = 0
+        self._fallos = 0
+        self._unidas = 0
+
+    async def obtener_o_calcular(self, clave: str, ttl: float, calcular) -> dict:
+        """
+        Args:
+            clave (str): Clave normalizada de la URL.
+            ttl (float): Vigencia del resultado en segundos (0 = no cachear).
+            calcular: Función sin argumentos que devuelve la corrutina del scrape.
+        """
+        if ttl > 0:
+            valor = await self.leer(clave)
+            if valor is not None:
+                self._aciertos += 1
+                return valor
+
+        tarea = self._en_vuelo.get(clave)
+        if tarea is not None:
+            self._unidas += 1
+            return await asyncio.shield(tarea)
+
+        self._fallos += 1
+        tarea = asyncio.ensure_future(self._calcular_y_guardar(clave, ttl, calcular))
+        self._en_vuelo[clave] = tarea
+        tarea.add_done_callback(lambda _t: self._en_vuelo.pop(clave, None))
+
+        # shield: si el cliente que inició el scrape se desconecta, los demás siguen esperando
+        return await asyncio.shield(tarea)
+
+    async def _calcular_y_guardar(self, clave: str, ttl: float, calcular) -> dict:
+        valor = await calcular()
+
+        # Solo se cachean resultados correctos; los errores se reintentan en la próxima petición
+        if ttl > 0 and valor.get('status') == 'success':
+            await self.escribir(clave, valor, ttl)
+
+        return valor
+
+    async def leer(self, clave: str):
+        """Resultado vigente de `clave` o None, sin pasar por la unión de peticiones"""
+        if self._en_hilo:
+            return await asyncio.to_thread(self.backend.obtener, clave)
+        return self.backend.obtener(clave)
+
+    async def escribir(self, clave: str, valor: dict, ttl: float):
+        if self._en_hilo:
+            await asyncio.to_thread(self.backend.guardar, clave, valor, ttl)
+        else:
+            self.backend.guardar(clave, valor, ttl)
+
+    def stats(self) -> dict:
+        return {
+            'backend': type(self.backend).__name__,
+            'items': len(self.backend),
+            'hits': self._aciertos,
+            'misses': self._fallos,
+            'coalesced': self._unidas,
+            'in_flight': len(self._en_vuelo),
+        }
+
+
+def _crear_backend():
+    if config.CACHE_BACKEND == 'sqlite':
+        return SqliteBackend(config.CACHE_PATH, config.CACHE_MAX_ITEMS)
+    return MemoriaBackend(config.CACHE_MAX_ITEMS)
+
+
+CACHE_RESULTADOS = ResultCache(_crear_backend())
@@ -0,0 +1,161 @@
+import re
+
+# Todos los scrapers leen sus contadores con este módulo y devuelven enteros.
+
+# Un contador tal como aparece en la página, en español o en inglés:
+# '850', '1.234', '1,234,567', '1 234' (con espacio duro), '16.6K', '1,2 mil',
+# '3,4 mill.', '2 M', '1.1B', '5 mil M'. La parte numérica es deliberadamente
+# laxa (una sola clase de caracteres, sin alternativas que obliguen a
+# retroceder); qué separador es de miles y cuál decimal se decide en _a_float
+NUMERO = (
+    r'(?P<numero>\d(?:[\d.,\u00a0\u202f]*\d)?)'
+    r'(?:\s*(?P<sufijo>mil(?:\s+millones|\s*M|l(?:ones|[oó]n)?\.?)?|[KMB])(?![a-záéíóúñ]))?'
+)
+
+MULTIPLICADORES = {
+    'k': 1_000,
+    'mil': 1_000,
+    'm': 1_000_000,
+    'mill': 1_000_000,
+    'mill.': 1_000_000,
+    'millon': 1_000_000,
+    'millón': 1_000_000,
+    'millones': 1_000_000,
+    'b': 1_000_000_000,
+    'mil m': 1_000_000_000,
+    'milm': 1_000_000_000,
+    'mil millones': 1_000_000_000,
+}
+
+_ESPACIOS_DUROS = str.maketrans('', '', '\u00a0\u202f')
+
+# Sufijos de una letra de la vía rápida ('16.6K', '2M')
+_SUFIJOS_CORTOS = {'K': 1_000, 'k': 1_000, 'M': 1_000_000, 'm': 1_000_000, 'B': 1_000_000_000, 'b': 1_000_000_000}
+
+
+def patron(antes: str = '', despues: str = '') -> re.Pattern:
+    """
+    Compila `antes` + NUMERO + `despues` sin distinguir mayúsculas. Los
+    scrapers lo llaman una vez al importar, no en cada búsqueda.
+
+    Ej: patron(despues=r'\\s*Me gusta') encuentra '1,2 mil Me gusta'.
+    """
+    return re.compile(antes + NUMERO + despues, re.IGNORECASE)
+
+
+# Primer contador de un texto, sin etiqueta
+CUALQUIERA = patron()
+_SOLO = re.compile(NUMERO, re.IGNORECASE)
+
+
+def _miles(grupos: list) -> bool:
+    """'1', '234', '567' es una agrupación de miles válida; '1', '2', '3' no"""
+    return 0 < len(grupos[0]) <= 3 and all(len(g) == 3 for g in grupos[1:])
+
+
+def _a_float(numero: str, con_sufijo: bool):
+    """
+    Decide qué separador es decimal. Con los dos, el último ('1.234,5' /
+    '1,234.5'). Con uno solo, son miles si se repite o si deja un grupo de
+    tres cifras sin sufijo detrás ('1.234', '1,234'); si no, es la coma o el
+    punto decimal del sufijo ('16.6K', '1,2 mil'). None si las cifras no
+    forman un número ('1.2.3').
+    """
+    if not numero.isascii():
+        # El espacio duro solo se usa para separar miles
+        numero = numero.translate(_ESPACIOS_DUROS)
+    punto, coma = numero.rfind('.'), numero.rfind(',')
+
+    if punto >= 0 and coma >= 0:
+        miles, decimal = (',', '.') if punto > coma else ('.', ',')
+        entero, _, fraccion = numero.rpartition(decimal)
+        if not fraccion.isdigit() or decimal in entero or not _miles(entero.split(miles)):
+            return None
+        return float(entero.replace(miles, '') + '.' + fraccion)
+
+    if punto < 0 and coma < 0:
+        return float(numero)
+
+    separador, posicion = ('.', punto) if punto >= 0 else (',', coma)
+    if numero.find(separador) == posicion:
+        # Un solo separador, el caso de casi todos los contadores ('1.234', '1,2')
+        entero, fraccion = numero[:posicion], numero[posicion + 1:]
+        if len(fraccion) != 3 or con_sufijo:
+            return float(entero + '.' + fraccion)
+        return float(entero + fraccion) if len(entero) <= 3 else None
+
+    partes = numero.split(separador)
+    return float(''.join(partes)) if _miles(partes) else None
+
+
+def _multiplicador(sufijo: str) -> int:
+    sufijo = sufijo.lower()
+    if sufijo in MULTIPLICADORES:
+        return MULTIPLICADORES[sufijo]
+    # Espacios de más o raros: 'mil   M', '3,4 mill .'
+    return MULTIPLICADORES[re.sub(r'[\s.]', '', sufijo)]
+
+
+def _rapido(texto: str):
+    """
+    Vía rápida de a_entero para lo que más se ve (TikTok): cifras ASCII
+    ('850') o cifras con un punto decimal opcional y sufijo K/M/B ('16.6K',
+    '2M'). None si no es de esa forma y hay que pasar por la expresión.
+    """
+    if not texto.isascii():
+        return None
+    if texto.isdigit():
+        return int(texto)
+    multiplicador = _SUFIJOS_CORTOS.get(texto[-1:])
+    if multiplicador is None:
+        return None
+    entero, punto, fraccion = texto[:-1].partition('.')
+    if not entero.isdigit():
+        return None
+    if not punto:
+        return int(entero) * multiplicador
+    if not fraccion.isdigit():
+        return None
+    return int(round(float(texto[:-1]) * multiplicador))
+
+
+def valor(coincidencia: re.Match):
+    """Entero de una coincidencia de `patron`, o None si las cifras no forman un número"""
+    numero, sufijo = coincidencia.group('numero', 'sufijo')
+    if numero.isdigit():
+        # Lo más habitual: solo cifras, sin float de por medio
+        return int(numero) if sufijo is None else int(numero) * _multiplicador(sufijo)
+    if sufijo is None:
+        if numero[-4:-3] in ('.', ','):
+            # Y después, un separador de miles: '1.234', '12,345'
+            cabeza, cola = numero[:-4], numero[-3:]
+            if len(cabeza) <= 3 and cabeza.isdigit() and cola.isdigit():
+                return int(cabeza + cola)
+    else:
+        # Con sufijo, un solo separador es el decimal: '1,2 mil', '16.6K'
+        entero, _, fraccion = numero.replace(',', '.').partition('.')
+        if entero.isdigit() and fraccion.isdigit():
+            return int(round(float(entero + '.' + fraccion) * _multiplicador(sufijo)))
+
+    cantidad = _a_float(numero, sufijo is not None)
+    if cantidad is None:
+        return None
+    if sufijo is not None:
+        cantidad *= _multiplicador(sufijo)
+    return int(round(cantidad))
+
+
+def buscar(compilado: re.Pattern, texto: str):
+    """Primer contador de `texto` que encaja en `compilado`, o None"""
+    coincidencia = compilado.search(texto or '')
+    return valor(coincidencia) if coincidencia else None
+
+
+def a_entero(texto: str):
+    """El texto entero es un contador ('16.6K', '1,2 mil', '1.234'): su valor, o None"""
+    texto = (texto or '').strip()
+    rapido = _rapido(texto)
+    if rapido is not None:
+        return rapido
+    coincidencia = _SOLO.fullmatch(texto)
+    return valor(coincidencia) if coincidencia else None
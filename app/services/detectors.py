@@ -1,4 +1,5 @@
 from enum import Enum
+from urllib.parse import urlsplit
 
 
 class Plataforma(str, Enum):
@@ -8,14 +9,29 @@ class Plataforma(str, Enum):
     UNKNOWN = "unknown"
 
 
-def detectar_plataforma(url: str) -> Plataforma:
-    url_lower = url.lower()
+# Dominios registrados de cada plataforma (incluye los acortadores)
+DOMINIOS = {
+    'facebook.com': Plataforma.FACEBOOK,
+    'fb.com': Plataforma.FACEBOOK,
+    'fb.watch': Plataforma.FACEBOOK,
+    'instagram.com': Plataforma.INSTAGRAM,
+    'instagr.am': Plataforma.INSTAGRAM,
+    'tiktok.com': Plataforma.TIKTOK,
+}
 
-    if "facebook.com" in url_lower:
-        return Plataforma.FACEBOOK
-    if "instagram.com" in url_lower:
-        return Plataforma.INSTAGRAM
-    if "tiktok.com" in url_lower:
-        return Plataforma.TIKTOK
 
+def plataforma_de_host(host: str) -> Plataforma:
+    """El host debe ser el dominio o un subdominio suyo: 'notfacebook.com' no cuenta"""
+    host = (host or '').lower().rstrip('.')
+    for dominio, plataforma in DOMINIOS.items():
+        if host == dominio or host.endswith('.' + dominio):
+            return plataforma
     return Plataforma.UNKNOWN
+
+
+def detectar_plataforma(url: str) -> Plataforma:
+    try:
+        host = urlsplit(url.strip()).hostname
+    except ValueError:
+        return Plataforma.UNKNOWN
+    return plataforma_de_host(host)
@@ -0,0 +1,67 @@
+import glob
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+
+def _debe_capturar(result: dict, metricas: tuple) -> bool:
+    modo = config.SCREENSHOT_MODE
+    if modo == 'off':
+        return False
+    if modo == 'always':
+        return True
+
+    fallo = result.get('status') != 'success' or any(result.get(m) == 0 for m in metricas)
+    if fallo:
+        return True
+
+    return modo == 'sample' and random.random() < config.SCREENSHOT_SAMPLE_RATE
+
+
+def _podar():
+    """Mantiene solo las SCREENSHOT_MAX_FILES capturas más recientes"""
+    archivos = sorted(glob.glob(os.path.join(config.SCREENSHOT_DIR, "*.png")), key=os.path.getmtime)
+    for archivo in archivos[:max(0, len(archivos) - config.SCREENSHOT_MAX_FILES)]:
+        try:
+            os.remove(archivo)
+        except OSError:
+            pass
+
+
+def capturar_diagnostico(driver, etiqueta: str, result: dict, metricas: tuple):
+    """
+    Guarda una captura de la página solo cuando sirve para diagnosticar:
+    error, alguna de `metricas` en cero, o muestreo (según SCREENSHOT_MODE).
+
+    Cada captura tiene nombre único, así que peticiones concurrentes no se pisan.
+
+    Returns:
+        str | None: Ruta de la captura, si se tomó.
+    """
+    if driver is None or not _debe_capturar(result, metricas):
+        return None
+
+    os.makedirs(config.SCREENSHOT_DIR, exist_ok=True)
+    nombre = f"{etiqueta}_{time.strftime('%Y%m%d-%H%M%S')}_{uuid.uuid4().hex[:8]}.png"
+    ruta = os.path.join(config.SCREENSHOT_DIR, nombre)
+
+    try:
+        driver.save_screenshot(ruta)
+        logger.info("Captura de diagnóstico guardada: %s", ruta)
+    except Exception as e:
+        logger.warning("Error en captura: %s", e)
+        return None
+
+    with _lock:
+        _podar()
+
+    return ruta
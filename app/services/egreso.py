@@ -0,0 +1,217 @@
+import json
+import logging
+import threading
+import time
+
+from app import config
+from app.services.telemetria import EXPULSIONES_EGRESO
+
+logger = logging.getLogger(__name__)
+
+
+class PerfilEgreso:
+    """
+    Identidad de red de un navegador: proxy, user-agent, tamaño de ventana y
+    cookies iniciales. Se fija al lanzar el navegador y dura lo que dura él.
+    """
+
+    def __init__(self, nombre: str, proxy: str = None, user_agent: str = None, ventana=None, cookies: str = None):
+        self.nombre = nombre
+        # 'http://host:puerto' o 'socks5://host:puerto'; Chrome no acepta usuario y
+        # contraseña en --proxy-server, el proxy tiene que autorizar por IP
+        self.proxy = proxy or None
+        # None = el USER_AGENT por defecto de browser_pool
+        self.user_agent = user_agent or None
+        self.ventana = tuple(ventana) if ventana else None
+        # Ruta a un JSON con cookies exportadas (formato de driver.get_cookies())
+        self.cookies = cookies or None
+
+        self.puntuacion = 1.0
+        self.muestras = 0
+        self.resultados = 0
+        self.bloqueos = 0
+        self.drivers = 0
+        self.expulsado_hasta = 0.0
+        self.expulsiones = 0
+
+    def activo(self) -> bool:
+        return time.time() >= self.expulsado_hasta
+
+    def argumentos(self) -> list:
+        """Flags de lanzamiento; el user-agent lo añade la fábrica (tiene valor por defecto)"""
+        argumentos = []
+        if self.proxy:
+            argumentos.append(f'--proxy-server={self.proxy}')
+            # Sin esto Chrome nunca manda por el proxy las direcciones locales
+            argumentos.append('--proxy-bypass-list=<-loopback>')
+        if self.ventana:
+            argumentos.append(f'--window-size={self.ventana[0]},{self.ventana[1]}')
+        return argumentos
+
+    def proxies(self) -> dict:
+        """El proxy en el formato de requests (vacío = conexión directa)"""
+        return {'http': self.proxy, 'https': self.proxy} if self.proxy else {}
+
+    def cookies_guardadas(self) -> list:
+        if not self.cookies:
+            return []
+        try:
+            with open(self.cookies, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("No se pudieron leer las cookies del perfil %s: %s", self.nombre, e)
+            return []
+
+    def stats(self) -> dict:
+        return {
+            'proxy': self.proxy,
+            'active': self.activo(),
+            'score': round(self.puntuacion, 3),
+            'results': self.resultados,
+            'blocked': self.bloqueos,
+            'browsers': self.drivers,
+            'evictions': self.expulsiones,
+            'evicted_until': self.expulsado_hasta if not self.activo() else None,
+        }
+
+
+def cookies_cdp(cookies: list) -> list:
+    """Cookies de driver.get_cookies() al formato de Network.setCookies"""
+    convertidas = []
+    for cookie in cookies:
+        cookie = dict(cookie)
+        if 'expiry' in cookie:
+            cookie['expires'] = cookie.pop('expiry')
+        convertidas.append(cookie)
+    return convertidas
+
+
+class PoolEgreso:
+    """
+    Reparte los perfiles entre los navegadores que se lanzan y lleva su salud:
+    una media móvil de resultados buenos (1) y bloqueados (0). Un perfil que
+    baja de EGRESS_MIN_SCORE se expulsa durante EGRESS_EVICTION_SECONDS y
+    luego vuelve con la puntuación limpia. El último perfil activo nunca se
+    expulsa: sin alternativa, quitarlo solo dejaría de scrapear.
+    """
+
+    def __init__(self, perfiles: list):
+        if not perfiles:
+            raise ValueError("Hace falta al menos un perfil de salida")
+        self.perfiles = perfiles
+        self._lock = threading.Lock()
+
+    def elegir(self) -> PerfilEgreso:
+        """El perfil activo con menos navegadores; a igualdad, el más sano y menos usado"""
+        with self._lock:
+            activos = [p for p in self.perfiles if p.activo()]
+            if not activos:
+                # Solo pasa si se expulsaron todos a la vez: el que antes vuelve
+                return min(self.perfiles, key=lambda p: p.expulsado_hasta)
+            return min(activos, key=lambda p: (p.drivers, -p.puntuacion, p.resultados))
+
+    def tomar(self, perfil: PerfilEgreso):
+        with self._lock:
+            perfil.drivers += 1
+
+    def soltar(self, perfil: PerfilEgreso):
+        with self._lock:
+            perfil.drivers = max(0, perfil.drivers - 1)
+
+    def registrar(self, perfil: PerfilEgreso, bloqueado: bool):
+        with self._lock:
+            if not perfil.activo():
+                # Resultados de navegadores lanzados antes de la expulsión
+                return
+            alfa = config.EGRESS_SCORE_ALPHA
+            perfil.puntuacion = (1 - alfa) * perfil.puntuacion + alfa * (0.0 if bloqueado else 1.0)
+            perfil.muestras += 1
+            perfil.resultados += 1
+            if bloqueado:
+                perfil.bloqueos += 1
+
+            if (
+                perfil.puntuacion < config.EGRESS_MIN_SCORE
+                and perfil.muestras >= config.EGRESS_MIN_SAMPLES
+                and sum(1 for p in self.perfiles if p.activo()) > 1
+            ):
+                self._expulsar(perfil)
+
+    def _expulsar(self, perfil: PerfilEgreso):
+        logger.warning(
+            "Perfil de salida %s expulsado %.0fs (puntuación %.2f, %d bloqueos de %d)",
+            perfil.nombre, config.EGRESS_EVICTION_SECONDS, perfil.puntuacion,
+            perfil.bloqueos, perfil.resultados,
+        )
+        perfil.expulsado_hasta = time.time() + config.EGRESS_EVICTION_SECONDS
+        perfil.expulsiones += 1
+        # Vuelve a prueba: necesita otras EGRESS_MIN_SAMPLES muestras malas para salir
+        perfil.puntuacion = 1.0
+        perfil.muestras = 0
+        EXPULSIONES_EGRESO.incrementar(perfil.nombre)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {p.nombre: p.stats() for p in self.perfiles}
+
+
+def cargar_perfiles(ruta: str) -> list:
+    """
+    Lee EGRESS_PROFILES_PATH; sin ruta, un perfil de conexión directa.
+
+    Raises:
+        ValueError: Si el archivo no es una lista de perfiles válida.
+    """
+    if not ruta:
+        return [PerfilEgreso('directo')]
+
+    with open(ruta, encoding='utf-8') as f:
+        datos = json.load(f)
+    if not isinstance(datos, list) or not datos:
+        raise ValueError(f"{ruta} debe contener una lista de perfiles")
+
+    perfiles = []
+    for i, dato in enumerate(datos):
+        perfiles.append(PerfilEgreso(
+            dato.get('name') or f'perfil-{i}',
+            proxy=dato.get('proxy'),
+            user_agent=dato.get('user_agent'),
+            ventana=dato.get('viewport'),
+            cookies=dato.get('cookies'),
+        ))
+    return perfiles
+
+
+_egreso = None
+_egreso_lock = threading.Lock()
+
+
+def obtener_egreso() -> PoolEgreso:
+    global _egreso
+    with _egreso_lock:
+        if _egreso is None:
+            _egreso = PoolEgreso(cargar_perfiles(config.EGRESS_PROFILES_PATH))
+        return _egreso
+
+
+def configurar_egreso(perfiles: list) -> PoolEgreso:
+    """Sustituye los perfiles del proceso (el benchmark los crea contra proxies locales)"""
+    global _egreso
+    with _egreso_lock:
+        _egreso = PoolEgreso(perfiles)
+        return _egreso
+
+
+def perfil_de(driver):
+    """Perfil con el que se lanzó `driver` (o el navegador de una pestaña), o None"""
+    # Una pestaña no tiene perfil propio: es el del navegador que la contiene
+    navegador = getattr(driver, '_navegador', None)
+    if navegador is not None:
+        driver = navegador.driver
+    return getattr(driver, '_egreso', None)
+
+
+def perfil_vigente(driver) -> bool:
+    """False si el perfil del driver fue expulsado: hay que reciclarlo"""
+    perfil = perfil_de(driver)
+    return perfil is None or perfil.activo()
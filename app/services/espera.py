@@ -0,0 +1,80 @@
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+import logging
+import threading
+import time
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+
+class EstadisticasEspera:
+    """Acumula cuánto tardó realmente cada espera, por etiqueta (p. ej. 'tiktok_post')"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._datos = {}
+
+    def registrar(self, etiqueta: str, segundos: float, listo: bool):
+        with self._lock:
+            d = self._datos.setdefault(etiqueta, {
+                'count': 0, 'ready': 0, 'timeouts': 0,
+                'total_s': 0.0, 'max_s': 0.0, 'last_s': 0.0,
+            })
+            d['count'] += 1
+            d['ready' if listo else 'timeouts'] += 1
+            d['total_s'] += segundos
+            d['max_s'] = max(d['max_s'], segundos)
+            d['last_s'] = segundos
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                etiqueta: {
+                    'count': d['count'],
+                    'ready': d['ready'],
+                    'timeouts': d['timeouts'],
+                    'avg_s': round(d['total_s'] / d['count'], 3),
+                    'max_s': round(d['max_s'], 3),
+                    'last_s': round(d['last_s'], 3),
+                }
+                for etiqueta, d in self._datos.items()
+            }
+
+
+ESTADISTICAS_ESPERA = EstadisticasEspera()
+
+
+def esperar_contenido(driver, etiqueta: str, localizadores: list, timeout: float) -> bool:
+    """
+    Espera a que aparezca cualquiera de `localizadores` en la página actual,
+    comprobando cada READY_POLL_INTERVAL segundos hasta `timeout`.
+
+    No lanza excepción si se agota el tiempo: las estrategias de respaldo de
+    cada scraper pueden encontrar el dato igualmente.
+
+    Returns:
+        bool: True si el contenido apareció antes del tope.
+    """
+    inicio = time.monotonic()
+    condiciones = [EC.presence_of_element_located(loc) for loc in localizadores]
+
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=config.READY_POLL_INTERVAL).until(
+            EC.any_of(*condiciones)
+        )
+        listo = True
+    except TimeoutException:
+        listo = False
+
+    segundos = time.monotonic() - inicio
+    ESTADISTICAS_ESPERA.registrar(etiqueta, segundos, listo)
+
+    if listo:
+        logger.debug("Contenido listo en %.2fs", segundos)
+    else:
+        logger.debug("Contenido no detectado tras %.2fs, se continúa igualmente", segundos)
+
+    return listo
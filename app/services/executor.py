@@ -0,0 +1,203 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+
+from app import config
+from app.services.browser_pool import PoolAgotadoError
+from app.services.detectors import Plataforma
+from app.services.ritmo import CubetaTokens, ControladorAIMD
+
+
+class ColaLlenaError(Exception):
+    """La cola de espera de la plataforma está llena (HTTP 429)"""
+
+
+class EsperaAgotadaError(Exception):
+    """La petición esperó turno más de lo permitido (HTTP 503)"""
+
+
+class LimiteConcurrencia:
+    """
+    Limita los scrapes simultáneos de una plataforma.
+
+    Hasta `limite` scrapes corren a la vez, hasta `max_cola` esperan turno
+    y el resto se rechaza de inmediato para dar back-pressure al cliente.
+    """
+
+    def __init__(self, nombre: str, limite: int, max_cola: int, timeout: float):
+        self.nombre = nombre
+        self.limite = max(1, limite)
+        self.max_cola = max(0, max_cola)
+        self.timeout = timeout
+
+        self._cola = deque()
+        self._activos = 0
+        self._rechazados = 0
+        self._expirados = 0
+
+    async def __aenter__(self):
+        # Sin await antes de decidir: la comprobación y la reserva son atómicas en el loop
+        if self._activos < self.limite and not self._cola:
+            self._activos += 1
+            return self
+
+        if len(self._cola) >= self.max_cola:
+            self._rechazados += 1
+            raise ColaLlenaError(f"Demasiados scrapes de {self.nombre} en cola")
+
+        turno = asyncio.get_running_loop().create_future()
+        self._cola.append(turno)
+        try:
+            await asyncio.wait_for(turno, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            self._expirados += 1
+            raise EsperaAgotadaError(
+                f"Sin turno para scrapear {self.nombre} tras {self.timeout:.0f}s"
+            )
+        except asyncio.CancelledError:
+            # El turno pudo llegar justo antes de la cancelación: no perder el hueco
+            if turno.done() and not turno.cancelled():
+                self._liberar()
+            raise
+        finally:
+            if turno in self._cola:
+                self._cola.remove(turno)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._liberar()
+
+    def ajustar(self, limite: int):
+        """Cambia el límite en caliente: al bajar, los activos terminan; al subir, entra la cola"""
+        self.limite = max(1, limite)
+        self._repartir()
+
+    def sobrepasado(self) -> bool:
+        """Hay más scrapes activos que el límite actual (acaba de bajar)"""
+        return self._activos > self.limite
+
+    def _liberar(self):
+        self._activos -= 1
+        self._repartir()
+
+    def _repartir(self):
+        # El hueco pasa directamente al primero de la cola
+        while self._cola and self._activos < self.limite:
+            turno = self._cola.popleft()
+            if not turno.done():
+                self._activos += 1
+                turno.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            'limit': self.limite,
+            'active': self._activos,
+            'queued': len(self._cola),
+            'max_queue': self.max_cola,
+            'rejected': self._rechazados,
+            'timed_out': self._expirados,
+        }
+
+
+_CONCURRENCIA = {
+    Plataforma.FACEBOOK: config.SCRAPE_CONCURRENCY_FACEBOOK,
+    Plataforma.INSTAGRAM: config.SCRAPE_CONCURRENCY_INSTAGRAM,
+    Plataforma.TIKTOK: config.SCRAPE_CONCURRENCY_TIKTOK,
+}
+
+_limites = {
+    plataforma: LimiteConcurrencia(
+        plataforma.value, limite, config.SCRAPE_QUEUE_MAX, config.SCRAPE_QUEUE_TIMEOUT
+    )
+    for plataforma, limite in _CONCURRENCIA.items()
+}
+
+_TASAS = {
+    Plataforma.FACEBOOK: config.RATE_PER_MINUTE_FACEBOOK,
+    Plataforma.INSTAGRAM: config.RATE_PER_MINUTE_INSTAGRAM,
+    Plataforma.TIKTOK: config.RATE_PER_MINUTE_TIKTOK,
+}
+
+_cubetas = {
+    plataforma: CubetaTokens(plataforma.value, por_minuto, config.RATE_BURST)
+    for plataforma, por_minuto in _TASAS.items()
+}
+
+# La concurrencia configurada es el techo; el controlador se mueve por debajo
+_controladores = {
+    plataforma: ControladorAIMD(_limites[plataforma], _CONCURRENCIA[plataforma])
+    for plataforma in _limites
+}
+
+# Selenium es bloqueante y sus drivers no se pueden serializar: hilos, no procesos
+_executor = ThreadPoolExecutor(
+    max_workers=sum(_CONCURRENCIA.values()),
+    thread_name_prefix="scraper",
+)
+
+
+def obtener_limite(plataforma: Plataforma) -> LimiteConcurrencia:
+    return _limites[plataforma]
+
+
+async def esperar_tasa(plataforma: Plataforma):
+    """
+    Espera el token de la plataforma antes de cada scrape.
+
+    Raises:
+        EsperaAgotadaError: Si el ritmo permitido no deja scrapear dentro de SCRAPE_QUEUE_TIMEOUT.
+    """
+    try:
+        await _cubetas[plataforma].tomar(config.SCRAPE_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise EsperaAgotadaError(f"Límite de ritmo de {plataforma.value} alcanzado")
+
+
+def registrar_resultado(plataforma: Plataforma, result: dict):
+    """Informa al controlador AIMD del resultado de un scrape"""
+    _controladores[plataforma].registrar(result)
+
+
+async def ejecutar(plataforma: Plataforma, funcion, *args):
+    """
+    Ejecuta `funcion(*args)` (síncrona) en el pool de hilos sin bloquear el
+    event loop, respetando el límite de concurrencia de la plataforma.
+
+    Raises:
+        ColaLlenaError: Si la cola de la plataforma está llena.
+        EsperaAgotadaError: Si no hubo turno dentro de SCRAPE_QUEUE_TIMEOUT.
+    """
+    async with obtener_limite(plataforma):
+        await esperar_tasa(plataforma)
+        try:
+            result = await en_hilo(funcion, *args)
+        except (ValueError, PoolAgotadoError):
+            # Ni la URL inválida ni la falta de navegadores dicen nada de la plataforma
+            raise
+        except Exception as e:
+            registrar_resultado(plataforma, {'status': 'error', 'error_message': str(e)})
+            raise
+        registrar_resultado(plataforma, result)
+        return result
+
+
+async def en_hilo(funcion, *args):
+    """Ejecuta `funcion(*args)` en el pool de hilos; el llamador gestiona el límite"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(funcion, *args))
+
+
+def estadisticas_executor() -> dict:
+    return {
+        plataforma.value: {
+            **limite.stats(),
+            'rate': _cubetas[plataforma].stats(),
+            'aimd': _controladores[plataforma].stats(),
+        }
+        for plataforma, limite in _limites.items()
+    }
+
+
+def cerrar_executor():
+    _executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,124 @@
+from concurrent.futures import ProcessPoolExecutor
+import sys
+import threading
+
+import lxml.etree
+import lxml.html
+
+from app import config
+
+# Evalúa todas las consultas dentro de la página y devuelve los textos de una vez.
+# arguments[0] = {nombre: [xpath, atributo | null]}; sin atributo se toma innerText
+# (equivalente a WebElement.text).
+SCRIPT_CANDIDATOS = """
+const consultas = arguments[0];
+const limite = arguments[1];
+const salida = {};
+for (const [nombre, consulta] of Object.entries(consultas)) {
+    const [xpath, atributo] = consulta;
+    const valores = [];
+    try {
+        const res = document.evaluate(
+            xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+        );
+        for (let i = 0; i < res.snapshotLength && valores.length < limite; i++) {
+            const el = res.snapshotItem(i);
+            const valor = atributo ? el.getAttribute(atributo) : (el.innerText ?? el.textContent);
+            valores.push(valor || '');
+        }
+    } catch (e) {
+        // XPath inválido o nodo sin texto: la consulta queda vacía
+    }
+    salida[nombre] = valores;
+}
+return salida;
+"""
+
+# Máximo de elementos devueltos por consulta (protege de páginas enormes)
+MAX_CANDIDATOS = 200
+
+
+def candidatos_js(driver, consultas: dict) -> dict:
+    """Motor 'js': evalúa las consultas dentro del navegador en un solo `execute_script`"""
+    consultas_js = {nombre: list(consulta) for nombre, consulta in consultas.items()}
+    candidatos = driver.execute_script(SCRIPT_CANDIDATOS, consultas_js, MAX_CANDIDATOS) or {}
+    return {nombre: candidatos.get(nombre) or [] for nombre in consultas}
+
+
+def candidatos_html(html: str, consultas: dict) -> dict:
+    """
+    Motor 'html': evalúa las consultas sobre un HTML ya capturado con lxml.
+    Es una función pura, así que corre igual en otro proceso o sobre una página guardada.
+    """
+    documento = lxml.html.fromstring(html)
+    salida = {}
+    for nombre, (xpath, atributo) in consultas.items():
+        valores = []
+        try:
+            for nodo in documento.xpath(xpath)[:MAX_CANDIDATOS]:
+                if not isinstance(nodo, lxml.html.HtmlElement):
+                    continue
+                valor = nodo.get(atributo) if atributo else nodo.text_content()
+                valores.append(valor or '')
+        except lxml.etree.XPathError:
+            # XPath inválido: la consulta queda vacía, igual que en el navegador
+            pass
+        salida[nombre] = valores
+    return salida
+
+
+_procesos = None
+_procesos_lock = threading.Lock()
+
+
+def _obtener_procesos():
+    global _procesos
+    with _procesos_lock:
+        if _procesos is None:
+            _procesos = ProcessPoolExecutor(max_workers=config.EXTRACTION_PROCESSES)
+        return _procesos
+
+
+def cerrar_procesos():
+    global _procesos
+    with _procesos_lock:
+        if _procesos is not None:
+            _procesos.shutdown(wait=False, cancel_futures=True)
+            _procesos = None
+
+
+def extraer_candidatos(driver, consultas: dict) -> dict:
+    """
+    Obtiene de la página cargada los textos de todas las `consultas` del
+    scraper, con el motor de EXTRACTION_ENGINE.
+
+    Args:
+        driver: WebDriver con la página ya cargada.
+        consultas (dict): {nombre: (xpath, atributo o None)}.
+
+    Returns:
+        dict: {nombre: [textos encontrados en orden de documento]}.
+    """
+    if config.EXTRACTION_ENGINE != 'html':
+        return candidatos_js(driver, consultas)
+
+    # Una sola lectura del DOM; el análisis ya no ocupa al navegador
+    html = driver.page_source
+    if config.EXTRACTION_PROCESSES > 0:
+        return _obtener_procesos().submit(candidatos_html, html, consultas).result()
+    return candidatos_html(html, consultas)
+
+
+if __name__ == '__main__':
+    # Extrae métricas de una página guardada, sin navegador:
+    #   python -m app.services.extraccion tiktok publicacion pagina.html
+    from app.services.detectors import Plataforma
+    from app.services.scrapers import SCRAPERS_PROFILE, SCRAPERS_PUBLICACION
+
+    plataforma, tipo, ruta = sys.argv[1:4]
+    clases = SCRAPERS_PROFILE if tipo == 'profile' else SCRAPERS_PUBLICACION
+    scraper = clases[Plataforma(plataforma)](usar_pool=False)
+
+    with open(ruta, encoding='utf-8') as f:
+        candidatos = candidatos_html(f.read(), scraper.CONSULTAS)
+    print(scraper.interpretar(candidatos))
@@ -0,0 +1,272 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from app import config
+from app.services.contadores import a_entero
+from app.services.urls import normalizar_url, UrlInvalidaError
+
+logger = logging.getLogger(__name__)
+
+# Claves del resultado que no son métricas
+CAMPOS_RESULTADO = {'url', 'status', 'timestamp', 'error_message', 'source', 'age_s'}
+
+def a_numero(valor):
+    """Valor numérico de una métrica (int o texto '1,234', '16.6K', '1,2 mil'), o None si no es un contador"""
+    if isinstance(valor, bool):
+        return None
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    if isinstance(valor, str):
+        numero = a_entero(valor)
+        return float(numero) if numero is not None else None
+    return None
+
+
+def metricas_de(result: dict) -> dict:
+    return {
+        k: v for k, v in result.items()
+        if k not in CAMPOS_RESULTADO and isinstance(v, (int, float, str))
+    }
+
+
+def _niveles(texto: str) -> dict:
+    """'alta:300,media:3600' -> {'alta': 300.0, 'media': 3600.0}"""
+    niveles = {}
+    for parte in texto.split(','):
+        nombre, _, segundos = parte.partition(':')
+        if nombre.strip() and segundos.strip():
+            niveles[nombre.strip()] = float(segundos)
+    return niveles
+
+
+NIVELES = _niveles(config.HISTORY_TIERS)
+
+
+def frescura_de(nivel: str) -> float:
+    """
+    Antigüedad máxima (segundos) con la que un dato del historial se sirve sin volver a scrapear.
+
+    Raises:
+        ValueError: Si el nivel no está en HISTORY_TIERS.
+    """
+    if nivel not in NIVELES:
+        raise ValueError(f"Nivel de frescura desconocido: {nivel} (disponibles: {', '.join(NIVELES)})")
+    return NIVELES[nivel]
+
+
+class HistorialMetricas:
+    """
+    Serie temporal de métricas en SQLite: una fila por (URL, instante, métrica),
+    con el valor tal cual lo devolvió el scraper y su versión numérica.
+    """
+
+    def __init__(self, ruta: str):
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS muestras ("
+            " clave TEXT NOT NULL,"
+            " tipo TEXT NOT NULL,"
+            " plataforma TEXT NOT NULL,"
+            " url TEXT NOT NULL,"
+            " ts REAL NOT NULL,"
+            " marca TEXT,"
+            " metrica TEXT NOT NULL,"
+            " valor TEXT NOT NULL,"
+            " numero REAL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS muestras_clave ON muestras (clave, ts)"
+        )
+        # Para borrar los puntos caducados sin recorrer la tabla
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS muestras_ts ON muestras (ts)"
+        )
+        self._conn.commit()
+
+        # Contadores del proceso: /stats no cuenta filas de la tabla
+        self._agregadas = 0
+        self._borradas = 0
+        self._ultima_poda = 0.0
+
+    def agregar(self, clave: str, tipo: str, plataforma: str, result: dict, ts: float = None):
+        """Añade un resultado correcto; los errores no forman parte de la serie"""
+        if result.get('status') != 'success':
+            return
+        metricas = metricas_de(result)
+        if not metricas:
+            return
+
+        ts = time.time() if ts is None else ts
+        filas = [
+            (clave, tipo, plataforma, result.get('url', ''), ts, result.get('timestamp'),
+             nombre, json.dumps(valor, ensure_ascii=False), a_numero(valor))
+            for nombre, valor in metricas.items()
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT INTO muestras (clave, tipo, plataforma, url, ts, marca, metrica, valor, numero)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                filas,
+            )
+            self._conn.commit()
+            self._agregadas += len(filas)
+
+        ahora = time.time()
+        if config.HISTORY_MAX_AGE > 0 and ahora - self._ultima_poda >= config.HISTORY_PRUNE_INTERVAL:
+            self.podar(ahora - config.HISTORY_MAX_AGE)
+
+    def podar(self, antes_de: float) -> int:
+        """Borra los puntos anteriores a `antes_de` (epoch); devuelve cuántas filas"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM muestras WHERE ts < ?", (antes_de,))
+            self._conn.commit()
+            self._ultima_poda = time.time()
+            self._borradas += cursor.rowcount
+        if cursor.rowcount:
+            logger.info("Historial: %d puntos anteriores a %.0f borrados", cursor.rowcount, antes_de)
+        return cursor.rowcount
+
+    def ultimo(self, clave: str, max_edad: float = None):
+        """
+        Último resultado guardado de `clave`, con el mismo formato que el del
+        scraper; None si no hay o si tiene más de `max_edad` segundos.
+        """
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT MAX(ts) FROM muestras WHERE clave = ?", (clave,)
+            ).fetchone()
+            if fila is None or fila[0] is None:
+                return None
+            ts = fila[0]
+            if max_edad is not None and time.time() - ts > max_edad:
+                return None
+            filas = self._conn.execute(
+                "SELECT url, marca, metrica, valor FROM muestras WHERE clave = ? AND ts = ?",
+                (clave, ts),
+            ).fetchall()
+
+        url, marca = filas[0][0], filas[0][1]
+        return {
+            'url': url,
+            **{metrica: json.loads(valor) for _, _, metrica, valor in filas},
+            'status': 'success',
+            'timestamp': marca,
+            'source': 'history',
+            'age_s': round(time.time() - ts, 1),
+        }
+
+    def serie(self, clave: str, desde: float = None, hasta: float = None, limite: int = 1000) -> list:
+        """Puntos de la serie en orden cronológico: [{'ts', 'timestamp', métricas...}]"""
+        condiciones = ["clave = ?"]
+        parametros = [clave]
+        if desde is not None:
+            condiciones.append("ts >= ?")
+            parametros.append(desde)
+        if hasta is not None:
+            condiciones.append("ts <= ?")
+            parametros.append(hasta)
+
+        with self._lock:
+            instantes = [f[0] for f in self._conn.execute(
+                f"SELECT DISTINCT ts FROM muestras WHERE {' AND '.join(condiciones)}"
+                " ORDER BY ts DESC LIMIT ?",
+                parametros + [limite],
+            ).fetchall()]
+            if not instantes:
+                return []
+            filas = self._conn.execute(
+                "SELECT ts, marca, metrica, valor FROM muestras WHERE clave = ? AND ts BETWEEN ? AND ?"
+                " ORDER BY ts",
+                (clave, min(instantes), max(instantes)),
+            ).fetchall()
+
+        puntos = {}
+        for ts, marca, metrica, valor in filas:
+            punto = puntos.setdefault(ts, {'ts': ts, 'timestamp': marca})
+            punto[metrica] = json.loads(valor)
+        return list(puntos.values())
+
+    def deltas(self, clave: str, desde: float = None, hasta: float = None) -> dict:
+        """
+        Variación de cada métrica numérica entre el primer y el último punto
+        del intervalo, y su ritmo por día.
+        """
+        condiciones = ["clave = ?", "numero IS NOT NULL"]
+        parametros = [clave]
+        if desde is not None:
+            condiciones.append("ts >= ?")
+            parametros.append(desde)
+        if hasta is not None:
+            condiciones.append("ts <= ?")
+            parametros.append(hasta)
+
+        with self._lock:
+            filas = self._conn.execute(
+                f"SELECT metrica, ts, numero FROM muestras WHERE {' AND '.join(condiciones)} ORDER BY ts",
+                parametros,
+            ).fetchall()
+
+        por_metrica = {}
+        for metrica, ts, numero in filas:
+            por_metrica.setdefault(metrica, []).append((ts, numero))
+
+        salida = {}
+        for metrica, puntos in por_metrica.items():
+            (ts_inicio, inicio), (ts_fin, fin) = puntos[0], puntos[-1]
+            dias = (ts_fin - ts_inicio) / 86400
+            salida[metrica] = {
+                'from': inicio,
+                'to': fin,
+                'delta': fin - inicio,
+                'per_day': round((fin - inicio) / dias, 2) if dias > 0 else None,
+                'samples': len(puntos),
+                'since': ts_inicio,
+                'until': ts_fin,
+            }
+        return salida
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'rows_written': self._agregadas,
+                'rows_pruned': self._borradas,
+                'max_age_s': config.HISTORY_MAX_AGE,
+                'last_prune_age_s': round(time.time() - self._ultima_poda) if self._ultima_poda else None,
+            }
+
+
+_historial = None
+_historial_lock = threading.Lock()
+
+
+def obtener_historial() -> HistorialMetricas:
+    global _historial
+    with _historial_lock:
+        if _historial is None:
+            _historial = HistorialMetricas(config.HISTORY_PATH)
+        return _historial
+
+
+def registrar_resultado(tipo: str, plataforma: str, url: str, result: dict):
+    """Añade el resultado al historial sin dejar que un fallo de disco tumbe el scrape"""
+    if not config.HISTORY_ENABLED:
+        return
+    try:
+        clave = f"{tipo}:{normalizar_url(url).clave}"
+    except UrlInvalidaError:
+        # URLs que no son de una plataforma (p. ej. el servidor local del benchmark)
+        return
+    try:
+        obtener_historial().agregar(clave, tipo, plataforma, result)
+    except sqlite3.Error as e:
+        logger.warning("No se pudo guardar en el historial %s: %s", url, e)
@@ -0,0 +1,221 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from app import config
+from app.services.batch import scrapear_lote, urls_unicas
+
+logger = logging.getLogger(__name__)
+
+# Carriles de prioridad: menor número = se atiende antes
+CARRILES = {
+    'interactive': 0,
+    'bulk': 10,
+}
+
+
+class ColaTrabajos:
+    """Cola persistente de trabajos de scraping sobre SQLite"""
+
+    def __init__(self, ruta: str):
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " tipo TEXT NOT NULL,"
+            " carril TEXT NOT NULL,"
+            " prioridad INTEGER NOT NULL,"
+            " urls TEXT NOT NULL,"
+            " estado TEXT NOT NULL,"
+            " error TEXT,"
+            " creado REAL NOT NULL,"
+            " iniciado REAL,"
+            " terminado REAL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_pendientes ON jobs (estado, prioridad, creado)"
+        )
+        # Un resultado por fila: cada URL terminada es un INSERT, no reescribir la lista entera
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_results ("
+            " job TEXT NOT NULL,"
+            " orden INTEGER NOT NULL,"
+            " resultado TEXT NOT NULL,"
+            " PRIMARY KEY (job, orden))"
+        )
+        self._conn.commit()
+
+    def encolar(self, tipo: str, urls: list, carril: str) -> str:
+        id_trabajo = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, tipo, carril, prioridad, urls, estado, creado)"
+                " VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+                (id_trabajo, tipo, carril, CARRILES[carril], json.dumps(urls), time.time()),
+            )
+            self._conn.commit()
+        return id_trabajo
+
+    def tomar_siguiente(self, carriles: list):
+        """Marca como 'running' el trabajo más prioritario de `carriles` y lo devuelve"""
+        marcas = ",".join("?" for _ in carriles)
+        with self._lock:
+            fila = self._conn.execute(
+                f"SELECT * FROM jobs WHERE estado = 'queued' AND carril IN ({marcas})"
+                " ORDER BY prioridad, creado LIMIT 1",
+                carriles,
+            ).fetchone()
+            if fila is None:
+                return None
+            self._conn.execute(
+                "UPDATE jobs SET estado = 'running', iniciado = ? WHERE id = ?",
+                (time.time(), fila['id']),
+            )
+            self._conn.commit()
+        return dict(fila)
+
+    def agregar_resultado(self, id_trabajo: str, orden: int, result: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO job_results (job, orden, resultado) VALUES (?, ?, ?)",
+                (id_trabajo, orden, json.dumps(result, ensure_ascii=False)),
+            )
+            self._conn.commit()
+
+    def terminar(self, id_trabajo: str, error: str = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET estado = ?, error = ?, terminado = ? WHERE id = ?",
+                ('failed' if error else 'done', error, time.time(), id_trabajo),
+            )
+            self._conn.commit()
+
+    def reencolar_interrumpidos(self) -> int:
+        """Devuelve a la cola los trabajos que quedaron a medias por un reinicio"""
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM job_results WHERE job IN (SELECT id FROM jobs WHERE estado = 'running')"
+            )
+            cursor = self._conn.execute(
+                "UPDATE jobs SET estado = 'queued', iniciado = NULL"
+                " WHERE estado = 'running'"
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def obtener(self, id_trabajo: str):
+        with self._lock:
+            fila = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (id_trabajo,)).fetchone()
+            filas = self._conn.execute(
+                "SELECT resultado FROM job_results WHERE job = ? ORDER BY orden", (id_trabajo,)
+            ).fetchall()
+        if fila is None:
+            return None
+
+        urls = json.loads(fila['urls'])
+        resultados = [json.loads(f['resultado']) for f in filas]
+        return {
+            'id': fila['id'],
+            'tipo': fila['tipo'],
+            'lane': fila['carril'],
+            'status': fila['estado'],
+            'total': len(urls),
+            'done': len(resultados),
+            'results': resultados,
+            'error_message': fila['error'],
+            'created_at': fila['creado'],
+            'started_at': fila['iniciado'],
+            'finished_at': fila['terminado'],
+        }
+
+    def stats(self) -> dict:
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT carril, estado, COUNT(*) AS n FROM jobs GROUP BY carril, estado"
+            ).fetchall()
+        stats = {}
+        for fila in filas:
+            stats.setdefault(fila['carril'], {})[fila['estado']] = fila['n']
+        return stats
+
+
+COLA_TRABAJOS = None
+_hay_trabajo = None
+_trabajadores = []
+
+
+def obtener_cola() -> ColaTrabajos:
+    global COLA_TRABAJOS
+    if COLA_TRABAJOS is None:
+        COLA_TRABAJOS = ColaTrabajos(config.JOBS_DB_PATH)
+    return COLA_TRABAJOS
+
+
+async def crear_trabajo(tipo: str, urls: list, carril: str) -> str:
+    id_trabajo = await asyncio.to_thread(obtener_cola().encolar, tipo, urls_unicas(tipo, urls), carril)
+    if _hay_trabajo is not None:
+        _hay_trabajo.set()
+    return id_trabajo
+
+
+async def _ejecutar_trabajo(cola: ColaTrabajos, trabajo: dict):
+    try:
+        orden = 0
+        async for result in scrapear_lote(trabajo['tipo'], json.loads(trabajo['urls'])):
+            # Resultados parciales visibles para quien consulta el trabajo
+            await asyncio.to_thread(cola.agregar_resultado, trabajo['id'], orden, result)
+            orden += 1
+        await asyncio.to_thread(cola.terminar, trabajo['id'])
+    except Exception as e:
+        await asyncio.to_thread(cola.terminar, trabajo['id'], str(e))
+
+
+async def _trabajador(carriles: list):
+    cola = obtener_cola()
+    while True:
+        # Limpiar antes de consultar: un encolado posterior siempre nos despierta
+        _hay_trabajo.clear()
+        trabajo = await asyncio.to_thread(cola.tomar_siguiente, carriles)
+        if trabajo is None:
+            try:
+                await asyncio.wait_for(_hay_trabajo.wait(), timeout=2.0)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        logger.info("Trabajo %s (%s) en curso", trabajo['id'], trabajo['carril'])
+        await _ejecutar_trabajo(cola, trabajo)
+
+
+async def iniciar_trabajadores():
+    """Arranca los trabajadores de la cola (al iniciar la API)"""
+    global _hay_trabajo
+    _hay_trabajo = asyncio.Event()
+
+    reencolados = await asyncio.to_thread(obtener_cola().reencolar_interrumpidos)
+    if reencolados:
+        logger.info("%d trabajos interrumpidos vuelven a la cola", reencolados)
+
+    n_interactivos = min(config.JOBS_INTERACTIVE_WORKERS, config.JOBS_WORKERS)
+    for i in range(config.JOBS_WORKERS):
+        # Los primeros atienden solo el carril interactivo; el resto, todos por prioridad
+        carriles = ['interactive'] if i < n_interactivos else list(CARRILES)
+        _trabajadores.append(asyncio.create_task(_trabajador(carriles)))
+
+
+async def detener_trabajadores():
+    for tarea in _trabajadores:
+        tarea.cancel()
+    await asyncio.gather(*_trabajadores, return_exceptions=True)
+    _trabajadores.clear()
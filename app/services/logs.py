@@ -0,0 +1,86 @@
+from logging.handlers import QueueHandler, QueueListener
+import atexit
+import json
+import logging
+import queue
+import time
+
+from app import config
+
+# Todos los loggers de la app cuelgan de "app"; los scrapers de "app.scrapers.<plataforma>"
+RAIZ = "app"
+
+_listener = None
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON compacta por registro"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        datos = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        datos.update(getattr(record, 'campos', {}))
+        if record.exc_info:
+            datos['exc'] = self.formatException(record.exc_info)
+        return json.dumps(datos, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+def obtener_logger(plataforma: str) -> logging.Logger:
+    """Logger de los scrapers de una plataforma (nivel propio por LOG_LEVEL_<PLATAFORMA>)"""
+    return logging.getLogger(f"{RAIZ}.scrapers.{plataforma}")
+
+
+def configurar_logging():
+    """
+    Envía los logs de la app a stdout a través de una cola: los hilos de
+    scraping solo encolan el registro y un hilo aparte hace la escritura.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    salida = logging.StreamHandler()
+    salida.setFormatter(FormatoJSON())
+
+    cola = queue.SimpleQueue()
+    _listener = QueueListener(cola, salida, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    raiz = logging.getLogger(RAIZ)
+    raiz.setLevel(config.LOG_LEVEL.upper())
+    raiz.addHandler(QueueHandler(cola))
+    raiz.propagate = False
+
+    niveles = {
+        'facebook': config.LOG_LEVEL_FACEBOOK,
+        'instagram': config.LOG_LEVEL_INSTAGRAM,
+        'tiktok': config.LOG_LEVEL_TIKTOK,
+    }
+    for plataforma, nivel in niveles.items():
+        obtener_logger(plataforma).setLevel(nivel.upper())
+
+
+def registrar_resumen(logger: logging.Logger, tipo: str, result: dict, inicio: float, metricas: tuple):
+    """
+    La única línea INFO por petición: resultado y duración en JSON compacto.
+    Sube a WARNING si hubo error o alguna de `metricas` quedó en cero.
+    """
+    cero = [m for m in metricas if result.get(m) == 0]
+    error = result.get('status') != 'success'
+
+    campos = {
+        'event': 'scrape',
+        'tipo': tipo,
+        'duration_ms': round((time.monotonic() - inicio) * 1000),
+        **result,
+    }
+    if cero:
+        campos['zero_metrics'] = cero
+
+    nivel = logging.WARNING if error or cero else logging.INFO
+    logger.log(nivel, "scrape", extra={'campos': campos})
@@ -0,0 +1,107 @@
+import functools
+import logging
+import re
+
+from app import config
+from app.services.detectors import Plataforma
+
+logger = logging.getLogger(__name__)
+
+# Extensiones de recursos que ningún contador necesita
+EXTENSIONES_BLOQUEADAS = [
+    # Imágenes
+    "png", "jpg", "jpeg", "gif", "webp", "avif", "ico", "bmp",
+    # Vídeo y audio (TikTok reproduce automáticamente)
+    "mp4", "webm", "m3u8", "m4s", "mp3", "m4a",
+    # Fuentes
+    "woff", "woff2", "ttf", "otf", "eot",
+]
+
+# Patrones de Network.setBlockedURLs: solo '*' es comodín y cubre toda la URL.
+# Van anclados (extensión al final de la ruta, host entre '://' y '/') para
+# no coincidir con la URL de un perfil o publicación como
+# 'instagram.com/the.iconic' o 'facebook.com/travelchannel'; el bloqueo
+# también se aplica al documento principal
+BLOQUEO_RECURSOS = [
+    patron for extension in EXTENSIONES_BLOQUEADAS
+    for patron in (f"*.{extension}", f"*.{extension}?*")
+] + ["*://*/video/tos/*"]
+
+# Dominios de analítica y publicidad
+BLOQUEO_RASTREADORES = [
+    "*://*google-analytics.com/*",
+    "*://*googletagmanager.com/*",
+    "*://*doubleclick.net/*",
+    "*://*googlesyndication.com/*",
+    "*://connect.facebook.net/*",
+    "*://www.facebook.com/tr?*",
+    "*://www.facebook.com/tr/*",
+    "*://analytics.tiktok.com/*",
+    "*://mon.tiktokv.com/*",
+    "*://mcs.tiktokv.com/*",
+    "*://mssdk*.tiktokw.us/*",
+    "*://*hotjar.com/*",
+    "*://*scorecardresearch.com/*",
+]
+
+# Flags de lanzamiento del navegador en modo página ligera
+ARGUMENTOS_NAVEGADOR = [
+    "--autoplay-policy=user-gesture-required",
+    "--mute-audio",
+]
+
+
+def _lista(valor: str) -> list:
+    return [p.strip() for p in valor.split(",") if p.strip()]
+
+
+PERMITIDOS = {
+    Plataforma.FACEBOOK: _lista(config.LEAN_PAGE_ALLOW_FACEBOOK),
+    Plataforma.INSTAGRAM: _lista(config.LEAN_PAGE_ALLOW_INSTAGRAM),
+    Plataforma.TIKTOK: _lista(config.LEAN_PAGE_ALLOW_TIKTOK),
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _expresion(patron: str) -> re.Pattern:
+    return re.compile('.*'.join(re.escape(parte) for parte in patron.split('*')), re.S)
+
+
+def coincide(patron: str, url: str) -> bool:
+    """Como compara Chrome en Network.setBlockedURLs: '*' es el único comodín"""
+    return _expresion(patron).fullmatch(url) is not None
+
+
+def patrones_bloqueados(plataforma: Plataforma, url: str = None) -> list:
+    """
+    Patrones a bloquear en `plataforma`, sin los de su lista de permitidos
+    ni, si se pasa `url`, los que bloquearían la propia página.
+    """
+    permitidos = set(PERMITIDOS.get(plataforma, []))
+    return [
+        p for p in BLOQUEO_RECURSOS + BLOQUEO_RASTREADORES
+        if p not in permitidos and not (url and coincide(p, url))
+    ]
+
+
+def preparar_pagina_ligera(driver, plataforma: Plataforma, url: str = None):
+    """
+    Activa el bloqueo de recursos por CDP antes de `driver.get(url)`.
+
+    El bloqueo queda activo en el driver, así que con drivers del pool solo se
+    reenvía cuando cambian los patrones (otra plataforma, o una URL que
+    coincidiría con alguno).
+    """
+    if not config.LEAN_PAGE:
+        return
+    patrones = patrones_bloqueados(plataforma, url)
+    if getattr(driver, '_pagina_ligera', None) == patrones:
+        return
+
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patrones})
+        driver._pagina_ligera = patrones
+    except Exception as e:
+        # Navegador sin CDP: se navega con la página completa
+        logger.warning("No se pudo activar el modo página ligera: %s", e)
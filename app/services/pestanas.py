@@ -0,0 +1,197 @@
+from selenium.common.exceptions import InvalidSessionIdException, NoSuchWindowException, WebDriverException
+import logging
+import threading
+import time
+
+from app import config
+from app.services.egreso import perfil_vigente
+from app.services.procesos import REAPER
+
+logger = logging.getLogger(__name__)
+
+# Marca el documento actual antes de navegar: cuando desaparece, ya cargó el siguiente
+SCRIPT_MARCAR = "window.__pestanaAnterior = true;"
+SCRIPT_ESTADO = "return [document.readyState, window.__pestanaAnterior === true];"
+
+
+class _Navegador:
+    """Un WebDriver real compartido por varias pestañas"""
+
+    def __init__(self, driver):
+        self.driver = driver
+        # Un solo comando a la vez: la ventana activa es estado global de la sesión
+        self.lock = threading.RLock()
+        self.actual = driver.current_window_handle
+        self.pestanas = 0
+        self.usos = 0
+        self.muerto = False
+        # Pestañas con una URL cargada (entre su get() y la limpieza al devolverla)
+        self.ocupadas = set()
+
+    def ocupar(self, handle: str):
+        """
+        El reaper solo sigue al driver real: el navegador cuenta como prestado
+        mientras alguna pestaña scrapea, y el préstamo se renueva en cada URL
+        """
+        self.ocupadas.add(handle)
+        REAPER.prestado(self.driver)
+
+    def desocupar(self, handle: str):
+        self.ocupadas.discard(handle)
+        if not self.ocupadas:
+            REAPER.devuelto(self.driver)
+
+    def activar(self, handle: str):
+        if self.actual != handle:
+            self.driver.switch_to.window(handle)
+            self.actual = handle
+
+
+class Pestana:
+    """
+    Se usa como un WebDriver: cada llamada toma el lock del navegador y cambia
+    antes a la ventana de la pestaña (switch_to.window). Así los scrapers
+    funcionan sin cambios, con las cargas solapadas y los comandos en serie.
+    """
+
+    def __init__(self, navegador: _Navegador, handle: str, gestor):
+        self._navegador = navegador
+        self._handle = handle
+        self._gestor = gestor
+
+    def __getattr__(self, nombre):
+        # Los atributos privados (p. ej. _pagina_ligera) son de la pestaña, no del driver
+        if nombre.startswith('_'):
+            raise AttributeError(nombre)
+
+        navegador = self._navegador
+        with navegador.lock:
+            navegador.activar(self._handle)
+            valor = getattr(navegador.driver, nombre)
+        if not callable(valor):
+            return valor
+
+        def en_pestana(*args, **kwargs):
+            with navegador.lock:
+                navegador.activar(self._handle)
+                return valor(*args, **kwargs)
+        return en_pestana
+
+    def get(self, url: str):
+        """Inicia la carga y espera fuera del lock, para que las otras pestañas sigan trabajando"""
+        navegador = self._navegador
+        with navegador.lock:
+            navegador.activar(self._handle)
+            if url != 'about:blank':
+                navegador.usos += 1
+                navegador.ocupar(self._handle)
+            else:
+                # Limpieza al devolverla al pool
+                navegador.desocupar(self._handle)
+            try:
+                navegador.driver.execute_script(SCRIPT_MARCAR)
+            except Exception:
+                pass
+            # Con pageLoadStrategy 'none' vuelve en cuanto empieza la navegación
+            navegador.driver.get(url)
+
+        limite = time.monotonic() + config.BROWSER_TABS_LOAD_TIMEOUT
+        while time.monotonic() < limite:
+            time.sleep(config.READY_POLL_INTERVAL)
+            try:
+                with navegador.lock:
+                    navegador.activar(self._handle)
+                    estado, anterior = navegador.driver.execute_script(SCRIPT_ESTADO)
+            except (InvalidSessionIdException, NoSuchWindowException):
+                raise
+            except WebDriverException:
+                # Sin contexto de ejecución mientras se cambia de documento: se sigue esperando
+                continue
+            if estado == 'complete' and not anterior:
+                return
+        # Igual que un page_load_timeout: se sigue con lo que haya cargado
+        logger.debug("Carga de %s sin completar tras %.0fs", url, config.BROWSER_TABS_LOAD_TIMEOUT)
+
+    def quit(self):
+        """Cierra solo esta ventana; el navegador se cierra con su última pestaña"""
+        self._gestor.cerrar_pestana(self)
+
+
+class GestorPestanas:
+    """
+    Reparte pestañas entre navegadores: abre una ventana nueva en un navegador
+    con sitio o lanza otro. Es la fábrica del BrowserPool en modo pestañas.
+
+    Un navegador deja de recibir pestañas tras POOL_MAX_USES cargas por
+    pestaña; se cierra cuando se reciclan todas las que tiene.
+    """
+
+    def __init__(self, nombre: str, crear, cerrar, por_navegador: int):
+        self.nombre = nombre
+        self._crear = crear
+        self._cerrar = cerrar
+        self.por_navegador = max(1, por_navegador)
+        self._lock = threading.Lock()
+        self._navegadores = []
+
+    def _disponible(self, navegador: _Navegador) -> bool:
+        return (
+            not navegador.muerto
+            and perfil_vigente(navegador.driver)
+            and navegador.pestanas < self.por_navegador
+            and navegador.usos < config.POOL_MAX_USES * self.por_navegador
+        )
+
+    def crear_pestana(self) -> Pestana:
+        with self._lock:
+            navegador = next((n for n in self._navegadores if self._disponible(n)), None)
+            if navegador is None:
+                driver = self._crear()
+                # El reaper no debe tratar al navegador como prestado: se prestan sus pestañas
+                REAPER.devuelto(driver)
+                navegador = _Navegador(driver)
+                self._navegadores.append(navegador)
+                # La ventana inicial es la primera pestaña
+                handle = navegador.actual
+            else:
+                try:
+                    with navegador.lock:
+                        navegador.driver.switch_to.new_window('window')
+                        handle = navegador.actual = navegador.driver.current_window_handle
+                except Exception:
+                    navegador.muerto = True
+                    raise
+            navegador.pestanas += 1
+        return Pestana(navegador, handle, self)
+
+    def cerrar_pestana(self, pestana: Pestana):
+        navegador = pestana._navegador
+        with navegador.lock:
+            navegador.desocupar(pestana._handle)
+        with self._lock:
+            navegador.pestanas -= 1
+            ultima = navegador.pestanas <= 0
+            if ultima:
+                self._navegadores.remove(navegador)
+
+        if ultima:
+            self._cerrar(navegador.driver)
+            return
+
+        try:
+            with navegador.lock:
+                navegador.activar(pestana._handle)
+                navegador.driver.close()
+                navegador.actual = None
+        except Exception as e:
+            # Navegador caído: sus otras pestañas fallarán al limpiarse y se reciclarán
+            navegador.muerto = True
+            logger.warning("No se pudo cerrar una pestaña de %s: %s", self.nombre, e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'browsers': len(self._navegadores),
+                'tabs_per_browser': self.por_navegador,
+                'tabs_open': sum(n.pestanas for n in self._navegadores),
+            }
@@ -0,0 +1,213 @@
+import logging
+import os
+import signal
+import threading
+import time
+
+from app import config
+from app.services.telemetria import PROCESOS
+
+logger = logging.getLogger(__name__)
+
+
+def _inicio_proceso(pid: int):
+    """
+    Instante de arranque del proceso (campo 22 de /proc/<pid>/stat), o None
+    si no existe o es un zombie (ya no ocupa memoria).
+    """
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            campos = f.read().rsplit(')', 1)[1].split()
+    except OSError:
+        return None
+    if not campos or campos[0] == 'Z':
+        return None
+    return int(campos[19])
+
+
+def _descendientes(pid: int) -> list:
+    hijos = {}
+    for entrada in os.listdir('/proc'):
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entrada}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        hijos.setdefault(ppid, []).append(int(entrada))
+
+    salida = []
+    pendientes = list(hijos.get(pid, []))
+    while pendientes:
+        actual = pendientes.pop()
+        salida.append(actual)
+        pendientes.extend(hijos.get(actual, []))
+    return salida
+
+
+def _arbol(pid: int) -> set:
+    """(pid, arranque) del proceso y sus descendientes; el arranque evita matar un PID reutilizado"""
+    if not os.path.isdir('/proc'):
+        return set()
+    procesos = set()
+    for p in [pid] + _descendientes(pid):
+        inicio = _inicio_proceso(p)
+        if inicio is not None:
+            procesos.add((p, inicio))
+    return procesos
+
+
+def _vivos(procesos: set) -> set:
+    return {(pid, inicio) for pid, inicio in procesos if _inicio_proceso(pid) == inicio}
+
+
+def _matar(procesos: set) -> int:
+    muertos = 0
+    for pid, inicio in procesos:
+        if _inicio_proceso(pid) != inicio:
+            continue
+        try:
+            os.kill(pid, signal.SIGKILL)
+            muertos += 1
+        except OSError:
+            pass
+    return muertos
+
+
+class _Registro:
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.procesos = set()
+        self.prestado_desde = time.monotonic()
+        self.cerrado_en = None
+
+
+class Reaper:
+    """
+    Lleva la cuenta de los procesos (driver + navegador) de cada WebDriver y
+    mata los que sobreviven a su petición:
+
+    - prestados más de REAPER_MAX_LEASE segundos sin pasar a otra URL
+      (la petición murió sin cerrarlo o el scrape se colgó);
+    - que siguen vivos REAPER_GRACE segundos después de quit().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._registros = {}
+        self._hilo = None
+        self._detener = threading.Event()
+        self._fugados = 0
+        self._recogidos = 0
+
+    def registrar(self, driver):
+        """Empieza a seguir un driver recién lanzado (cuenta como prestado)"""
+        proceso = getattr(getattr(driver, 'service', None), 'process', None)
+        if proceso is None:
+            return
+        registro = _Registro(proceso.pid)
+        # Foto del árbol ya mismo: tras quit() el navegador puede quedar huérfano y no colgar del driver
+        registro.procesos = _arbol(proceso.pid)
+        with self._lock:
+            self._registros[id(driver)] = registro
+
+    def prestado(self, driver):
+        with self._lock:
+            registro = self._registros.get(id(driver))
+            if registro is not None:
+                registro.prestado_desde = time.monotonic()
+
+    def devuelto(self, driver):
+        with self._lock:
+            registro = self._registros.get(id(driver))
+            if registro is not None:
+                registro.prestado_desde = None
+
+    def cerrado(self, driver):
+        """Tras quit(): los procesos que sigan vivos pasado REAPER_GRACE se matan"""
+        with self._lock:
+            registro = self._registros.get(id(driver))
+            if registro is not None:
+                registro.prestado_desde = None
+                registro.cerrado_en = time.monotonic()
+
+    def revisar(self):
+        """Una pasada del reaper; se puede llamar a mano o desde el hilo de fondo"""
+        ahora = time.monotonic()
+        with self._lock:
+            registros = list(self._registros.items())
+
+        for clave, registro in registros:
+            # El árbol se actualiza mientras vive: el navegador arranca después que el driver
+            registro.procesos |= _arbol(registro.pid)
+            vivos = _vivos(registro.procesos)
+
+            if registro.cerrado_en is not None:
+                if not vivos:
+                    self._olvidar(clave)
+                elif ahora - registro.cerrado_en >= config.REAPER_GRACE:
+                    self._recoger(clave, registro, vivos, "sigue vivo tras quit()")
+            elif not vivos:
+                self._olvidar(clave)
+            elif (
+                registro.prestado_desde is not None
+                and ahora - registro.prestado_desde >= config.REAPER_MAX_LEASE
+            ):
+                self._recoger(clave, registro, vivos, "prestado demasiado tiempo")
+
+    def matar_todo(self):
+        """Al apagar la API: ningún navegador sobrevive al proceso"""
+        with self._lock:
+            registros = list(self._registros.items())
+        for clave, registro in registros:
+            registro.procesos |= _arbol(registro.pid)
+            _matar(registro.procesos)
+            self._olvidar(clave)
+
+    def _recoger(self, clave, registro: _Registro, vivos: set, motivo: str):
+        muertos = _matar(vivos)
+        with self._lock:
+            self._fugados += 1
+            self._recogidos += muertos
+            self._registros.pop(clave, None)
+        PROCESOS.incrementar('leaked')
+        PROCESOS.incrementar('reaped', cantidad=muertos)
+        logger.warning("Driver %s %s: %d procesos terminados", registro.pid, motivo, muertos)
+
+    def _olvidar(self, clave):
+        with self._lock:
+            self._registros.pop(clave, None)
+
+    def _bucle(self):
+        while not self._detener.wait(config.REAPER_INTERVAL):
+            try:
+                self.revisar()
+            except Exception as e:
+                logger.warning("Error en el reaper: %s", e)
+
+    def iniciar(self):
+        if self._hilo is not None or not os.path.isdir('/proc'):
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="reaper", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'tracked': len(self._registros),
+                'leased': sum(1 for r in self._registros.values() if r.prestado_desde is not None),
+                'closing': sum(1 for r in self._registros.values() if r.cerrado_en is not None),
+                'leaked': self._fugados,
+                'reaped': self._recogidos,
+            }
+
+
+REAPER = Reaper()
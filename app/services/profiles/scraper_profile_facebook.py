@@ -1,36 +1,58 @@
-from selenium import webdriver
-from selenium.webdriver.edge.service import Service as EdgeService
-from selenium.webdriver.edge.options import Options as EdgeOptions
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import re
-import json
 import time
 
+from app import config
+from app.services.detectors import Plataforma
+from app.services.pagina_ligera import preparar_pagina_ligera
+from app.services.espera import esperar_contenido
+from app.services.extraccion import extraer_candidatos
+from app.services.diagnostico import capturar_diagnostico
+from app.services.contadores import a_entero
+from app.services.browser_pool import obtener_pool, crear_driver, cerrar_driver, navegador_de, PoolAgotadoError
+from app.services.logs import obtener_logger, registrar_resumen
+from app.services.ritmo import registrar_egreso
+from app.services.sesiones import restaurar_sesion, actualizar_sesion
+from app.services.telemetria import medir, medir_busqueda, registrar_total
+
+logger = obtener_logger('facebook')
+
 class ProfileFacebookScraper:
-    def __init__(self, headless=True):
-        edge_options = EdgeOptions()
-
-        # Modo headless (ocultar navegador)
-        if headless:
-            edge_options.add_argument("--headless=new")
-
-        # Configuraciones recomendadas
-        edge_options.add_argument("--no-sandbox")
-        edge_options.add_argument("--disable-dev-shm-usage")
-        edge_options.add_argument("--disable-gpu")
-        edge_options.add_argument("--disable-infobars")
-        edge_options.add_argument("--disable-extensions")
-        edge_options.add_argument("--window-size=1920,1080")
-        edge_options.add_argument(
-            "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
-            "(KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-        )
-
-        # Crear webdriver de Edge
-        service = EdgeService()  # usa el edgedriver del PATH
-        self.driver = webdriver.Edge(service=service, options=edge_options)
+    # Etiquetas de telemetría (plataforma, endpoint)
+    PLATAFORMA = 'facebook'
+    TIPO = 'profile'
+
+    # Elementos cuya presencia indica que los contadores ya se renderizaron
+    LOCALIZADORES_LISTO = [
+        (By.XPATH, "//a[contains(., 'seguidores')]/strong"),
+    ]
+
+    # Todo lo que leen los _find_*, obtenido en un solo execute_script
+    # {nombre: (xpath, atributo o None para el texto visible)}
+    CONSULTAS = {
+        'seguidores': ("//a[contains(., 'seguidores')]/strong", None),
+    }
+
+    def __init__(self, headless=True, usar_pool=True):
+        # En modo headless se toma prestado un navegador ya lanzado del pool
+        self._navegador = navegador_de(self.TIPO)
+        self._pool = obtener_pool(self._navegador) if headless and usar_pool else None
+        self._headless = headless
+
+        # El navegador se abre al extraer la primera URL (interpretar() no lo necesita)
+        self.driver = None
+        self.wait = None
+
+    def _abrir_navegador(self):
+        if self.driver is not None:
+            return
+
+        origen = 'pool' if self._pool else 'nuevo'
+        with medir(self.PLATAFORMA, self.TIPO, 'driver', origen):
+            if self._pool:
+                self.driver = self._pool.adquirir()
+            else:
+                self.driver = crear_driver(self._navegador, self._headless)
 
         self.wait = WebDriverWait(self.driver, 15)
     
@@ -39,19 +61,27 @@ class ProfileFacebookScraper:
         Extrae TODAS las métricas (likes y comentarios) en una sola carga de página
         usando la misma ventana y vista
         """
+        inicio = time.monotonic()
+
+        # Fuera del try: sin navegador libre la API responde 503, no un resultado de error
+        self._abrir_navegador()
+
         try:
-            print(f"🚀 Navegando a: {url}")
-            print("📊 Extrayendo TODAS las métricas en una sola ejecución...")
+            logger.debug("Navegando a: %s", url)
             
+            # Bloquear imágenes, vídeo, fuentes y rastreadores y cargar la sesión guardada antes de navegar
+            with medir(self.PLATAFORMA, self.TIPO, 'preparar'):
+                preparar_pagina_ligera(self.driver, Plataforma.FACEBOOK, url)
+                restaurar_sesion(self.driver, Plataforma.FACEBOOK)
+
             # Solo una carga de página
-            self.driver.get(url)
-            time.sleep(5)
-            
-            self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+            with medir(self.PLATAFORMA, self.TIPO, 'navegar'):
+                self.driver.get(url)
+
+            # Esperar a que aparezcan los contadores en lugar de una pausa fija
+            with medir(self.PLATAFORMA, self.TIPO, 'espera'):
+                esperar_contenido(self.driver, 'facebook_profile', self.LOCALIZADORES_LISTO, config.READY_TIMEOUT_FACEBOOK)
             
-            # Captura inicial
-            self.take_screenshot("pagina_cargada.png")
-            print("✅ Página cargada correctamente")
             
             # Hacer scroll para asegurar que todos los elementos estén visibles
             # print("🔄 Haciendo scroll para cargar contenido...")
@@ -61,34 +91,56 @@ class ProfileFacebookScraper:
             # self.take_screenshot("despues_scroll.png")
             
             # Extraer TODAS las métricas de la misma vista
-            print("\n🔍 Extrayendo métricas de la misma vista...")
-            followers = self._find_followers()
-            
+            with medir(self.PLATAFORMA, self.TIPO, 'candidatos', config.EXTRACTION_ENGINE):
+                candidatos = extraer_candidatos(self.driver, self.CONSULTAS)
+
             result = {
                 'url': url,
-                'followers': followers,
+                **self.interpretar(candidatos),
                 'status': 'success',
                 'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
             }
+
+            # Captura solo si algo salió mal o por muestreo (SCREENSHOT_MODE)
+            capturar_diagnostico(self.driver, 'facebook_profile', result, ('followers',))
+            registrar_resumen(logger, 'profile', result, inicio, ('followers',))
+            registrar_total(self.PLATAFORMA, self.TIPO, result, inicio)
+            registrar_egreso(self.driver, result)
+            actualizar_sesion(self.driver, Plataforma.FACEBOOK, result)
             
             return result
             
         except Exception as e:
-            return {
+            result = {
                 'url': url,
                 'likes': 0,
                 'followers': 0,
                 'status': 'error',
                 'error_message': str(e)
             }
+            capturar_diagnostico(self.driver, 'facebook_profile', result, ('followers',))
+            registrar_resumen(logger, 'profile', result, inicio, ('followers',))
+            registrar_total(self.PLATAFORMA, self.TIPO, result, inicio)
+            registrar_egreso(self.driver, result)
+            return result
     
+    def interpretar(self, candidatos: dict) -> dict:
+        """
+        Métricas a partir de los textos de CONSULTAS. No usa el navegador:
+        sirve igual para la página en vivo que para un HTML guardado.
+        """
+        self._candidatos = candidatos
+        return {
+            'followers': medir_busqueda(self, self.PLATAFORMA, self.TIPO, 'followers', self._find_followers),
+        }
+
     def _smart_scroll(self):
         """Hace scroll inteligente para cargar contenido"""
         scroll_positions = [100, 200, 300, 400, 500]
         
         for position in scroll_positions:
             self.driver.execute_script(f"window.scrollTo(0, {position});")
-            print(f"   Scroll a {position}px")
+            logger.debug("Scroll a %spx", position)
             time.sleep(1)
         
         # Scroll adicional si es necesario
@@ -98,52 +150,26 @@ class ProfileFacebookScraper:
     def _find_followers(self) -> int:
         """
         Extrae el número de seguidores de un perfil facebook
-        Soporta valores como: 123, 4.5K, 1.2M
+        Soporta valores como: 123, 4.5K, 1.2M, 12 mil, 3,4 mill.
         """
-        print("\n👥 BUSCANDO SEGUIDORES...")
 
         try:
             # Buscar el elemento que contiene el conteo
-            element = self.driver.find_element(
-                By.XPATH,
-                "//a[contains(., 'seguidores')]/strong"
-            )
+            raw = self._candidatos['seguidores'][0].strip()
+            logger.debug("Valor encontrado: %s", raw)
 
-            raw = element.text.strip()
-            print(f"   Valor encontrado: {raw}")
+            number = a_entero(raw)
+            if number is None:
+                raise ValueError(f"Contador no reconocido: {raw!r}")
 
-            # return self._convert_number(raw)
-            return raw
+            self._estrategia = 'seguidores'
+            return number
 
         except Exception as e:
-            print(f"   ❌ No se pudieron obtener los seguidores: {e}")
+            logger.debug("No se pudieron obtener los seguidores: %s", e)
             return 0
 
 
-    def _convert_number(self, value: str) -> int:
-        """
-        Convierte valores como:
-        - '16.6K' → 16600
-        - '1.2M'  → 1200000
-        - '850'   → 850
-        """
-        try:
-            value = value.lower().replace(",", "").strip()
-
-            if value.endswith("k"):
-                return int(float(value[:-1]) * 1000)
-
-            if value.endswith("m"):
-                return int(float(value[:-1]) * 1_000_000)
-
-            if value.endswith("b"):
-                return int(float(value[:-1]) * 1_000_000_000)
-
-            return int(float(value))
-
-        except:
-            return 0
-
     
     def analyze_page_content(self):
         """Función de análisis para debugging - muestra qué elementos hay en la página"""
@@ -177,9 +203,25 @@ class ProfileFacebookScraper:
         input()
     
     def close(self):
-        """Cierra el navegador"""
-        print("👋 Cerrando navegador...")
-        self.driver.quit()
+        """Cierra el navegador o lo devuelve al pool"""
+        if self.driver is None:
+            return
+
+        with medir(self.PLATAFORMA, self.TIPO, 'cerrar'):
+            if self._pool:
+                logger.debug("Devolviendo navegador al pool...")
+                self._pool.liberar(self.driver)
+            else:
+                logger.debug("Cerrando navegador...")
+                cerrar_driver(self.driver)
+
+        self.driver = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
         
     def get_profile(self, url: str) -> dict:
@@ -197,36 +239,21 @@ class ProfileFacebookScraper:
             ValueError: Si la URL no tiene el formato correcto.
             Exception: Cualquier error que ocurra durante la extracción de datos.
         """
-        print("\n" + "="*60)
-        print("🎯 INICIANDO EXTRACCIÓN PROFILE FACEBOOK EN UNA SOLA VENTANA")
-        print(f"🌐 URL: {url}")
-        print("="*60)
-
-        # 1. Validación de URL
-        if not url.startswith(('http://', 'https://')):
-            raise ValueError("❌ URL debe comenzar con http:// o https://")
-
         try:
+            # 1. Validación de URL
+            if not url.startswith(('http://', 'https://')):
+                raise ValueError("❌ URL debe comenzar con http:// o https://")
+
             # 2. Llamada al método de extracción central (simulado)
             # ¡SOLO UNA LLAMADA! Extrae todo en la misma página
-            result = self.extract_all_metrics_single_page_facebook(url)
-            
-            # 3. Mostrar y verificar resultados
-            print("\n" + "="*60)
-            print("📊 RESULTADOS OBTENIDOS")
-            print("="*60)
-            
-            json_result = json.dumps(result, indent=2, ensure_ascii=False)
-            print(json_result)
-            
-            if result.get('followers') == 0:
-                print("\n⚠️ Algunas métricas son cero. Verifica la URL o el estado de la sesión.")
-                
-            self.close()
-            
-            return result
-            
+            # (el resumen de la petición lo registra el propio método de extracción)
+            return self.extract_all_metrics_single_page_facebook(url)
+
+        except (ValueError, PoolAgotadoError):
+            raise
         except Exception as e:
             # Propaga cualquier error específico ocurrido durante la extracción
-            raise Exception(f"Error durante la extracción de datos: {e}")        
-        
\ No newline at end of file
+            raise Exception(f"Error durante la extracción de datos: {e}")
+        finally:
+            # El navegador se cierra (o vuelve al pool) también cuando algo falla
+            self.close()
@@ -0,0 +1,256 @@
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+
+from app import config
+from app.services.batch import ttl_de
+from app.services.browser_pool import PoolAgotadoError
+from app.services.cache import CACHE_RESULTADOS
+from app.services.detectors import Plataforma
+from app.services.executor import ejecutar, ColaLlenaError, EsperaAgotadaError
+from app.services.scrapers import scrapear_profile, scrapear_publicacion
+
+logger = logging.getLogger(__name__)
+
+FUNCIONES = {
+    'profile': scrapear_profile,
+    'publicacion': scrapear_publicacion,
+}
+
+
+def con_variacion(intervalo: float) -> float:
+    """`intervalo` ± SCHEDULER_JITTER, para que las URLs no se refresquen todas a la vez"""
+    return intervalo * (1 + random.uniform(-config.SCHEDULER_JITTER, config.SCHEDULER_JITTER))
+
+
+class ListaSeguimiento:
+    """URLs vigiladas con su intervalo de refresco, persistidas en SQLite"""
+
+    def __init__(self, ruta: str):
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seguimiento ("
+            " clave TEXT PRIMARY KEY,"
+            " tipo TEXT NOT NULL,"
+            " plataforma TEXT NOT NULL,"
+            " url TEXT NOT NULL,"
+            " intervalo REAL NOT NULL,"
+            " proximo REAL NOT NULL,"
+            " ultimo REAL,"
+            " estado TEXT,"
+            " fallos INTEGER NOT NULL DEFAULT 0,"
+            " creado REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS seguimiento_proximo ON seguimiento (proximo)")
+        self._conn.commit()
+
+        # Copia en memoria para consultar sin tocar el disco en cada petición de la API
+        self._intervalos = {
+            fila['clave']: fila['intervalo']
+            for fila in self._conn.execute("SELECT clave, intervalo FROM seguimiento")
+        }
+
+    def agregar(self, clave: str, tipo: str, plataforma: str, url: str, intervalo: float) -> dict:
+        """Añade o actualiza una URL. El primer refresco cae en un punto al azar del intervalo."""
+        ahora = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO seguimiento (clave, tipo, plataforma, url, intervalo, proximo, creado)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (clave) DO UPDATE SET"
+                "  intervalo = excluded.intervalo,"
+                "  proximo = MIN(proximo, ? + excluded.intervalo)",
+                (clave, tipo, plataforma, url, intervalo, ahora + random.uniform(0, intervalo), ahora, ahora),
+            )
+            self._conn.commit()
+            self._intervalos[clave] = intervalo
+            fila = self._conn.execute("SELECT * FROM seguimiento WHERE clave = ?", (clave,)).fetchone()
+        return self._a_dict(fila)
+
+    def quitar(self, clave: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM seguimiento WHERE clave = ?", (clave,))
+            self._conn.commit()
+            self._intervalos.pop(clave, None)
+        return cursor.rowcount > 0
+
+    def intervalo(self, clave: str):
+        """Intervalo de refresco de `clave`, o None si no está en seguimiento"""
+        return self._intervalos.get(clave)
+
+    def listar(self) -> list:
+        with self._lock:
+            filas = self._conn.execute("SELECT * FROM seguimiento ORDER BY proximo").fetchall()
+        return [self._a_dict(f) for f in filas]
+
+    def tomar_vencidas(self, limite: int) -> list:
+        """
+        Devuelve hasta `limite` URLs cuyo refresco ya tocaba y las aparta un
+        intervalo completo, para que no se vuelvan a tomar mientras se scrapean.
+        """
+        ahora = time.time()
+        with self._lock:
+            filas = self._conn.execute(
+                "SELECT * FROM seguimiento WHERE proximo <= ? ORDER BY proximo LIMIT ?",
+                (ahora, limite),
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE seguimiento SET proximo = ? WHERE clave = ?",
+                [(ahora + f['intervalo'], f['clave']) for f in filas],
+            )
+            self._conn.commit()
+        return [self._a_dict(f) for f in filas]
+
+    def terminar(self, clave: str, estado: str, proximo: float):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE seguimiento SET estado = ?, ultimo = ?, proximo = ?,"
+                " fallos = CASE WHEN ? = 'success' THEN 0 ELSE fallos + 1 END"
+                " WHERE clave = ?",
+                (estado, time.time(), proximo, estado, clave),
+            )
+            self._conn.commit()
+
+    def proximo(self):
+        """Instante del siguiente refresco pendiente, o None si la lista está vacía"""
+        with self._lock:
+            return self._conn.execute("SELECT MIN(proximo) FROM seguimiento").fetchone()[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            fila = self._conn.execute(
+                "SELECT COUNT(*) AS total,"
+                " SUM(CASE WHEN proximo <= ? THEN 1 ELSE 0 END) AS vencidas,"
+                " SUM(CASE WHEN fallos > 0 THEN 1 ELSE 0 END) AS con_fallos"
+                " FROM seguimiento",
+                (time.time(),),
+            ).fetchone()
+        return {'watched': fila['total'], 'due': fila['vencidas'] or 0, 'failing': fila['con_fallos'] or 0}
+
+    @staticmethod
+    def _a_dict(fila) -> dict:
+        return {
+            'url': fila['url'],
+            'tipo': fila['tipo'],
+            'platform': fila['plataforma'],
+            'interval_s': fila['intervalo'],
+            'next_refresh_at': fila['proximo'],
+            'last_refresh_at': fila['ultimo'],
+            'last_status': fila['estado'],
+            'failures': fila['fallos'],
+            'clave': fila['clave'],
+        }
+
+
+class Programador:
+    """
+    Refresca en segundo plano las URLs de la lista de seguimiento, con como
+    mucho SCHEDULER_CONCURRENCY scrapes a la vez: los navegadores trabajan a
+    ritmo constante en lugar de a ráfagas cuando se abren los dashboards.
+
+    Los resultados quedan en el historial (lo hace scrapear_*) y en la caché,
+    así que /profile y /publicacion los sirven sin scrapear.
+    """
+
+    def __init__(self, lista: ListaSeguimiento):
+        self.lista = lista
+        self._tarea = None
+        self._despertar = None
+        self._en_curso = set()
+        self._refrescos = 0
+        self._fallos = 0
+
+    def avisar(self):
+        """Despierta el bucle (p. ej. al añadir una URL a la lista)"""
+        if self._despertar is not None:
+            self._despertar.set()
+
+    async def _refrescar(self, entrada: dict):
+        plataforma = Plataforma(entrada['platform'])
+        tipo = entrada['tipo']
+        try:
+            result = await ejecutar(plataforma, FUNCIONES[tipo], plataforma, entrada['url'])
+        except (ColaLlenaError, EsperaAgotadaError, PoolAgotadoError) as e:
+            # La API tiene prioridad: sin hueco libre, se reintenta más tarde
+            result = {'status': 'error', 'error_message': str(e)}
+        except Exception as e:
+            result = {'status': 'error', 'error_message': str(e)}
+
+        if result.get('status') == 'success':
+            self._refrescos += 1
+            ttl = ttl_de(tipo)
+            if ttl > 0:
+                await CACHE_RESULTADOS.escribir(entrada['clave'], result, ttl)
+            proximo = time.time() + con_variacion(entrada['interval_s'])
+        else:
+            self._fallos += 1
+            logger.warning("Refresco de %s fallido: %s", entrada['url'], result.get('error_message'))
+            proximo = time.time() + min(config.SCHEDULER_RETRY, entrada['interval_s'])
+
+        await asyncio.to_thread(self.lista.terminar, entrada['clave'], result.get('status', 'error'), proximo)
+
+    def _terminada(self, tarea):
+        self._en_curso.discard(tarea)
+        self._despertar.set()
+
+    async def _bucle(self):
+        while True:
+            self._despertar.clear()
+
+            libres = config.SCHEDULER_CONCURRENCY - len(self._en_curso)
+            if libres > 0:
+                for entrada in await asyncio.to_thread(self.lista.tomar_vencidas, libres):
+                    tarea = asyncio.create_task(self._refrescar(entrada))
+                    self._en_curso.add(tarea)
+                    tarea.add_done_callback(self._terminada)
+
+            proximo = await asyncio.to_thread(self.lista.proximo)
+            espera = 30.0 if proximo is None else min(30.0, max(0.5, proximo - time.time()))
+            try:
+                await asyncio.wait_for(self._despertar.wait(), timeout=espera)
+            except asyncio.TimeoutError:
+                pass
+
+    def iniciar(self):
+        if self._tarea is not None:
+            return
+        self._despertar = asyncio.Event()
+        self._tarea = asyncio.create_task(self._bucle())
+
+    async def detener(self):
+        tareas = [t for t in [self._tarea, *self._en_curso] if t is not None]
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+        self._tarea = None
+        self._en_curso.clear()
+
+    def stats(self) -> dict:
+        return {
+            **self.lista.stats(),
+            'running': len(self._en_curso),
+            'refreshed': self._refrescos,
+            'failed': self._fallos,
+        }
+
+
+_programador = None
+_programador_lock = threading.Lock()
+
+
+def obtener_programador() -> Programador:
+    global _programador
+    with _programador_lock:
+        if _programador is None:
+            _programador = Programador(ListaSeguimiento(config.SCHEDULER_DB_PATH))
+        return _programador
@@ -1,24 +1,83 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import re
-import json
 import time
 
+from app import config
+from app.services.detectors import Plataforma
+from app.services.pagina_ligera import preparar_pagina_ligera
+from app.services.espera import esperar_contenido
+from app.services.extraccion import extraer_candidatos
+from app.services.diagnostico import capturar_diagnostico
+from app.services.contadores import patron, buscar, a_entero, CUALQUIERA
+from app.services.browser_pool import obtener_pool, crear_driver, cerrar_driver, navegador_de, PoolAgotadoError
+from app.services.logs import obtener_logger, registrar_resumen
+from app.services.ritmo import registrar_egreso
+from app.services.sesiones import restaurar_sesion, actualizar_sesion
+from app.services.telemetria import medir, medir_busqueda, registrar_total
+
+logger = obtener_logger('facebook')
+
 class FacebookScraper:
-    def __init__(self, headless=True):
-        chrome_options = Options()
-        
-        if headless:
-            chrome_options.add_argument('--headless=new')
-        
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
-        
-        self.driver = webdriver.Chrome(options=chrome_options)
+    # Etiquetas de telemetría (plataforma, endpoint)
+    PLATAFORMA = 'facebook'
+    TIPO = 'publicacion'
+
+    # Elementos cuya presencia indica que los contadores ya se renderizaron
+    LOCALIZADORES_LISTO = [
+        (By.XPATH, "//*[@aria-label[contains(., 'Me gusta')]]"),
+        (By.XPATH, "//span[contains(@class, 'x135b78x')]"),
+        (By.XPATH, "//*[contains(text(), 'Me gusta')]"),
+    ]
+
+    # Todo lo que leen los _find_*, obtenido en un solo execute_script
+    # {nombre: (xpath, atributo o None para el texto visible)}
+    CONSULTAS = {
+        'likes_aria': ("//*[@aria-label[contains(., 'Me gusta')]]", 'aria-label'),
+        'likes_span': ("//span[contains(@class, 'x135b78x')]", None),
+        'likes_texto': ("//*[contains(text(), 'Me gusta')]", None),
+        'likes_clase_x193': ("//span[contains(@class, 'x193iq5w')]", None),
+        'likes_div_like': ("//div[contains(@class, 'like')]", None),
+        'likes_a_like': ("//a[contains(@class, 'like')]", None),
+        'comentarios_texto': ("//*[contains(text(), 'comentarios') or contains(text(), 'comentario')]", None),
+        'comentarios_xdj266r': ("//span[contains(@class, 'xdj266r')]", None),
+        'comentarios_x14z9mp': ("//span[contains(@class, 'x14z9mp')]", None),
+        'comentarios_a_comment': ("//a[contains(@class, 'comment')]", None),
+        'comentarios_div_comment': ("//div[contains(@class, 'comment')]", None),
+        'shares_html_span': ("//span[contains(@class, 'html-span')]", None),
+        'shares_texto': ("//*[contains(text(), 'compart') or contains(text(), 'share')]", None),
+    }
+
+    # Contadores dentro de los textos de CONSULTAS (compilados una sola vez)
+    PATRONES = {
+        'likes_aria': patron(antes=r'Me gusta:\s*'),
+        'likes_texto': patron(despues=r'\s*Me gusta'),
+        'comentarios_texto': patron(despues=r'\s*comentarios'),
+        'shares_html_span': patron(
+            despues=r'\s*(?:\w*\s*){0,3}(?:compartido|compartieron|compartir|veces compartido)'
+        ),
+    }
+
+    def __init__(self, headless=True, usar_pool=True):
+        # En modo headless se toma prestado un navegador ya lanzado del pool
+        self._navegador = navegador_de(self.TIPO)
+        self._pool = obtener_pool(self._navegador) if headless and usar_pool else None
+        self._headless = headless
+
+        # El navegador se abre al extraer la primera URL (interpretar() no lo necesita)
+        self.driver = None
+        self.wait = None
+
+    def _abrir_navegador(self):
+        if self.driver is not None:
+            return
+
+        origen = 'pool' if self._pool else 'nuevo'
+        with medir(self.PLATAFORMA, self.TIPO, 'driver', origen):
+            if self._pool:
+                self.driver = self._pool.adquirir()
+            else:
+                self.driver = crear_driver(self._navegador, self._headless)
+
         self.wait = WebDriverWait(self.driver, 15)
     
     def extract_all_metrics_single_page_facebook(self, url: str) -> dict:
@@ -26,20 +85,27 @@ class FacebookScraper:
         Extrae TODAS las métricas (likes y comentarios) en una sola carga de página
         usando la misma ventana y vista
         """
+        inicio = time.monotonic()
+
+        # Fuera del try: sin navegador libre la API responde 503, no un resultado de error
+        self._abrir_navegador()
+
         try:
-            print(f"🚀 Navegando a: {url}")
-            print("📊 Extrayendo TODAS las métricas en una sola ejecución...")
-            
+            logger.debug("Navegando a %s", url)
+
+            # Bloquear imágenes, vídeo, fuentes y rastreadores y cargar la sesión guardada antes de navegar
+            with medir(self.PLATAFORMA, self.TIPO, 'preparar'):
+                preparar_pagina_ligera(self.driver, Plataforma.FACEBOOK, url)
+                restaurar_sesion(self.driver, Plataforma.FACEBOOK)
+
             # Solo una carga de página
-            self.driver.get(url)
-            time.sleep(5)
-            
-            self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-            
-            # Captura inicial
-            self.take_screenshot("pagina_cargada.png")
-            print("✅ Página cargada correctamente")
-            
+            with medir(self.PLATAFORMA, self.TIPO, 'navegar'):
+                self.driver.get(url)
+
+            # Esperar a que aparezcan los contadores en lugar de una pausa fija
+            with medir(self.PLATAFORMA, self.TIPO, 'espera'):
+                esperar_contenido(self.driver, 'facebook_post', self.LOCALIZADORES_LISTO, config.READY_TIMEOUT_FACEBOOK)
+
             # Hacer scroll para asegurar que todos los elementos estén visibles
             # print("🔄 Haciendo scroll para cargar contenido...")
             # self._smart_scroll()
@@ -48,26 +114,27 @@ class FacebookScraper:
             # self.take_screenshot("despues_scroll.png")
             
             # Extraer TODAS las métricas de la misma vista
-            print("\n🔍 Extrayendo métricas de la misma vista...")
-            likes = self._find_likes_facebook()
-            comments = self._find_comments_facebook()
-            
-            # También podemos extraer otras métricas si están disponibles
-            shares = self._find_shares()
-            
+            with medir(self.PLATAFORMA, self.TIPO, 'candidatos', config.EXTRACTION_ENGINE):
+                candidatos = extraer_candidatos(self.driver, self.CONSULTAS)
+
             result = {
                 'url': url,
-                'likes': likes,
-                'comments': comments,
-                'shares': shares,
+                **self.interpretar(candidatos),
                 'status': 'success',
                 'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
             }
+
+            # Captura solo si algo salió mal o por muestreo (SCREENSHOT_MODE)
+            capturar_diagnostico(self.driver, 'facebook_post', result, ('likes', 'comments'))
+            registrar_resumen(logger, 'publicacion', result, inicio, ('likes', 'comments'))
+            registrar_total(self.PLATAFORMA, self.TIPO, result, inicio)
+            registrar_egreso(self.driver, result)
+            actualizar_sesion(self.driver, Plataforma.FACEBOOK, result)
             
             return result
             
         except Exception as e:
-            return {
+            result = {
                 'url': url,
                 'likes': 0,
                 'comments': 0,
@@ -75,14 +142,31 @@ class FacebookScraper:
                 'status': 'error',
                 'error_message': str(e)
             }
+            capturar_diagnostico(self.driver, 'facebook_post', result, ('likes', 'comments'))
+            registrar_resumen(logger, 'publicacion', result, inicio, ('likes', 'comments'))
+            registrar_total(self.PLATAFORMA, self.TIPO, result, inicio)
+            registrar_egreso(self.driver, result)
+            return result
     
+    def interpretar(self, candidatos: dict) -> dict:
+        """
+        Métricas a partir de los textos de CONSULTAS. No usa el navegador:
+        sirve igual para la página en vivo que para un HTML guardado.
+        """
+        self._candidatos = candidatos
+        return {
+            'likes': medir_busqueda(self, self.PLATAFORMA, self.TIPO, 'likes', self._find_likes_facebook),
+            'comments': medir_busqueda(self, self.PLATAFORMA, self.TIPO, 'comments', self._find_comments_facebook),
+            'shares': medir_busqueda(self, self.PLATAFORMA, self.TIPO, 'shares', self._find_shares),
+        }
+
     def _smart_scroll(self):
         """Hace scroll inteligente para cargar contenido"""
         scroll_positions = [100, 200, 300, 400, 500]
         
         for position in scroll_positions:
             self.driver.execute_script(f"window.scrollTo(0, {position});")
-            print(f"   Scroll a {position}px")
+            logger.debug("Scroll a %spx", position)
             time.sleep(1)
         
         # Scroll adicional si es necesario
@@ -91,211 +175,174 @@ class FacebookScraper:
     
     def _find_likes_facebook(self) -> int:
         """Busca likes/reacciones en la vista actual de Facebook"""
-        print("\n❤️  BUSCANDO LIKES...")
-
         # ==============================
         # 1. Buscar por aria-label = "Me gusta: X personas"
         # ==============================
         try:
-            aria_elements = self.driver.find_elements(
-                By.XPATH, "//*[@aria-label[contains(., 'Me gusta')]]"
-            )
-            for el in aria_elements:
-                aria = el.get_attribute("aria-label")
-                print("   aria-label encontrado:", aria)
+            for aria in self._candidatos['likes_aria']:
+                logger.debug("aria-label encontrado: %s", aria)
 
                 # Ejemplo: "Me gusta: 134 personas"
-                match = re.search(r'Me gusta:\s*([\d\.]+)', aria)
-                if match:
-                    likes = int(match.group(1).replace('.', '').replace(',', ''))
-                    print(f"   ✅ LIKES ENCONTRADOS desde aria-label: {likes}")
+                likes = buscar(self.PATRONES['likes_aria'], aria)
+                if likes is not None:
+                    logger.debug("likes=%s (aria-label)", likes)
+                    self._estrategia = 'likes_aria'
                     return likes
 
         except Exception as e:
-            print(f"   Error buscando aria-label: {e}")
+            logger.debug("Error buscando aria-label: %s", e)
 
         # ==============================
         # 2. Buscar contador directo en <span class="x135b78x">148</span>
         # ==============================
         try:
-            count_spans = self.driver.find_elements(
-                By.XPATH, "//span[contains(@class, 'x135b78x')]"
-            )
-            for el in count_spans:
-                text = el.text.strip()
-                if text.isdigit():
-                    print(f"   ✅ LIKES ENCONTRADOS desde span.x135b78x: {text}")
-                    return int(text)
+            for text in self._candidatos['likes_span']:
+                likes = a_entero(text)
+                if likes is not None:
+                    logger.debug("likes=%s (span.x135b78x)", likes)
+                    self._estrategia = 'likes_span'
+                    return likes
         except Exception as e:
-            print(f"   Error buscando span count: {e}")
+            logger.debug("Error buscando span count: %s", e)
 
         # ==============================
         # 3. Tus estrategias originales (texto "Me gusta")
         # ==============================
         try:
-            elements_with_likes = self.driver.find_elements(
-                By.XPATH, "//*[contains(text(), 'Me gusta')]"
-            )
-            print(f"   Encontrados {len(elements_with_likes)} elementos con 'Me gusta'")
+            elements_with_likes = self._candidatos['likes_texto']
+            logger.debug("Encontrados %d elementos con 'Me gusta'", len(elements_with_likes))
             
-            for i, element in enumerate(elements_with_likes):
+            for i, full_text in enumerate(elements_with_likes):
                 try:
-                    full_text = element.text
                     if not full_text.strip():
                         continue
 
-                    print(f"   Elemento {i+1}: '{full_text}'")
+                    logger.debug("Elemento %d: %r", i + 1, full_text)
 
-                    match = re.search(r'(\d+[\d,\.]*)\s*Me gusta', full_text)
-                    if match:
-                        likes_str = match.group(1).replace(',', '').replace('.', '')
-                        print(f"   ✅ LIKES ENCONTRADOS: {likes_str}")
-                        return int(likes_str)
+                    likes = buscar(self.PATRONES['likes_texto'], full_text)
+                    if likes is not None:
+                        logger.debug("likes=%s (texto 'Me gusta')", likes)
+                        self._estrategia = 'likes_texto'
+                        return likes
 
                 except:
                     continue
 
         except Exception as e:
-            print(f"   Error en búsqueda de likes: {e}")
+            logger.debug("Error en búsqueda de likes: %s", e)
 
         # ==============================
         # 4. Búsqueda por clases genéricas con la palabra "like"
         # ==============================
         try:
-            like_selectors = [
-                "//span[contains(@class, 'x193iq5w')]",
-                "//div[contains(@class, 'like')]",
-                "//a[contains(@class, 'like')]"
-            ]
+            like_selectors = ['likes_clase_x193', 'likes_div_like', 'likes_a_like']
 
             for selector in like_selectors:
-                elements = self.driver.find_elements(By.XPATH, selector)
-                for el in elements:
-                    text = el.text
+                for text in self._candidatos[selector]:
                     if "Me gusta" in text:
-                        numbers = re.findall(r'\d+', text)
-                        if numbers:
-                            print(f"   ✅ LIKES ENCONTRADOS: {numbers[0]}")
-                            return int(numbers[0])
+                        likes = buscar(CUALQUIERA, text)
+                        if likes is not None:
+                            logger.debug("likes=%s (%s)", likes, selector)
+                            self._estrategia = selector
+                            return likes
 
         except Exception as e:
-            print(f"   Error en búsqueda alternativa de likes: {e}")
+            logger.debug("Error en búsqueda alternativa de likes: %s", e)
 
-        print("   ❌ No se encontraron likes")
+        logger.debug("No se encontraron likes")
         return 0
 
     
     def _find_comments_facebook(self) -> int:
         """Busca comentarios en la vista actual"""
-        print("\n💬 BUSCANDO COMENTARIOS...")
-        
         # Estrategia 1: Buscar por texto "comentarios"
         try:
-            elements_with_comments = self.driver.find_elements(By.XPATH, 
-                "//*[contains(text(), 'comentarios') or contains(text(), 'comentario')]")
-            print(f"   Encontrados {len(elements_with_comments)} elementos con 'comentarios'")
+            elements_with_comments = self._candidatos['comentarios_texto']
+            logger.debug("Encontrados %d elementos con 'comentarios'", len(elements_with_comments))
             
-            for i, element in enumerate(elements_with_comments):
+            for i, full_text in enumerate(elements_with_comments):
                 try:
-                    full_text = element.text
                     if full_text.strip():
-                        print(f"   Elemento {i+1}: '{full_text}'")
+                        logger.debug("Elemento %d: %r", i + 1, full_text)
                         
                         # Buscar "Ver los X comentarios" o "X comentarios"
-                        match = re.search(r'(\d+[\d,]*)\s*comentarios', full_text, re.IGNORECASE)
-                        if match:
-                            comments_str = match.group(1).replace(',', '')
-                            print(f"   ✅ COMENTARIOS ENCONTRADOS: {comments_str}")
-                            return int(comments_str)
+                        comments = buscar(self.PATRONES['comentarios_texto'], full_text)
+                        if comments is not None:
+                            logger.debug("comments=%s (texto 'comentarios')", comments)
+                            self._estrategia = 'comentarios_texto'
+                            return comments
                             
                 except Exception as e:
                     continue
                     
         except Exception as e:
-            print(f"   Error en búsqueda de comentarios: {e}")
+            logger.debug("Error en búsqueda de comentarios: %s", e)
         
         # Estrategia 2: Buscar por clases específicas de comentarios
         try:
             comment_selectors = [
-                "//span[contains(@class, 'xdj266r')]",
-                "//span[contains(@class, 'x14z9mp')]",
-                "//a[contains(@class, 'comment')]",
-                "//div[contains(@class, 'comment')]"
+                'comentarios_xdj266r',
+                'comentarios_x14z9mp',
+                'comentarios_a_comment',
+                'comentarios_div_comment',
             ]
             
             for selector in comment_selectors:
-                elements = self.driver.find_elements(By.XPATH, selector)
-                for element in elements:
-                    text = element.text
+                for text in self._candidatos[selector]:
                     if 'comentario' in text.lower():
-                        numbers = re.findall(r'\d+', text)
-                        if numbers:
-                            print(f"   ✅ COMENTARIOS ENCONTRADOS: {numbers[0]}")
-                            return int(numbers[0])
+                        comments = buscar(CUALQUIERA, text)
+                        if comments is not None:
+                            logger.debug("comments=%s (%s)", comments, selector)
+                            self._estrategia = selector
+                            return comments
                             
         except Exception as e:
-            print(f"   Error en búsqueda alternativa de comentarios: {e}")
+            logger.debug("Error en búsqueda alternativa de comentarios: %s", e)
         
-        print("   ❌ No se encontraron comentarios")
+        logger.debug("No se encontraron comentarios")
         return 0
     
     
     def _find_shares(self) -> int:
-        print("\n🔄 BUSCANDO SHARES...")
-
         # Estrategia 1: buscar exactamente la clase html-span que Facebook usa
         try:
-            share_elements = self.driver.find_elements(
-                By.XPATH,
-                "//span[contains(@class, 'html-span')]"
-            )
-
-            for el in share_elements:
-                text = el.text.strip().lower()
+            for text in self._candidatos['shares_html_span']:
+                text = text.strip().lower()
 
                 if not text:
                     continue
 
-                print("   Texto capturado:", text)
+                logger.debug("Texto capturado: %s", text)
 
                 # Detecta: "12 veces compartido", "12 compartido", etc.
-                match = re.search(
-                    r'(\d+[\d\.,]*)\s*(?:\w*\s*){0,3}(?:compartido|compartieron|compartir|veces compartido)',
-                    text,
-                    re.IGNORECASE
-                )
-
-                if match:
-                    num = match.group(1).replace(".", "").replace(",", "")
-                    print(f"   ✅ SHARES ENCONTRADOS: {num}")
-                    return int(num)
+                num = buscar(self.PATRONES['shares_html_span'], text)
+                if num is not None:
+                    logger.debug("shares=%s (html-span)", num)
+                    self._estrategia = 'shares_html_span'
+                    return num
 
         except Exception as e:
-            print("   Error buscando html-span:", e)
+            logger.debug("Error buscando html-span: %s", e)
 
         # Estrategia 2: fallback general
         try:
-            generic = self.driver.find_elements(
-                By.XPATH,
-                "//*[contains(text(), 'compart') or contains(text(), 'share')]"
-            )
-            for el in generic:
-                text = el.text.strip().lower()
+            for text in self._candidatos['shares_texto']:
+                text = text.strip().lower()
                 if not text:
                     continue
 
-                print("   Texto fallback:", text)
+                logger.debug("Texto fallback: %s", text)
 
-                match = re.search(r'(\d+[\d\.,]*)', text)
-                if match:
-                    num = match.group(1).replace(".", "").replace(",", "")
-                    print(f"   ✅ SHARES ENCONTRADOS (fallback): {num}")
-                    return int(num)
+                num = buscar(CUALQUIERA, text)
+                if num is not None:
+                    logger.debug("shares=%s (fallback)", num)
+                    self._estrategia = 'shares_texto'
+                    return num
 
         except:
             pass
 
-        print("   ❌ No se encontraron shares")
+        logger.debug("No se encontraron shares")
         return 0
 
     
@@ -331,9 +378,25 @@ class FacebookScraper:
         input()
     
     def close(self):
-        """Cierra el navegador"""
-        print("👋 Cerrando navegador...")
-        self.driver.quit()
+        """Cierra el navegador o lo devuelve al pool"""
+        if self.driver is None:
+            return
+
+        with medir(self.PLATAFORMA, self.TIPO, 'cerrar'):
+            if self._pool:
+                logger.debug("Devolviendo navegador al pool")
+                self._pool.liberar(self.driver)
+            else:
+                logger.debug("Cerrando navegador")
+                cerrar_driver(self.driver)
+
+        self.driver = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
         
     
     def get_metrics(self, url: str) -> dict:
@@ -351,35 +414,21 @@ class FacebookScraper:
             ValueError: Si la URL no tiene el formato correcto.
             Exception: Cualquier error que ocurra durante la extracción de datos.
         """
-        print("\n" + "="*60)
-        print("🎯 INICIANDO EXTRACCIÓN FACEBOOK EN UNA SOLA VENTANA")
-        print(f"🌐 URL: {url}")
-        print("="*60)
-
-        # 1. Validación de URL
-        if not url.startswith(('http://', 'https://')):
-            raise ValueError("❌ URL debe comenzar con http:// o https://")
-
         try:
+            # 1. Validación de URL
+            if not url.startswith(('http://', 'https://')):
+                raise ValueError("❌ URL debe comenzar con http:// o https://")
+
             # 2. Llamada al método de extracción central (simulado)
             # ¡SOLO UNA LLAMADA! Extrae todo en la misma página
-            result = self.extract_all_metrics_single_page_facebook(url)
-            
-            # 3. Mostrar y verificar resultados
-            print("\n" + "="*60)
-            print("📊 RESULTADOS OBTENIDOS")
-            print("="*60)
-            
-            json_result = json.dumps(result, indent=2, ensure_ascii=False)
-            print(json_result)
-            
-            if result.get('likes') == 0 or result.get('comments') == 0:
-                print("\n⚠️ Algunas métricas son cero. Verifica la URL o el estado de la sesión.")
-            
-            self.close()
-            
-            return result
-            
+            # (el resumen de la petición lo registra el propio método de extracción)
+            return self.extract_all_metrics_single_page_facebook(url)
+
+        except (ValueError, PoolAgotadoError):
+            raise
         except Exception as e:
             # Propaga cualquier error específico ocurrido durante la extracción
-            raise Exception(f"Error durante la extracción de datos: {e}")  
\ No newline at end of file
+            raise Exception(f"Error durante la extracción de datos: {e}")
+        finally:
+            # El navegador se cierra (o vuelve al pool) también cuando algo falla
+            self.close()
@@ -1,30 +1,82 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import re
-import json
 import time
 
+from app import config
+from app.services.detectors import Plataforma
+from app.services.pagina_ligera import preparar_pagina_ligera
+from app.services.espera import esperar_contenido
+from app.services.extraccion import extraer_candidatos
+from app.services.diagnostico import capturar_diagnostico
+from app.services.contadores import patron, buscar, CUALQUIERA
+from app.services.browser_pool import obtener_pool, crear_driver, cerrar_driver, navegador_de, PoolAgotadoError
+from app.services.logs import obtener_logger, registrar_resumen
+from app.services.ritmo import registrar_egreso
+from app.services.sesiones import restaurar_sesion, actualizar_sesion
+from app.services.telemetria import medir, medir_busqueda, registrar_total
+
+logger = obtener_logger('instagram')
+
 class InstagramScraper:
-    def __init__(self, headless=True):
-        chrome_options = Options()
-        
-        if headless:
-            chrome_options.add_argument('--headless=new')
-        
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
-        chrome_options.add_argument('--window-size=400,700')
-        chrome_options.add_argument('--disable-notifications')
-        
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        self.driver = webdriver.Chrome(options=chrome_options)
+    # Etiquetas de telemetría (plataforma, endpoint)
+    PLATAFORMA = 'instagram'
+    TIPO = 'publicacion'
+
+    # Elementos cuya presencia indica que los contadores ya se renderizaron
+    LOCALIZADORES_LISTO = [
+        (By.XPATH, "//*[contains(text(), 'Me gusta')]"),
+        (By.XPATH, "//*[contains(text(), 'comentario')]"),
+    ]
+
+    # Todo lo que leen los _find_*, obtenido en un solo execute_script
+    # {nombre: (xpath, atributo o None para el texto visible)}
+    CONSULTAS = {
+        'likes_texto': ("//*[contains(text(), 'Me gusta')]", None),
+        'likes_clase_x193': ("//span[contains(@class, 'x193iq5w')]", None),
+        'likes_div_like': ("//div[contains(@class, 'like')]", None),
+        'likes_a_like': ("//a[contains(@class, 'like')]", None),
+        'comentarios_texto': ("//*[contains(text(), 'comentarios') or contains(text(), 'comentario')]", None),
+        'comentarios_x1lliihq': ("//span[contains(@class, 'x1lliihq')]", None),
+        'comentarios_x1plvlek': ("//span[contains(@class, 'x1plvlek')]", None),
+        'comentarios_a_comment': ("//a[contains(@class, 'comment')]", None),
+        'comentarios_div_comment': ("//div[contains(@class, 'comment')]", None),
+        'shares_texto': ("//*[contains(text(), 'compartido') or contains(text(), 'compartir') or contains(text(), 'share')]", None),
+    }
+
+    # Contadores dentro de los textos de CONSULTAS (compilados una sola vez)
+    PATRONES = {
+        'likes_texto': patron(despues=r'\s*Me gusta'),
+        'comentarios_texto': patron(despues=r'\s*comentarios'),
+        'shares_texto': patron(despues=r'\s*(?:compartido|compartir|share)'),
+    }
+
+    def __init__(self, headless=True, usar_pool=True):
+        # En modo headless se toma prestado un navegador ya lanzado del pool
+        self._navegador = navegador_de(self.TIPO)
+        self._pool = obtener_pool(self._navegador) if headless and usar_pool else None
+        self._headless = headless
+
+        # El navegador se abre al extraer la primera URL (interpretar() no lo necesita)
+        self.driver = None
+        self.wait = None
+        self._tamano_original = None
+
+    def _abrir_navegador(self):
+        if self.driver is not None:
+            return
+
+        origen = 'pool' if self._pool else 'nuevo'
+        with medir(self.PLATAFORMA, self.TIPO, 'driver', origen):
+            if self._pool:
+                self.driver = self._pool.adquirir()
+            else:
+                self.driver = crear_driver(self._navegador, self._headless)
+
         self.wait = WebDriverWait(self.driver, 15)
+        # Vista móvil; el tamaño original se restaura en close() (el driver del pool es compartido)
+        if self._pool:
+            self._tamano_original = self.driver.get_window_size()
         self.driver.set_window_size(400, 700)
     
     def extract_all_metrics_single_page_instagram(self, url: str) -> dict:
@@ -32,19 +84,27 @@ class InstagramScraper:
         Extrae TODAS las métricas (likes y comentarios) en una sola carga de página
         usando la misma ventana y vista
         """
+        inicio = time.monotonic()
+
+        # Fuera del try: sin navegador libre la API responde 503, no un resultado de error
+        self._abrir_navegador()
+
         try:
-            print(f"🚀 Navegando a: {url}")
-            print("📊 Extrayendo TODAS las métricas en una sola ejecución...")
+            logger.debug("Navegando a: %s", url)
             
+            # Bloquear imágenes, vídeo, fuentes y rastreadores y cargar la sesión guardada antes de navegar
+            with medir(self.PLATAFORMA, self.TIPO, 'preparar'):
+                preparar_pagina_ligera(self.driver, Plataforma.INSTAGRAM, url)
+                restaurar_sesion(self.driver, Plataforma.INSTAGRAM)
+
             # Solo una carga de página
-            self.driver.get(url)
-            time.sleep(5)
-            
-            self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+            with medir(self.PLATAFORMA, self.TIPO, 'navegar'):
+                self.driver.get(url)
+
+            # Esperar a que aparezcan los contadores en lugar de una pausa fija
+            with medir(self.PLATAFORMA, self.TIPO, 'espera'):
+                esperar_contenido(self.driver, 'instagram_post', self.LOCALIZADORES_LISTO, config.READY_TIMEOUT_INSTAGRAM)
             
-            # Captura inicial
-            self.take_screenshot("pagina_cargada.png")
-            print("✅ Página cargada correctamente")
             
             # Hacer scroll para asegurar que todos los elementos estén visibles
             # print("🔄 Haciendo scroll para cargar contenido...")
@@ -54,26 +114,27 @@ class InstagramScraper:
             # self.take_screenshot("despues_scroll.png")
             
             # Extraer TODAS las métricas de la misma vista
-            print("\n🔍 Extrayendo métricas de la misma vista...")
-            likes = self._find_likes_instagram()
-            comments = self._find_comments_instagram()
-            
-            # También podemos extraer otras métricas si están disponibles
-            shares = self._find_shares()
-            
+            with medir(self.PLATAFORMA, self.TIPO, 'candidatos', config.EXTRACTION_ENGINE):
+                candidatos = extraer_candidatos(self.driver, self.CONSULTAS)
+
             result = {
                 'url': url,
-                'likes': likes,
-                'comments': comments,
-                'shares': shares,
+                **self.interpretar(candidatos),
                 'status': 'success',
                 'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
             }
+
+            # Captura solo si algo salió mal o por muestreo (SCREENSHOT_MODE)
+            capturar_diagnostico(self.driver, 'instagram_post', result, ('likes', 'comments'))
+            registrar_resumen(logger, 'publicacion', result, inicio, ('likes', 'comments'))
+            registrar_total(self.PLATAFORMA, self.TIPO, result, inicio)
+            registrar_egreso(self.driver, result)
+            actualizar_sesion(self.driver, Plataforma.INSTAGRAM, result)
             
             return result
             
         except Exception as e:
-            return {
+            result = {
                 'url': url,
                 'likes': 0,
                 'comments': 0,
@@ -81,14 +142,31 @@ class InstagramScraper:
                 'status': 'error',
                 'error_message': str(e)
             }
+            capturar_diagnostico(self.driver, 'instagram_post', result, ('likes', 'comments'))
+            registrar_resumen(logger, 'publicacion', result, inicio, ('likes', 'comments'))
+            registrar_total(self.PLATAFORMA, self.TIPO, result, inicio)
+            registrar_egreso(self.driver, result)
+            return result
     
+    def interpretar(self, candidatos: dict) -> dict:
+        """
+        Métricas a partir de los textos de CONSULTAS. No usa el navegador:
+        sirve igual para la página en vivo que para un HTML guardado.
+        """
+        self._candidatos = candidatos
+        return {
+            'likes': medir_busqueda(self, self.PLATAFORMA, self.TIPO, 'likes', self._find_likes_instagram),
+            'comments': medir_busqueda(self, self.PLATAFORMA, self.TIPO, 'comments', self._find_comments_instagram),
+            'shares': medir_busqueda(self, self.PLATAFORMA, self.TIPO, 'shares', self._find_shares),
+        }
+
     def _smart_scroll(self):
         """Hace scroll inteligente para cargar contenido"""
         scroll_positions = [100, 200, 300, 400, 500]
         
         for position in scroll_positions:
             self.driver.execute_script(f"window.scrollTo(0, {position});")
-            print(f"   Scroll a {position}px")
+            logger.debug("Scroll a %spx", position)
             time.sleep(1)
         
         # Scroll adicional si es necesario
@@ -96,131 +174,115 @@ class InstagramScraper:
     
     def _find_likes_instagram(self) -> int:
         """Busca likes en la vista actual"""
-        print("\n❤️  BUSCANDO LIKES...")
         
         # Estrategia 1: Buscar por texto "Me gusta"
         try:
-            elements_with_likes = self.driver.find_elements(By.XPATH, "//*[contains(text(), 'Me gusta')]")
-            print(f"   Encontrados {len(elements_with_likes)} elementos con 'Me gusta'")
+            elements_with_likes = self._candidatos['likes_texto']
+            logger.debug("Encontrados %s elementos con 'Me gusta'", len(elements_with_likes))
             
-            for i, element in enumerate(elements_with_likes):
+            for i, full_text in enumerate(elements_with_likes):
                 try:
-                    full_text = element.text
                     if full_text.strip():  # Solo si tiene texto
-                        print(f"   Elemento {i+1}: '{full_text}'")
+                        logger.debug("Elemento %s: %r", i + 1, full_text)
                         
-                        match = re.search(r'(\d+[\d,]*)\s*Me gusta', full_text)
-                        if match:
-                            likes_str = match.group(1).replace(',', '')
-                            print(f"   ✅ LIKES ENCONTRADOS: {likes_str}")
-                            return int(likes_str)
+                        likes = buscar(self.PATRONES['likes_texto'], full_text)
+                        if likes is not None:
+                            logger.debug("LIKES ENCONTRADOS: %s", likes)
+                            self._estrategia = 'likes_texto'
+                            return likes
                         
                 except Exception as e:
                     continue
                     
         except Exception as e:
-            print(f"   Error en búsqueda de likes: {e}")
+            logger.debug("Error en búsqueda de likes: %s", e)
         
         # Estrategia 2: Buscar elementos con clases específicas de likes
         try:
-            like_selectors = [
-                "//span[contains(@class, 'x193iq5w')]",
-                "//div[contains(@class, 'like')]",
-                "//a[contains(@class, 'like')]"
-            ]
+            like_selectors = ['likes_clase_x193', 'likes_div_like', 'likes_a_like']
             
             for selector in like_selectors:
-                elements = self.driver.find_elements(By.XPATH, selector)
-                for element in elements:
-                    text = element.text
+                for text in self._candidatos[selector]:
                     if 'Me gusta' in text:
-                        numbers = re.findall(r'\d+', text)
-                        if numbers:
-                            print(f"   ✅ LIKES ENCONTRADOS: {numbers[0]}")
-                            return int(numbers[0])
+                        likes = buscar(CUALQUIERA, text)
+                        if likes is not None:
+                            logger.debug("LIKES ENCONTRADOS: %s", likes)
+                            self._estrategia = selector
+                            return likes
                             
         except Exception as e:
-            print(f"   Error en búsqueda alternativa de likes: {e}")
+            logger.debug("Error en búsqueda alternativa de likes: %s", e)
         
-        print("   ❌ No se encontraron likes")
+        logger.debug("No se encontraron likes")
         return 0
     
     
     def _find_comments_instagram(self) -> int:
         """Busca comentarios en la vista actual"""
-        print("\n💬 BUSCANDO COMENTARIOS...")
         
         # Estrategia 1: Buscar por texto "comentarios"
         try:
-            elements_with_comments = self.driver.find_elements(By.XPATH, 
-                "//*[contains(text(), 'comentarios') or contains(text(), 'comentario')]")
-            print(f"   Encontrados {len(elements_with_comments)} elementos con 'comentarios'")
+            elements_with_comments = self._candidatos['comentarios_texto']
+            logger.debug("Encontrados %s elementos con 'comentarios'", len(elements_with_comments))
             
-            for i, element in enumerate(elements_with_comments):
+            for i, full_text in enumerate(elements_with_comments):
                 try:
-                    full_text = element.text
                     if full_text.strip():
-                        print(f"   Elemento {i+1}: '{full_text}'")
+                        logger.debug("Elemento %s: %r", i + 1, full_text)
                         
                         # Buscar "Ver los X comentarios" o "X comentarios"
-                        match = re.search(r'(\d+[\d,]*)\s*comentarios', full_text, re.IGNORECASE)
-                        if match:
-                            comments_str = match.group(1).replace(',', '')
-                            print(f"   ✅ COMENTARIOS ENCONTRADOS: {comments_str}")
-                            return int(comments_str)
+                        comments = buscar(self.PATRONES['comentarios_texto'], full_text)
+                        if comments is not None:
+                            logger.debug("COMENTARIOS ENCONTRADOS: %s", comments)
+                            self._estrategia = 'comentarios_texto'
+                            return comments
                             
                 except Exception as e:
                     continue
                     
         except Exception as e:
-            print(f"   Error en búsqueda de comentarios: {e}")
+            logger.debug("Error en búsqueda de comentarios: %s", e)
         
         # Estrategia 2: Buscar por clases específicas de comentarios
         try:
             comment_selectors = [
-                "//span[contains(@class, 'x1lliihq')]",
-                "//span[contains(@class, 'x1plvlek')]",
-                "//a[contains(@class, 'comment')]",
-                "//div[contains(@class, 'comment')]"
+                'comentarios_x1lliihq',
+                'comentarios_x1plvlek',
+                'comentarios_a_comment',
+                'comentarios_div_comment',
             ]
             
             for selector in comment_selectors:
-                elements = self.driver.find_elements(By.XPATH, selector)
-                for element in elements:
-                    text = element.text
+                for text in self._candidatos[selector]:
                     if 'comentario' in text.lower():
-                        numbers = re.findall(r'\d+', text)
-                        if numbers:
-                            print(f"   ✅ COMENTARIOS ENCONTRADOS: {numbers[0]}")
-                            return int(numbers[0])
+                        comments = buscar(CUALQUIERA, text)
+                        if comments is not None:
+                            logger.debug("COMENTARIOS ENCONTRADOS: %s", comments)
+                            self._estrategia = selector
+                            return comments
                             
         except Exception as e:
-            print(f"   Error en búsqueda alternativa de comentarios: {e}")
+            logger.debug("Error en búsqueda alternativa de comentarios: %s", e)
         
-        print("   ❌ No se encontraron comentarios")
+        logger.debug("No se encontraron comentarios")
         return 0
      
     
     def _find_shares(self) -> int:
         """Busca shares en la vista actual (si están disponibles)"""
-        print("\n🔄 BUSCANDO SHARES...")
         
         try:
-            elements_with_shares = self.driver.find_elements(By.XPATH,
-                "//*[contains(text(), 'compartido') or contains(text(), 'compartir') or contains(text(), 'share')]")
-            
-            for element in elements_with_shares:
-                text = element.text
-                match = re.search(r'(\d+[\d,]*)\s*(?:compartido|compartir|share)', text, re.IGNORECASE)
-                if match:
-                    shares_str = match.group(1).replace(',', '')
-                    print(f"   ✅ SHARES ENCONTRADOS: {shares_str}")
-                    return int(shares_str)
+            for text in self._candidatos['shares_texto']:
+                shares = buscar(self.PATRONES['shares_texto'], text)
+                if shares is not None:
+                    logger.debug("SHARES ENCONTRADOS: %s", shares)
+                    self._estrategia = 'shares_texto'
+                    return shares
                     
         except Exception as e:
-            print(f"   Error en búsqueda de shares: {e}")
+            logger.debug("Error en búsqueda de shares: %s", e)
         
-        print("   ❌ No se encontraron shares")
+        logger.debug("No se encontraron shares")
         return 0
     
     def analyze_page_content(self):
@@ -255,9 +317,37 @@ class InstagramScraper:
         input()
     
     def close(self):
-        """Cierra el navegador"""
-        print("👋 Cerrando navegador...")
-        self.driver.quit()
+        """Cierra el navegador o lo devuelve al pool"""
+        if self.driver is None:
+            return
+
+        with medir(self.PLATAFORMA, self.TIPO, 'cerrar'):
+            if self._pool:
+                logger.debug("Devolviendo navegador al pool...")
+                self._restaurar_tamano()
+                self._pool.liberar(self.driver)
+            else:
+                logger.debug("Cerrando navegador...")
+                cerrar_driver(self.driver)
+
+        self.driver = None
+
+    def _restaurar_tamano(self):
+        """Devuelve la ventana al tamaño que tenía al tomarla del pool"""
+        tamano, self._tamano_original = self._tamano_original, None
+        if tamano is None:
+            return
+        try:
+            self.driver.set_window_size(tamano['width'], tamano['height'])
+        except WebDriverException as e:
+            # Si no responde, liberar() lo detecta al limpiarlo y lo recicla
+            logger.debug("No se pudo restaurar el tamaño de la ventana: %s", e)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
 
     def get_metrics(self, url: str) -> dict:
@@ -275,35 +365,21 @@ class InstagramScraper:
             ValueError: Si la URL no tiene el formato correcto.
             Exception: Cualquier error que ocurra durante la extracción de datos.
         """
-        print("\n" + "="*60)
-        print("🎯 INICIANDO EXTRACCIÓN FACEBOOK EN UNA SOLA VENTANA")
-        print(f"🌐 URL: {url}")
-        print("="*60)
-
-        # 1. Validación de URL
-        if not url.startswith(('http://', 'https://')):
-            raise ValueError("❌ URL debe comenzar con http:// o https://")
-
         try:
+            # 1. Validación de URL
+            if not url.startswith(('http://', 'https://')):
+                raise ValueError("❌ URL debe comenzar con http:// o https://")
+
             # 2. Llamada al método de extracción central (simulado)
             # ¡SOLO UNA LLAMADA! Extrae todo en la misma página
-            result = self.extract_all_metrics_single_page_instagram(url)
-            
-            # 3. Mostrar y verificar resultados
-            print("\n" + "="*60)
-            print("📊 RESULTADOS OBTENIDOS")
-            print("="*60)
-            
-            json_result = json.dumps(result, indent=2, ensure_ascii=False)
-            print(json_result)
-            
-            if result.get('likes') == 0 or result.get('comments') == 0:
-                print("\n⚠️ Algunas métricas son cero. Verifica la URL o el estado de la sesión.")
-                
-            self.close()
-            
-            return result
-            
+            # (el resumen de la petición lo registra el propio método de extracción)
+            return self.extract_all_metrics_single_page_instagram(url)
+
+        except (ValueError, PoolAgotadoError):
+            raise
         except Exception as e:
             # Propaga cualquier error específico ocurrido durante la extracción
-            raise Exception(f"Error durante la extracción de datos: {e}")  
\ No newline at end of file
+            raise Exception(f"Error durante la extracción de datos: {e}")
+        finally:
+            # El navegador se cierra (o vuelve al pool) también cuando algo falla
+            self.close()
@@ -1,28 +1,63 @@
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-import re
-import json
 import time
 
+from app import config
+from app.services.detectors import Plataforma
+from app.services.pagina_ligera import preparar_pagina_ligera
+from app.services.espera import esperar_contenido
+from app.services.extraccion import extraer_candidatos
+from app.services.diagnostico import capturar_diagnostico
+from app.services.contadores import a_entero
+from app.services.browser_pool import obtener_pool, crear_driver, cerrar_driver, navegador_de, PoolAgotadoError
+from app.services.logs import obtener_logger, registrar_resumen
+from app.services.ritmo import registrar_egreso
+from app.services.sesiones import restaurar_sesion, actualizar_sesion
+from app.services.telemetria import medir, medir_busqueda, registrar_total
+from app.services.tiktok_http import extraer_publicacion_http
+
+logger = obtener_logger('tiktok')
+
 class TikTokScraper:
-    def __init__(self, headless=True):
-        chrome_options = Options()
-        
-        if headless:
-            chrome_options.add_argument('--headless=new')
-        
-        chrome_options.add_argument('--no-sandbox')
-        chrome_options.add_argument('--disable-dev-shm-usage')
-        chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')        
-        chrome_options.add_argument('--disable-notifications')
-        
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        self.driver = webdriver.Chrome(options=chrome_options)
+    # Etiquetas de telemetría (plataforma, endpoint)
+    PLATAFORMA = 'tiktok'
+    TIPO = 'publicacion'
+
+    # Elementos cuya presencia indica que los contadores ya se renderizaron
+    LOCALIZADORES_LISTO = [
+        (By.CSS_SELECTOR, "strong[data-e2e='like-count']"),
+    ]
+
+    # Todo lo que leen los _find_*, obtenido en un solo execute_script
+    # {nombre: (xpath, atributo o None para el texto visible)}
+    CONSULTAS = {
+        'likes': ("//strong[@data-e2e='like-count']", None),
+        'comentarios': ("//strong[@data-e2e='comment-count']", None),
+        'guardados': ("//strong[@data-e2e='undefined-count']", None),
+        'compartidos': ("//strong[@data-e2e='share-count']", None),
+    }
+
+    def __init__(self, headless=True, usar_pool=True):
+        # En modo headless se toma prestado un navegador ya lanzado del pool
+        self._navegador = navegador_de(self.TIPO)
+        self._pool = obtener_pool(self._navegador) if headless and usar_pool else None
+        self._headless = headless
+
+        # El navegador se abre solo si la vía HTTP no trae los contadores
+        self.driver = None
+        self.wait = None
+
+    def _abrir_navegador(self):
+        if self.driver is not None:
+            return
+
+        origen = 'pool' if self._pool else 'nuevo'
+        with medir(self.PLATAFORMA, self.TIPO, 'driver', origen):
+            if self._pool:
+                self.driver = self._pool.adquirir()
+            else:
+                self.driver = crear_driver(self._navegador, self._headless)
+
         self.wait = WebDriverWait(self.driver, 15)
     
         
@@ -31,19 +66,42 @@ class TikTokScraper:
         Extrae TODAS las métricas (likes y comentarios) en una sola carga de página
         usando la misma ventana y vista
         """
+        inicio = time.monotonic()
+
+        # Vía rápida: contadores del JSON embebido, sin navegador
+        if config.TIKTOK_HTTP:
+            with medir(self.PLATAFORMA, self.TIPO, 'http'):
+                metricas = extraer_publicacion_http(url)
+            if metricas is not None:
+                result = {
+                    'url': url,
+                    **metricas,
+                    'status': 'success',
+                    'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+                }
+                registrar_resumen(logger, 'publicacion', result, inicio, ('likes', 'comments'))
+                registrar_total(self.PLATAFORMA, self.TIPO, result, inicio)
+                return result
+
+        # Fuera del try: sin navegador libre la API responde 503, no un resultado de error
+        self._abrir_navegador()
+
         try:
-            print(f"🚀 Navegando a: {url}")
-            print("📊 Extrayendo TODAS las métricas en una sola ejecución...")
+            logger.debug("Navegando a: %s", url)
             
+            # Bloquear imágenes, vídeo, fuentes y rastreadores y cargar la sesión guardada antes de navegar
+            with medir(self.PLATAFORMA, self.TIPO, 'preparar'):
+                preparar_pagina_ligera(self.driver, Plataforma.TIKTOK, url)
+                restaurar_sesion(self.driver, Plataforma.TIKTOK)
+
             # Solo una carga de página
-            self.driver.get(url)
-            time.sleep(5)
-            
-            self.wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+            with medir(self.PLATAFORMA, self.TIPO, 'navegar'):
+                self.driver.get(url)
+
+            # Esperar a que aparezcan los contadores en lugar de una pausa fija
+            with medir(self.PLATAFORMA, self.TIPO, 'espera'):
+                esperar_contenido(self.driver, 'tiktok_post', self.LOCALIZADORES_LISTO, config.READY_TIMEOUT_TIKTOK)
             
-            # Captura inicial
-            self.take_screenshot("pagina_cargada.png")
-            print("✅ Página cargada correctamente")
             
             # Hacer scroll para asegurar que todos los elementos estén visibles
             # print("🔄 Haciendo scroll para cargar contenido...")
@@ -53,26 +111,27 @@ class TikTokScraper:
             # self.take_screenshot("despues_scroll.png")
             
             # Extraer TODAS las métricas de la misma vista
-            print("\n🔍 Extrayendo métricas de la misma vista...")
-            likes = self._find_likes_tiktok()
-            comments = self._find_comments_tiktok()
-            saves = self._find_saves_tiktok()
-            shares = self._find_shares_tiktok()
-            
+            with medir(self.PLATAFORMA, self.TIPO, 'candidatos', config.EXTRACTION_ENGINE):
+                candidatos = extraer_candidatos(self.driver, self.CONSULTAS)
+
             result = {
                 'url': url,
-                'likes': likes,
-                'comments': comments,
-                'saves': saves,
-                'shares': shares,
+                **self.interpretar(candidatos),
                 'status': 'success',
                 'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')
             }
+
+            # Captura solo si algo salió mal o por muestreo (SCREENSHOT_MODE)
+            capturar_diagnostico(self.driver, 'tiktok_post', result, ('likes', 'comments'))
+            registrar_resumen(logger, 'publicacion', result, inicio, ('likes', 'comments'))
+            registrar_total(self.PLATAFORMA, self.TIPO, result, inicio)
+            registrar_egreso(self.driver, result)
+            actualizar_sesion(self.driver, Plataforma.TIKTOK, result)
             
             return result
             
         except Exception as e:
-            return {
+            result = {
                 'url': url,
                 'likes': 0,
                 'comments': 0,
@@ -80,14 +139,32 @@ class TikTokScraper:
                 'status': 'error',
                 'error_message': str(e)
             }
+            capturar_diagnostico(self.driver, 'tiktok_post', result, ('likes', 'comments'))
+            registrar_resumen(logger, 'publicacion', result, inicio, ('likes', 'comments'))
+            registrar_total(self.PLATAFORMA, self.TIPO, result, inicio)
+            registrar_egreso(self.driver, result)
+            return result
     
+    def interpretar(self, candidatos: dict) -> dict:
+        """
+        Métricas a partir de los textos de CONSULTAS. No usa el navegador:
+        sirve igual para la página en vivo que para un HTML guardado.
+        """
+        self._candidatos = candidatos
+        return {
+            'likes': medir_busqueda(self, self.PLATAFORMA, self.TIPO, 'likes', self._find_likes_tiktok),
+            'comments': medir_busqueda(self, self.PLATAFORMA, self.TIPO, 'comments', self._find_comments_tiktok),
+            'saves': medir_busqueda(self, self.PLATAFORMA, self.TIPO, 'saves', self._find_saves_tiktok),
+            'shares': medir_busqueda(self, self.PLATAFORMA, self.TIPO, 'shares', self._find_shares_tiktok),
+        }
+
     def _smart_scroll(self):
         """Hace scroll inteligente para cargar contenido"""
         scroll_positions = [100, 200, 300, 400, 500]
         
         for position in scroll_positions:
             self.driver.execute_script(f"window.scrollTo(0, {position});")
-            print(f"   Scroll a {position}px")
+            logger.debug("Scroll a %spx", position)
             time.sleep(1)
         
         # Scroll adicional si es necesario
@@ -96,59 +173,42 @@ class TikTokScraper:
     
     def _find_likes_tiktok(self) -> int:
         """Extrae likes con el nuevo DOM de TikTok usando <strong data-e2e='like-count'>."""
-        print("\n BUSCANDO LIKES (Nuevo DOM TikTok)...")
 
         try:
-            strong = self.driver.find_element(
-                By.XPATH,
-                "//strong[@data-e2e='like-count']"
-            )
-
-            raw = strong.text.strip()  # Ej: "219", "1.3K", "2.5M"
-            print(f"   🔍 Texto encontrado en <strong>: {raw}")
+            raw = self._candidatos['likes'][0].strip()  # Ej: "219", "1.3K", "2.5M"
+            logger.debug("Texto encontrado en <strong>: %s", raw)
 
-            number = self._convert_tiktok_number(raw)
+            number = a_entero(raw)
+            if number is None:
+                raise ValueError(f"Contador no reconocido: {raw!r}")
 
-            print(f"   ✅ Likes extraídos: {number}")
+            logger.debug("Likes extraídos: %s", number)
+            self._estrategia = 'likes'
             return number
 
         except Exception as e:
-            print(f"   ❌ Error extrayendo likes: {e}")
+            logger.debug("Error extrayendo likes: %s", e)
 
         return 0
 
 
-    def _convert_tiktok_number(self, value: str) -> int:
-        value = value.upper().replace(",", "").strip()
-
-        if value.endswith("K"):
-            return int(float(value[:-1]) * 1000)
-        if value.endswith("M"):
-            return int(float(value[:-1]) * 1_000_000)
-
-        return int(float(value))
-
-    
     def _find_saves_tiktok(self) -> int:
         """Extrae la cantidad de guardados (Favoritos) usando el nuevo DOM de TikTok."""
-        print("\n💾 BUSCANDO GUARDADOS (Nuevo DOM TikTok)...")
 
         try:
-            strong = self.driver.find_element(
-                By.XPATH,
-                "//strong[@data-e2e='undefined-count']"
-            )
-
-            raw = strong.text.strip()  # Ej: "148", "1.2K", "3M"
-            print(f"   🔍 Texto encontrado en <strong>: {raw}")
+            raw = self._candidatos['guardados'][0].strip()  # Ej: "148", "1.2K", "3M"
+            logger.debug("Texto encontrado en <strong>: %s", raw)
 
-            number = self._convert_tiktok_number(raw)
+            number = a_entero(raw)
+            if number is None:
+                raise ValueError(f"Contador no reconocido: {raw!r}")
 
-            print(f"   ✅ Guardados extraídos: {number}")
+            logger.debug("Guardados extraídos: %s", number)
+            self._estrategia = 'guardados'
             return number
 
         except Exception as e:
-            print(f"   ❌ Error extrayendo guardados: {e}")
+            logger.debug("Error extrayendo guardados: %s", e)
 
         return 0
 
@@ -157,24 +217,21 @@ class TikTokScraper:
     
     def _find_comments_tiktok(self) -> int:
         """Extrae comentarios con el nuevo DOM de TikTok usando <strong data-e2e='comment-count'>."""
-        print("\n💬 BUSCANDO COMENTARIOS (Nuevo DOM TikTok)...")
 
         try:
-            strong = self.driver.find_element(
-                By.XPATH,
-                "//strong[@data-e2e='comment-count']"
-            )
-
-            raw = strong.text.strip()  # Ej: "21", "1.3K", "2.5M"
-            print(f"   🔍 Texto encontrado en <strong>: {raw}")
+            raw = self._candidatos['comentarios'][0].strip()  # Ej: "21", "1.3K", "2.5M"
+            logger.debug("Texto encontrado en <strong>: %s", raw)
 
-            number = self._convert_tiktok_number(raw)
+            number = a_entero(raw)
+            if number is None:
+                raise ValueError(f"Contador no reconocido: {raw!r}")
 
-            print(f"   ✅ Comentarios extraídos: {number}")
+            logger.debug("Comentarios extraídos: %s", number)
+            self._estrategia = 'comentarios'
             return number
 
         except Exception as e:
-            print(f"   ❌ Error extrayendo comentarios: {e}")
+            logger.debug("Error extrayendo comentarios: %s", e)
 
         return 0
 
@@ -182,24 +239,21 @@ class TikTokScraper:
     
     def _find_shares_tiktok(self) -> int:
         """Extrae la cantidad de compartidos usando el nuevo DOM de TikTok."""
-        print("\n🔗 BUSCANDO COMPARTIDOS (Nuevo DOM TikTok)...")
 
         try:
-            strong = self.driver.find_element(
-                By.XPATH,
-                "//strong[@data-e2e='share-count']"
-            )
+            raw = self._candidatos['compartidos'][0].strip()  # Ej: "21", "1.2K", "3M"
+            logger.debug("Texto encontrado en <strong>: %s", raw)
 
-            raw = strong.text.strip()  # Ej: "21", "1.2K", "3M"
-            print(f"   🔍 Texto encontrado en <strong>: {raw}")
+            number = a_entero(raw)
+            if number is None:
+                raise ValueError(f"Contador no reconocido: {raw!r}")
 
-            number = self._convert_tiktok_number(raw)
-
-            print(f"   ✅ Compartidos extraídos: {number}")
+            logger.debug("Compartidos extraídos: %s", number)
+            self._estrategia = 'compartidos'
             return number
 
         except Exception as e:
-            print(f"   ❌ Error extrayendo compartidos: {e}")
+            logger.debug("Error extrayendo compartidos: %s", e)
 
         return 0
 
@@ -237,9 +291,25 @@ class TikTokScraper:
         input()
     
     def close(self):
-        """Cierra el navegador"""
-        print("👋 Cerrando navegador...")
-        self.driver.quit()
+        """Cierra el navegador o lo devuelve al pool"""
+        if self.driver is None:
+            return
+
+        with medir(self.PLATAFORMA, self.TIPO, 'cerrar'):
+            if self._pool:
+                logger.debug("Devolviendo navegador al pool...")
+                self._pool.liberar(self.driver)
+            else:
+                logger.debug("Cerrando navegador...")
+                cerrar_driver(self.driver)
+
+        self.driver = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
 
     def get_metrics(self, url: str) -> dict:
@@ -257,35 +327,21 @@ class TikTokScraper:
             ValueError: Si la URL no tiene el formato correcto.
             Exception: Cualquier error que ocurra durante la extracción de datos.
         """
-        print("\n" + "="*60)
-        print("🎯 INICIANDO EXTRACCIÓN FACEBOOK EN UNA SOLA VENTANA")
-        print(f"🌐 URL: {url}")
-        print("="*60)
-
-        # 1. Validación de URL
-        if not url.startswith(('http://', 'https://')):
-            raise ValueError("❌ URL debe comenzar con http:// o https://")
-
         try:
+            # 1. Validación de URL
+            if not url.startswith(('http://', 'https://')):
+                raise ValueError("❌ URL debe comenzar con http:// o https://")
+
             # 2. Llamada al método de extracción central (simulado)
             # ¡SOLO UNA LLAMADA! Extrae todo en la misma página
-            result = self.extract_all_metrics_single_page_tiktok(url)
-            
-            # 3. Mostrar y verificar resultados
-            print("\n" + "="*60)
-            print("📊 RESULTADOS OBTENIDOS")
-            print("="*60)
-            
-            json_result = json.dumps(result, indent=2, ensure_ascii=False)
-            print(json_result)
-            
-            if result.get('likes') == 0 or result.get('comments') == 0:
-                print("\n⚠️ Algunas métricas son cero. Verifica la URL o el estado de la sesión.")
-                
-            self.close()
-            
-            return result
-            
+            # (el resumen de la petición lo registra el propio método de extracción)
+            return self.extract_all_metrics_single_page_tiktok(url)
+
+        except (ValueError, PoolAgotadoError):
+            raise
         except Exception as e:
             # Propaga cualquier error específico ocurrido durante la extracción
-            raise Exception(f"Error durante la extracción de datos: {e}")  
\ No newline at end of file
+            raise Exception(f"Error durante la extracción de datos: {e}")
+        finally:
+            # El navegador se cierra (o vuelve al pool) también cuando algo falla
+            self.close()
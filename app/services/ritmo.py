@@ -0,0 +1,140 @@
+from collections import deque
+import asyncio
+import logging
+import time
+
+from app import config
+from app.services.egreso import obtener_egreso, perfil_de
+from app.services.historial import metricas_de
+from app.services.telemetria import AJUSTES_CONCURRENCIA
+
+logger = logging.getLogger(__name__)
+
+
+class CubetaTokens:
+    """
+    Token bucket por plataforma: como mucho `por_minuto` scrapes por minuto,
+    con ráfagas de hasta `rafaga`. Con `por_minuto` = 0 no limita.
+    """
+
+    def __init__(self, nombre: str, por_minuto: float, rafaga: int):
+        self.nombre = nombre
+        self.por_segundo = por_minuto / 60
+        self.rafaga = max(1, rafaga)
+        self._tokens = float(self.rafaga)
+        self._actualizado = time.monotonic()
+        self._esperas = 0
+        self._espera_total = 0.0
+
+    def _rellenar(self):
+        ahora = time.monotonic()
+        self._tokens = min(self.rafaga, self._tokens + (ahora - self._actualizado) * self.por_segundo)
+        self._actualizado = ahora
+
+    async def tomar(self, timeout: float):
+        """
+        Espera un token. Sin await antes de reservarlo: quien llega antes sale antes.
+
+        Raises:
+            asyncio.TimeoutError: Si el token no llegaría antes de `timeout` segundos.
+        """
+        if self.por_segundo <= 0:
+            return
+
+        self._rellenar()
+        # Tokens negativos = reservas de quienes ya esperan
+        espera = max(0.0, (1 - self._tokens) / self.por_segundo)
+        if espera > timeout:
+            raise asyncio.TimeoutError()
+        self._tokens -= 1
+
+        if espera > 0:
+            self._esperas += 1
+            self._espera_total += espera
+            await asyncio.sleep(espera)
+
+    def stats(self) -> dict:
+        self._rellenar()
+        return {
+            'per_minute': round(self.por_segundo * 60, 2),
+            'burst': self.rafaga,
+            'tokens': round(self._tokens, 2),
+            'throttled': self._esperas,
+            'throttled_s': round(self._espera_total, 1),
+        }
+
+
+def es_malo(result: dict) -> bool:
+    """Error o todas las métricas en cero/vacías: lo que devuelve un muro de login"""
+    if result.get('status') != 'success':
+        return True
+    valores = metricas_de(result).values()
+    return not valores or all(v in (0, '0', '', None) for v in valores)
+
+
+def registrar_egreso(driver, result: dict):
+    """Apunta el resultado en la salud del perfil de salida con el que se lanzó `driver`"""
+    perfil = perfil_de(driver)
+    if perfil is not None:
+        obtener_egreso().registrar(perfil, es_malo(result))
+
+
+class ControladorAIMD:
+    """
+    Ajusta la concurrencia de una plataforma con AIMD: si en la ventana de
+    los últimos AIMD_WINDOW resultados la proporción de malos supera
+    AIMD_BAD_RATE, el límite se multiplica por AIMD_DECREASE; si con la
+    ventana llena queda por debajo de AIMD_GOOD_RATE, sube de uno en uno
+    hasta el máximo configurado.
+    """
+
+    def __init__(self, limite, maximo: int):
+        self.limite = limite
+        self.maximo = max(1, maximo)
+        self.minimo = max(1, min(config.AIMD_MIN_CONCURRENCY, self.maximo))
+        self._ventana = deque(maxlen=max(1, config.AIMD_WINDOW))
+        self._bajadas = 0
+        self._subidas = 0
+
+    def registrar(self, result: dict):
+        if not config.AIMD_ENABLED:
+            return
+
+        self._ventana.append(es_malo(result))
+        tasa = sum(self._ventana) / len(self._ventana)
+        actual = self.limite.limite
+
+        # Bastan unos pocos resultados para bajar; para subir hace falta la ventana entera
+        if tasa > config.AIMD_BAD_RATE and len(self._ventana) >= min(5, self._ventana.maxlen):
+            nuevo = max(self.minimo, int(actual * config.AIMD_DECREASE))
+            if nuevo < actual:
+                self._ajustar(nuevo, 'down', tasa)
+            # Se vuelve a medir con la concurrencia nueva
+            self._ventana.clear()
+        elif len(self._ventana) == self._ventana.maxlen and tasa < config.AIMD_GOOD_RATE:
+            if actual < self.maximo:
+                self._ajustar(actual + 1, 'up', tasa)
+            self._ventana.clear()
+
+    def _ajustar(self, nuevo: int, direccion: str, tasa: float):
+        logger.log(
+            logging.WARNING if direccion == 'down' else logging.INFO,
+            "Concurrencia de %s: %d -> %d (resultados malos %.0f%%)",
+            self.limite.nombre, self.limite.limite, nuevo, tasa * 100,
+        )
+        self.limite.ajustar(nuevo)
+        AJUSTES_CONCURRENCIA.incrementar(self.limite.nombre, direccion)
+        if direccion == 'down':
+            self._bajadas += 1
+        else:
+            self._subidas += 1
+
+    def stats(self) -> dict:
+        return {
+            'max_limit': self.maximo,
+            'min_limit': self.minimo,
+            'window': len(self._ventana),
+            'bad_in_window': sum(self._ventana),
+            'decreases': self._bajadas,
+            'increases': self._subidas,
+        }
@@ -0,0 +1,58 @@
+from app.services.detectors import Plataforma
+from app.services.historial import registrar_resultado
+from app.services.procesos import REAPER
+from app.services.profiles.scraper_profile_facebook import ProfileFacebookScraper
+from app.services.profiles.scraper_profile_instagram import ProfileInstagramScraper
+from app.services.profiles.scraper_profile_tiktok import ProfileTikTokScraper
+
+from app.services.publicaciones.scraper_facebook import FacebookScraper
+from app.services.publicaciones.scraper_instagram import InstagramScraper
+from app.services.publicaciones.scraper_tiktok1 import TikTokScraper
+
+
+SCRAPERS_PROFILE = {
+    Plataforma.FACEBOOK: ProfileFacebookScraper,
+    Plataforma.INSTAGRAM: ProfileInstagramScraper,
+    Plataforma.TIKTOK: ProfileTikTokScraper,
+}
+
+SCRAPERS_PUBLICACION = {
+    Plataforma.FACEBOOK: FacebookScraper,
+    Plataforma.INSTAGRAM: InstagramScraper,
+    Plataforma.TIKTOK: TikTokScraper,
+}
+
+
+def scrapear_profile(plataforma: Plataforma, url: str) -> dict:
+    """Scrapea un perfil de forma síncrona (se ejecuta en un hilo del executor)"""
+    with SCRAPERS_PROFILE[plataforma]() as service:
+        result = service.get_profile(url)
+    registrar_resultado('profile', plataforma.value, url, result)
+    return result
+
+
+def scrapear_publicacion(plataforma: Plataforma, url: str) -> dict:
+    """Scrapea una publicación de forma síncrona (se ejecuta en un hilo del executor)"""
+    with SCRAPERS_PUBLICACION[plataforma]() as service:
+        result = service.get_metrics(url)
+    registrar_resultado('publicacion', plataforma.value, url, result)
+    return result
+
+
+# Método de extracción de cada plataforma (mismo nombre en perfiles y publicaciones)
+METODOS_EXTRACCION = {
+    Plataforma.FACEBOOK: 'extract_all_metrics_single_page_facebook',
+    Plataforma.INSTAGRAM: 'extract_all_metrics_single_page_instagram',
+    Plataforma.TIKTOK: 'extract_all_metrics_single_page_tiktok',
+}
+
+
+def extraer(service, plataforma: Plataforma, url: str) -> dict:
+    """Extrae una URL con un scraper ya abierto, sin cerrar su navegador"""
+    # Lotes y trabajos usan el mismo driver para muchas URLs: el préstamo se
+    # renueva en cada una para que el reaper solo mate los que se cuelgan
+    if service.driver is not None:
+        REAPER.prestado(service.driver)
+    result = getattr(service, METODOS_EXTRACCION[plataforma])(url)
+    registrar_resultado(service.TIPO, plataforma.value, url, result)
+    return result
@@ -0,0 +1,300 @@
+from typing import NamedTuple
+from urllib.parse import urlsplit
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from app import config
+from app.services.detectors import Plataforma, plataforma_de_host
+from app.services.egreso import cookies_cdp, perfil_de
+from app.services.ritmo import es_malo
+
+logger = logging.getLogger(__name__)
+
+# Cookies que identifican la sesión: su caducidad es la de la sesión guardada
+COOKIES_SESION = {
+    Plataforma.FACEBOOK: {'c_user', 'xs', 'datr'},
+    Plataforma.INSTAGRAM: {'sessionid', 'csrftoken'},
+    Plataforma.TIKTOK: {'sessionid', 'ttwid'},
+}
+
+# Rutas a las que redirige la plataforma cuando no acepta la sesión
+RUTAS_INTERSTICIAL = {
+    Plataforma.FACEBOOK: ('/login', '/checkpoint', '/privacy/consent', '/cookie/consent'),
+    Plataforma.INSTAGRAM: ('/accounts/login', '/challenge', '/accounts/suspended', '/consent'),
+    Plataforma.TIKTOK: ('/login',),
+}
+
+# Rellena el localStorage guardado en cuanto se crea el documento, antes que los
+# scripts de la página; solo en el origen del que salió y sin pisar lo que haya
+SCRIPT_ALMACENAMIENTO = """
+(function () {
+  if (location.hostname !== %(origen)s) return;
+  var datos = %(datos)s;
+  try {
+    for (var clave in datos) {
+      if (localStorage.getItem(clave) === null) localStorage.setItem(clave, datos[clave]);
+    }
+  } catch (e) {}
+})();
+"""
+
+SCRIPT_LEER_ALMACENAMIENTO = "return Object.assign({}, window.localStorage);"
+
+
+class Sesion(NamedTuple):
+    cookies: list
+    # localStorage de `origen` (el host desde el que se guardó)
+    almacenamiento: dict
+    origen: str
+    guardado: float
+    caduca: float
+
+    def vigente(self, ahora: float = None) -> bool:
+        return (time.time() if ahora is None else ahora) < self.caduca
+
+
+def caducidad(plataforma: Plataforma, cookies: list, guardado: float) -> float:
+    """Primera caducidad entre las cookies de sesión, como mucho SESSION_MAX_AGE después de guardar"""
+    nombres = COOKIES_SESION.get(plataforma, set())
+    expiraciones = [c['expiry'] for c in cookies if c.get('name') in nombres and c.get('expiry')]
+    return min([guardado + config.SESSION_MAX_AGE] + expiraciones)
+
+
+def es_intersticial(plataforma: Plataforma, url: str) -> bool:
+    """La página actual es un muro de login, un desafío o un aviso de consentimiento"""
+    try:
+        partes = urlsplit(url or '')
+    except ValueError:
+        return False
+    if plataforma_de_host(partes.hostname) != plataforma:
+        return False
+    return partes.path.startswith(RUTAS_INTERSTICIAL.get(plataforma, ()))
+
+
+class AlmacenSesiones:
+    """
+    Estado de sesión (cookies y localStorage) por plataforma y perfil de
+    salida, en SQLite con copia en memoria: restaurar no toca el disco.
+    """
+
+    def __init__(self, ruta: str):
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(ruta, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sesiones ("
+            " plataforma TEXT NOT NULL,"
+            " egreso TEXT NOT NULL,"
+            " cookies TEXT NOT NULL,"
+            " almacenamiento TEXT NOT NULL,"
+            " origen TEXT NOT NULL,"
+            " guardado REAL NOT NULL,"
+            " caduca REAL NOT NULL,"
+            " PRIMARY KEY (plataforma, egreso))"
+        )
+        self._conn.commit()
+
+        self._sesiones = {
+            (plataforma, egreso): Sesion(json.loads(cookies), json.loads(almacenamiento), origen, guardado, caduca)
+            for plataforma, egreso, cookies, almacenamiento, origen, guardado, caduca in self._conn.execute(
+                "SELECT plataforma, egreso, cookies, almacenamiento, origen, guardado, caduca FROM sesiones"
+            )
+        }
+        self._restauradas = 0
+        self._guardadas = 0
+        self._caducadas = 0
+        self._rechazadas = 0
+
+    def obtener(self, plataforma: str, egreso: str):
+        """Sesión vigente o None; las caducadas se borran al encontrarlas"""
+        with self._lock:
+            sesion = self._sesiones.get((plataforma, egreso))
+        if sesion is None or sesion.vigente():
+            return sesion
+        logger.info("Sesión de %s (%s) caducada", plataforma, egreso)
+        self.borrar(plataforma, egreso, sesion.guardado)
+        with self._lock:
+            self._caducadas += 1
+        return None
+
+    def pendiente(self, plataforma: str, egreso: str) -> bool:
+        """Hay que guardar: no hay sesión, es antigua o está a punto de caducar"""
+        with self._lock:
+            sesion = self._sesiones.get((plataforma, egreso))
+        if sesion is None:
+            return True
+        ahora = time.time()
+        return (
+            ahora - sesion.guardado >= config.SESSION_SAVE_INTERVAL
+            or sesion.caduca - ahora <= config.SESSION_REFRESH_MARGIN
+        )
+
+    def guardar(self, plataforma: str, egreso: str, sesion: Sesion):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sesiones (plataforma, egreso, cookies, almacenamiento, origen, guardado, caduca)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (plataforma, egreso, json.dumps(sesion.cookies), json.dumps(sesion.almacenamiento),
+                 sesion.origen, sesion.guardado, sesion.caduca),
+            )
+            self._conn.commit()
+            self._sesiones[(plataforma, egreso)] = sesion
+            self._guardadas += 1
+
+    def borrar(self, plataforma: str, egreso: str, guardado: float = None):
+        """Borra la sesión; con `guardado`, solo si sigue siendo esa (no una más nueva)"""
+        with self._lock:
+            actual = self._sesiones.get((plataforma, egreso))
+            if actual is None or (guardado is not None and actual.guardado != guardado):
+                return
+            self._conn.execute(
+                "DELETE FROM sesiones WHERE plataforma = ? AND egreso = ?", (plataforma, egreso)
+            )
+            self._conn.commit()
+            del self._sesiones[(plataforma, egreso)]
+
+    def contar(self, evento: str):
+        with self._lock:
+            if evento == 'restaurada':
+                self._restauradas += 1
+            elif evento == 'rechazada':
+                self._rechazadas += 1
+
+    def stats(self) -> dict:
+        ahora = time.time()
+        with self._lock:
+            return {
+                'stored': {
+                    f"{plataforma}/{egreso}": {
+                        'cookies': len(s.cookies),
+                        'age_s': round(ahora - s.guardado),
+                        'expires_in_s': round(s.caduca - ahora),
+                    }
+                    for (plataforma, egreso), s in self._sesiones.items()
+                },
+                'restored': self._restauradas,
+                'saved': self._guardadas,
+                'expired': self._caducadas,
+                'rejected': self._rechazadas,
+            }
+
+
+_sesiones = None
+_sesiones_lock = threading.Lock()
+
+
+def obtener_sesiones() -> AlmacenSesiones:
+    global _sesiones
+    with _sesiones_lock:
+        if _sesiones is None:
+            _sesiones = AlmacenSesiones(config.SESSION_DB_PATH)
+        return _sesiones
+
+
+def _egreso_de(driver) -> str:
+    perfil = perfil_de(driver)
+    return perfil.nombre if perfil is not None else 'directo'
+
+
+def restaurar_sesion(driver, plataforma: Plataforma):
+    """
+    Carga en el driver la sesión guardada de `plataforma` antes de `driver.get`:
+    cookies por Network.setCookies y localStorage con un script que corre al
+    crear cada documento. Así la primera navegación ya llega a la página de
+    contenido y no a un aviso o un muro de login.
+
+    Como preparar_pagina_ligera, queda hecho en el driver: con drivers del
+    pool solo se repite cuando hay una sesión más nueva que la aplicada.
+    """
+    if not config.SESSION_ENABLED:
+        return
+
+    almacen = obtener_sesiones()
+    sesion = almacen.obtener(plataforma.value, _egreso_de(driver))
+    aplicadas = getattr(driver, '_sesiones', None) or {}
+    anterior = aplicadas.get(plataforma)
+    if sesion is None or (anterior is not None and anterior[0] == sesion.guardado):
+        return
+
+    ahora = time.time()
+    cookies = [c for c in sesion.cookies if not c.get('expiry') or c['expiry'] > ahora]
+    try:
+        if cookies:
+            driver.execute_cdp_cmd('Network.setCookies', {'cookies': cookies_cdp(cookies)})
+        if anterior is not None and anterior[1]:
+            driver.execute_cdp_cmd('Page.removeScriptToEvaluateOnNewDocument', {'identifier': anterior[1]})
+        script = None
+        if sesion.almacenamiento:
+            respuesta = driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+                'source': SCRIPT_ALMACENAMIENTO % {
+                    'origen': json.dumps(sesion.origen),
+                    'datos': json.dumps(sesion.almacenamiento),
+                },
+            })
+            script = respuesta.get('identifier')
+    except Exception as e:
+        # Navegador sin CDP: se navega como sesión anónima
+        logger.warning("No se pudo restaurar la sesión de %s: %s", plataforma.value, e)
+        return
+
+    aplicadas[plataforma] = (sesion.guardado, script)
+    driver._sesiones = aplicadas
+    almacen.contar('restaurada')
+
+
+def actualizar_sesion(driver, plataforma: Plataforma, result: dict):
+    """
+    Tras un scrape: si la plataforma redirigió a un intersticial, la sesión
+    aplicada ya no sirve y se borra; si el resultado es bueno y toca, se
+    guarda la sesión actual del navegador (refresco de cookies rotadas).
+    """
+    if not config.SESSION_ENABLED or driver is None:
+        return
+
+    almacen = obtener_sesiones()
+    egreso = _egreso_de(driver)
+    try:
+        url = driver.current_url
+        if es_intersticial(plataforma, url):
+            aplicada = (getattr(driver, '_sesiones', None) or {}).pop(plataforma, None)
+            if aplicada is not None:
+                logger.warning("La sesión de %s (%s) acabó en %s: se descarta", plataforma.value, egreso, url)
+                almacen.borrar(plataforma.value, egreso, aplicada[0])
+                almacen.contar('rechazada')
+            return
+
+        if es_malo(result) or not almacen.pendiente(plataforma.value, egreso):
+            return
+
+        # get_cookies() solo devuelve las del dominio de la página actual
+        cookies = [
+            c for c in driver.get_cookies()
+            if plataforma_de_host(c.get('domain', '').lstrip('.')) == plataforma
+        ]
+        if not cookies:
+            return
+        almacenamiento = driver.execute_script(SCRIPT_LEER_ALMACENAMIENTO) or {}
+    except Exception as e:
+        logger.debug("No se pudo leer la sesión de %s: %s", plataforma.value, e)
+        return
+
+    ahora = time.time()
+    sesion = Sesion(cookies, almacenamiento, urlsplit(url).hostname, ahora, caducidad(plataforma, cookies, ahora))
+    try:
+        almacen.guardar(plataforma.value, egreso, sesion)
+    except sqlite3.Error as e:
+        logger.warning("No se pudo guardar la sesión de %s: %s", plataforma.value, e)
+        return
+
+    # Este driver ya tiene esa sesión: no hace falta restaurársela
+    aplicadas = getattr(driver, '_sesiones', None) or {}
+    anterior = aplicadas.get(plataforma)
+    aplicadas[plataforma] = (ahora, anterior[1] if anterior else None)
+    driver._sesiones = aplicadas
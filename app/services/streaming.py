@@ -0,0 +1,79 @@
+import asyncio
+import json
+import time
+
+from app import config
+
+FIN = object()
+
+
+async def _bombear(origen, cola: asyncio.Queue):
+    try:
+        async for item in origen:
+            await cola.put(item)
+    finally:
+        await cola.put(FIN)
+
+
+async def con_progreso(resultados, total: int, intervalo: float = None):
+    """
+    Intercala frames de progreso entre los resultados de un lote.
+
+    Se emite un frame cada `intervalo` segundos aunque no llegue ningún
+    resultado (mantiene viva la conexión frente a proxies) y uno final al terminar.
+
+    Yields:
+        tuple: ('result', dict) o ('progress', dict).
+    """
+    intervalo = config.STREAM_PROGRESS_INTERVAL if intervalo is None else intervalo
+    cola = asyncio.Queue()
+    bomba = asyncio.create_task(_bombear(resultados, cola))
+
+    inicio = time.monotonic()
+    hechos = 0
+    errores = 0
+
+    def progreso() -> dict:
+        return {
+            'done': hechos,
+            'total': total,
+            'errors': errores,
+            'elapsed_s': round(time.monotonic() - inicio, 1),
+        }
+
+    try:
+        proximo = inicio + intervalo
+        while True:
+            try:
+                item = await asyncio.wait_for(cola.get(), timeout=max(0.0, proximo - time.monotonic()))
+            except asyncio.TimeoutError:
+                yield 'progress', progreso()
+                proximo = time.monotonic() + intervalo
+                continue
+
+            if item is FIN:
+                break
+
+            hechos += 1
+            if item.get('status') != 'success':
+                errores += 1
+            yield 'result', item
+
+        yield 'progress', progreso()
+    finally:
+        # Cliente desconectado: cancelar la bomba cierra el generador del lote
+        bomba.cancel()
+
+
+async def como_ndjson(frames):
+    """Una línea JSON por resultado; los frames de progreso llevan "event": "progress"."""
+    async for tipo, datos in frames:
+        if tipo == 'progress':
+            datos = {'event': 'progress', **datos}
+        yield json.dumps(datos, ensure_ascii=False) + "\n"
+
+
+async def como_sse(frames):
+    """Server-Sent Events: `event: result` por URL y `event: progress` periódicos."""
+    async for tipo, datos in frames:
+        yield f"event: {tipo}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
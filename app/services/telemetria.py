@@ -0,0 +1,151 @@
+from contextlib import contextmanager
+import bisect
+import threading
+import time
+
+# Límites (segundos) de los buckets: desde un _find_* en memoria hasta una carga lenta
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+
+def _formatear_etiquetas(nombres: tuple, valores: tuple, extra: str = '') -> str:
+    pares = [f'{n}="{v}"' for n, v in zip(nombres, valores)]
+    if extra:
+        pares.append(extra)
+    return '{' + ','.join(pares) + '}' if pares else ''
+
+
+class Histograma:
+    """Histograma acumulado por combinación de etiquetas, en formato Prometheus"""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple, buckets: tuple = BUCKETS):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observar(self, segundos: float, *valores):
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * len(self.buckets), 0.0, 0]
+            indice = bisect.bisect_left(self.buckets, segundos)
+            if indice < len(self.buckets):
+                serie[0][indice] += 1
+            serie[1] += segundos
+            serie[2] += 1
+
+    def exportar(self) -> list:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        with self._lock:
+            series = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+
+        for valores, (conteos, suma, total) in series:
+            acumulado = 0
+            for limite, conteo in zip(self.buckets, conteos):
+                acumulado += conteo
+                etiquetas = _formatear_etiquetas(self.etiquetas, valores, f'le="{limite}"')
+                lineas.append(f"{self.nombre}_bucket{etiquetas} {acumulado}")
+            etiquetas = _formatear_etiquetas(self.etiquetas, valores, 'le="+Inf"')
+            lineas.append(f"{self.nombre}_bucket{etiquetas} {total}")
+            etiquetas = _formatear_etiquetas(self.etiquetas, valores)
+            lineas.append(f"{self.nombre}_sum{etiquetas} {suma:.6f}")
+            lineas.append(f"{self.nombre}_count{etiquetas} {total}")
+        return lineas
+
+
+class Contador:
+    """Contador por combinación de etiquetas, en formato Prometheus"""
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas: tuple):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = etiquetas
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def incrementar(self, *valores, cantidad: float = 1):
+        with self._lock:
+            self._series[valores] = self._series.get(valores, 0) + cantidad
+
+    def exportar(self) -> list:
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} counter"]
+        with self._lock:
+            series = sorted(self._series.items())
+        for valores, total in series:
+            lineas.append(f"{self.nombre}{_formatear_etiquetas(self.etiquetas, valores)} {total}")
+        return lineas
+
+
+LATENCIA_ETAPAS = Histograma(
+    'scraper_stage_seconds',
+    'Duración de cada etapa del scraping',
+    ('platform', 'endpoint', 'stage', 'strategy'),
+)
+
+RESULTADOS = Contador(
+    'scraper_results_total',
+    'Extracciones terminadas por estado',
+    ('platform', 'endpoint', 'status'),
+)
+
+PROCESOS = Contador(
+    'browser_processes_total',
+    'Navegadores que sobrevivieron a su petición (leaked) y procesos terminados (reaped)',
+    ('event',),
+)
+
+AJUSTES_CONCURRENCIA = Contador(
+    'scraper_concurrency_adjustments_total',
+    'Cambios del límite de concurrencia hechos por el controlador AIMD',
+    ('platform', 'direction'),
+)
+
+EXPULSIONES_EGRESO = Contador(
+    'scraper_egress_evictions_total',
+    'Perfiles de salida expulsados por acumular páginas bloqueadas',
+    ('profile',),
+)
+
+_REGISTRO = [LATENCIA_ETAPAS, RESULTADOS, PROCESOS, AJUSTES_CONCURRENCIA, EXPULSIONES_EGRESO]
+
+
+@contextmanager
+def medir(plataforma: str, endpoint: str, etapa: str, estrategia: str = ''):
+    """Mide el bloque `with` como una observación de la etapa (aunque lance excepción)"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        LATENCIA_ETAPAS.observar(time.perf_counter() - inicio, plataforma, endpoint, etapa, estrategia)
+
+
+def medir_busqueda(scraper, plataforma: str, endpoint: str, metrica: str, buscar):
+    """
+    Ejecuta un _find_* y registra su duración con la estrategia que dio el
+    valor: el _find_* la deja en `scraper._estrategia` antes de devolver.
+    """
+    scraper._estrategia = 'ninguna'
+    inicio = time.perf_counter()
+    try:
+        return buscar()
+    finally:
+        LATENCIA_ETAPAS.observar(
+            time.perf_counter() - inicio, plataforma, endpoint, f'find_{metrica}', scraper._estrategia
+        )
+
+
+def registrar_total(plataforma: str, endpoint: str, result: dict, inicio: float):
+    """Duración completa de una extracción (desde `inicio`, time.monotonic) y su estado"""
+    estado = result.get('status', 'error')
+    LATENCIA_ETAPAS.observar(time.monotonic() - inicio, plataforma, endpoint, 'total', '')
+    RESULTADOS.incrementar(plataforma, endpoint, estado)
+
+
+def exportar_metricas() -> str:
+    """Todas las métricas en el formato de texto de Prometheus"""
+    lineas = []
+    for metrica in _REGISTRO:
+        lineas.extend(metrica.exportar())
+    return "\n".join(lineas) + "\n"
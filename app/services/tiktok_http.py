@@ -0,0 +1,152 @@
+from requests.adapters import HTTPAdapter
+import json
+import re
+import threading
+
+import requests
+
+from app import config
+from app.services.browser_pool import USER_AGENT
+from app.services.logs import obtener_logger
+
+logger = obtener_logger('tiktok')
+
+# TikTok renderiza en el servidor el estado de la página dentro de uno de estos <script>
+SCRIPTS_ESTADO = ('__UNIVERSAL_DATA_FOR_REHYDRATION__', 'SIGI_STATE')
+
+_PATRONES_SCRIPT = {
+    nombre: re.compile(r'<script[^>]*\bid="' + nombre + r'"[^>]*>(.*?)</script>', re.S)
+    for nombre in SCRIPTS_ESTADO
+}
+
+CABECERAS = {
+    'User-Agent': USER_AGENT,
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'es-ES,es;q=0.9,en;q=0.8',
+}
+
+_sesion = None
+_sesion_lock = threading.Lock()
+
+
+def obtener_sesion() -> requests.Session:
+    """Sesión compartida: reutiliza las conexiones keep-alive entre peticiones"""
+    global _sesion
+    with _sesion_lock:
+        if _sesion is None:
+            sesion = requests.Session()
+            adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=config.TIKTOK_HTTP_POOL)
+            sesion.mount('https://', adaptador)
+            sesion.mount('http://', adaptador)
+            sesion.headers.update(CABECERAS)
+            _sesion = sesion
+        return _sesion
+
+
+def datos_embebidos(html: str):
+    """
+    Devuelve (nombre del script, JSON) del primer bloque de estado encontrado
+    en el HTML, o (None, None) si la página no trae ninguno.
+    """
+    for nombre, patron in _PATRONES_SCRIPT.items():
+        match = patron.search(html)
+        if not match:
+            continue
+        try:
+            return nombre, json.loads(match.group(1))
+        except ValueError:
+            continue
+    return None, None
+
+
+def _primero(estadisticas: dict, *claves):
+    for clave in claves:
+        if estadisticas.get(clave) is not None:
+            return int(estadisticas[clave])
+    raise KeyError(claves[0])
+
+
+def metricas_publicacion(nombre: str, datos: dict):
+    """Contadores de un vídeo a partir del estado embebido, o None si no están"""
+    try:
+        if nombre == '__UNIVERSAL_DATA_FOR_REHYDRATION__':
+            item = datos['__DEFAULT_SCOPE__']['webapp.video-detail']['itemInfo']['itemStruct']
+        else:
+            item = next(iter(datos['ItemModule'].values()))
+
+        # statsV2 trae los mismos contadores como cadenas (sin límite de 32 bits)
+        stats = {**item.get('stats', {}), **item.get('statsV2', {})}
+        return {
+            'likes': _primero(stats, 'diggCount'),
+            'comments': _primero(stats, 'commentCount'),
+            'saves': _primero(stats, 'collectCount'),
+            'shares': _primero(stats, 'shareCount'),
+        }
+    except (KeyError, TypeError, ValueError, StopIteration):
+        return None
+
+
+def metricas_perfil(nombre: str, datos: dict):
+    """Seguidores y 'Me gusta' de un perfil a partir del estado embebido, o None"""
+    try:
+        if nombre == '__UNIVERSAL_DATA_FOR_REHYDRATION__':
+            info = datos['__DEFAULT_SCOPE__']['webapp.user-detail']['userInfo']
+            stats = {**info.get('stats', {}), **info.get('statsV2', {})}
+        else:
+            stats = next(iter(datos['UserModule']['stats'].values()))
+
+        return {
+            'followers': _primero(stats, 'followerCount'),
+            'likes': _primero(stats, 'heartCount', 'heart'),
+        }
+    except (KeyError, TypeError, ValueError, StopIteration):
+        return None
+
+
+def _descargar(url: str):
+    try:
+        respuesta = obtener_sesion().get(url, timeout=config.TIKTOK_HTTP_TIMEOUT)
+    except requests.RequestException as e:
+        logger.debug("Fallo HTTP en %s: %s", url, e)
+        return None
+
+    if respuesta.status_code != 200:
+        logger.debug("HTTP %s en %s", respuesta.status_code, url)
+        return None
+    return respuesta.text
+
+
+def _extraer(url: str, interpretar):
+    html = _descargar(url)
+    if html is None:
+        return None
+
+    nombre, datos = datos_embebidos(html)
+    if datos is None:
+        logger.debug("Sin JSON embebido en %s", url)
+        return None
+
+    metricas = interpretar(nombre, datos)
+    if metricas is None:
+        logger.debug("JSON embebido (%s) sin contadores en %s", nombre, url)
+    return metricas
+
+
+def extraer_publicacion_http(url: str):
+    """
+    Contadores de un vídeo de TikTok sin navegador.
+
+    Returns:
+        dict | None: likes, comments, saves y shares; None si hay que usar Selenium.
+    """
+    return _extraer(url, metricas_publicacion)
+
+
+def extraer_perfil_http(url: str):
+    """
+    Seguidores y 'Me gusta' de un perfil de TikTok sin navegador.
+
+    Returns:
+        dict | None: followers y likes; None si hay que usar Selenium.
+    """
+    return _extraer(url, metricas_perfil)
@@ -0,0 +1,219 @@
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode, urljoin
+import asyncio
+import logging
+import threading
+
+import requests
+
+from app import config
+from app.services.browser_pool import USER_AGENT
+from app.services.detectors import Plataforma, plataforma_de_host
+
+logger = logging.getLogger(__name__)
+
+# Host canónico de cada plataforma: m., mbasic., web., instagr.am... apuntan al mismo contenido
+HOSTS = {
+    Plataforma.FACEBOOK: 'www.facebook.com',
+    Plataforma.INSTAGRAM: 'www.instagram.com',
+    Plataforma.TIKTOK: 'www.tiktok.com',
+}
+
+# Enlaces cortos: solo redirigen, el contenido real está en otra URL
+HOSTS_CORTOS = {'fb.watch', 'vm.tiktok.com', 'vt.tiktok.com'}
+
+# Parámetros de Facebook que identifican el contenido; el resto (fbclid, __cft__,
+# mibextid, utm_*...) es seguimiento. Instagram y TikTok no necesitan ninguno.
+PARAMETROS_FACEBOOK = {'id', 'story_fbid', 'fbid', 'v', 'set'}
+
+# Primer segmento de rutas que no son perfiles
+RESERVADOS_FACEBOOK = {
+    'groups', 'events', 'pages', 'marketplace', 'gaming', 'help', 'login',
+    'login.php', 'hashtag', 'search', 'stories', 'home.php', 'settings',
+}
+RESERVADOS_INSTAGRAM = {
+    'explore', 'accounts', 'stories', 'direct', 'about', 'developer',
+    'legal', 'directory', 'web', 'challenge',
+}
+
+
+class UrlInvalidaError(ValueError):
+    """La URL no se puede scrapear: no es http(s), no es de una plataforma soportada o no es del tipo pedido"""
+
+
+class Destino(NamedTuple):
+    url: str
+    plataforma: Plataforma
+    # 'profile', 'publicacion' o None si la ruta no permite saberlo
+    tipo: Optional[str]
+    corta: bool = False
+
+    @property
+    def clave(self) -> str:
+        """Clave canónica para la caché y la deduplicación"""
+        return self.url
+
+    def admite(self, tipo: str) -> bool:
+        return self.tipo is None or self.tipo == tipo
+
+
+def _tipo_facebook(segmentos: list, query: dict):
+    if not segmentos:
+        return None
+    primero = segmentos[0].lower()
+    if primero in ('permalink.php', 'story.php', 'photo.php', 'photo', 'watch', 'reel', 'video.php'):
+        return 'publicacion'
+    if primero == 'share' and len(segmentos) > 1 and segmentos[1] in ('p', 'v', 'r'):
+        return 'publicacion'
+    if any(s in ('posts', 'videos', 'photos', 'reel', 'permalink') for s in segmentos[1:]):
+        return 'publicacion'
+    if primero == 'profile.php':
+        return 'profile' if 'id' in query else None
+    if primero == 'people' or (len(segmentos) == 1 and primero not in RESERVADOS_FACEBOOK):
+        return 'profile'
+    return None
+
+
+def _tipo_instagram(segmentos: list):
+    if not segmentos:
+        return None
+    # /p/<código> o /<usuario>/p/<código>
+    if len(segmentos) >= 2 and segmentos[-2] in ('p', 'reel', 'reels', 'tv'):
+        return 'publicacion'
+    if len(segmentos) == 1 and segmentos[0].lower() not in RESERVADOS_INSTAGRAM:
+        return 'profile'
+    return None
+
+
+def _tipo_tiktok(segmentos: list):
+    if not segmentos or not segmentos[0].startswith('@'):
+        return None
+    if len(segmentos) == 1:
+        return 'profile'
+    if len(segmentos) >= 3 and segmentos[1] in ('video', 'photo'):
+        return 'publicacion'
+    return None
+
+
+def normalizar_url(url: str) -> Destino:
+    """
+    Valida una URL y la lleva a su forma canónica sin hacer ninguna petición:
+    host canónico, sin fragmento, sin barra final y sin parámetros de
+    seguimiento. También clasifica la URL como perfil o publicación.
+
+    Raises:
+        UrlInvalidaError: Si no es http(s) o no es de una plataforma soportada.
+    """
+    url = (url or '').strip()
+    if not url.lower().startswith(('http://', 'https://')):
+        raise UrlInvalidaError("URL debe comenzar con http:// o https://")
+
+    try:
+        partes = urlsplit(url)
+        host = (partes.hostname or '').rstrip('.')
+    except ValueError:
+        raise UrlInvalidaError("URL mal formada")
+
+    plataforma = plataforma_de_host(host)
+    if plataforma == Plataforma.UNKNOWN:
+        raise UrlInvalidaError("Plataforma no soportada")
+
+    segmentos = [s for s in partes.path.split('/') if s]
+    query = dict(parse_qsl(partes.query, keep_blank_values=True))
+
+    corta = host in HOSTS_CORTOS or (plataforma == Plataforma.TIKTOK and segmentos[:1] == ['t'])
+    if corta:
+        # Se conserva tal cual: el código del enlace es la única identidad que tiene
+        canonica = urlunsplit(('https', host, '/' + '/'.join(segmentos), '', ''))
+        tipo = 'publicacion' if host == 'fb.watch' else None
+        return Destino(canonica, plataforma, tipo, corta=True)
+
+    if plataforma == Plataforma.FACEBOOK:
+        tipo = _tipo_facebook(segmentos, query)
+        query = sorted((k, v) for k, v in query.items() if k in PARAMETROS_FACEBOOK)
+    elif plataforma == Plataforma.INSTAGRAM:
+        tipo = _tipo_instagram(segmentos)
+        query = []
+        if tipo == 'profile':
+            segmentos = [segmentos[0].lower()]
+    else:
+        tipo = _tipo_tiktok(segmentos)
+        query = []
+        if tipo is not None:
+            segmentos[0] = segmentos[0].lower()
+
+    path = '/' + '/'.join(segmentos)
+    canonica = urlunsplit(('https', HOSTS[plataforma], path, urlencode(query), ''))
+    return Destino(canonica, plataforma, tipo)
+
+
+_resueltas = OrderedDict()
+_resueltas_lock = threading.Lock()
+MAX_RESUELTAS = 1024
+MAX_SALTOS = 5
+
+
+def resolver_enlace_corto(destino: Destino) -> Destino:
+    """
+    Sigue las redirecciones de un enlace corto con HEAD (sin descargar la
+    página) y normaliza la URL final. Si no se puede resolver devuelve el
+    mismo destino: el navegador seguirá la redirección por su cuenta.
+    """
+    if not destino.corta:
+        return destino
+
+    with _resueltas_lock:
+        if destino.url in _resueltas:
+            _resueltas.move_to_end(destino.url)
+            return _resueltas[destino.url]
+
+    actual = destino.url
+    try:
+        for _ in range(MAX_SALTOS):
+            respuesta = requests.head(
+                actual,
+                allow_redirects=False,
+                timeout=config.URL_RESOLVE_TIMEOUT,
+                headers={'User-Agent': USER_AGENT},
+            )
+            ubicacion = respuesta.headers.get('Location')
+            if not respuesta.is_redirect or not ubicacion:
+                break
+            actual = urljoin(actual, ubicacion)
+            resuelto = normalizar_url(actual)
+            if not resuelto.corta:
+                break
+        else:
+            resuelto = destino
+    except (requests.RequestException, UrlInvalidaError) as e:
+        logger.debug("No se pudo resolver %s: %s", destino.url, e)
+        return destino
+
+    if actual == destino.url or resuelto.corta or resuelto.plataforma != destino.plataforma:
+        return destino
+
+    with _resueltas_lock:
+        _resueltas[destino.url] = resuelto
+        while len(_resueltas) > MAX_RESUELTAS:
+            _resueltas.popitem(last=False)
+    return resuelto
+
+
+async def preparar_url(url: str, tipo: str) -> Destino:
+    """
+    Todo lo que se comprueba antes de pedir un navegador: URL válida, enlace
+    corto resuelto y tipo compatible con el endpoint.
+
+    Raises:
+        UrlInvalidaError: Con un mensaje apto para devolver al cliente.
+    """
+    destino = normalizar_url(url)
+    if destino.corta and config.URL_RESOLVE_SHORT:
+        destino = await asyncio.to_thread(resolver_enlace_corto, destino)
+
+    if not destino.admite(tipo):
+        if tipo == 'profile':
+            raise UrlInvalidaError("La URL es de una publicación, no de un perfil")
+        raise UrlInvalidaError("La URL es de un perfil, no de una publicación")
+    return destino
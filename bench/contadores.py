@@ -0,0 +1,142 @@
+"""
+Corpus y micro-benchmark del parser de contadores (app/services/contadores.py).
+
+    python -m bench.contadores
+    python -m bench.contadores --iteraciones 200000
+
+Comprueba cada caso de CORPUS y BUSQUEDAS (sale con código 1 si alguno no
+da lo esperado) y mide ns por llamada del parser frente a la forma en que
+los scrapers leían los contadores antes: re.search con el patrón en línea.
+"""
+import argparse
+import re
+import sys
+import time
+
+from app.services.contadores import patron, buscar, a_entero
+
+# (texto, valor esperado); None = no es un contador
+CORPUS = [
+    # Enteros y separadores de miles
+    ('0', 0),
+    ('850', 850),
+    ('1.234', 1234),
+    ('1,234', 1234),
+    ('12.345.678', 12345678),
+    ('1,234,567', 1234567),
+    ('1 234', 1234),
+    ('1 234 567', 1234567),
+    ('  219 ', 219),
+    # Los dos separadores: el último es el decimal
+    ('1.234,5', 1234),
+    ('1,234.5', 1234),
+    # Sufijos en inglés (TikTok)
+    ('16.6K', 16600),
+    ('1.3k', 1300),
+    ('2.5M', 2500000),
+    ('3M', 3000000),
+    ('1.1B', 1100000000),
+    # Con sufijo, un solo separador es decimal aunque lleve tres cifras detrás
+    ('1,234K', 1234),
+    # Sufijos en español (Facebook, Instagram)
+    ('12 mil', 12000),
+    ('1,2 mil', 1200),
+    ('58,4 mil', 58400),
+    ('1.234 mil', 1234),
+    ('3,4 mill.', 3400000),
+    ('2 M', 2000000),
+    ('2,5 millones', 2500000),
+    ('1 millón', 1000000),
+    ('5 mil M', 5000000000),
+    ('12 mil millones', 12000000000),
+    # No son contadores
+    ('', None),
+    ('abc', None),
+    ('Me gusta', None),
+    ('1.2.3K', None),
+    ('1,1.1.12', None),
+    ('12 minutos', None),
+]
+
+_ME_GUSTA = patron(despues=r'\s*Me gusta')
+_ARIA = patron(antes=r'Me gusta:\s*')
+_COMENTARIOS = patron(despues=r'\s*comentarios')
+_COMPARTIDO = patron(despues=r'\s*(?:\w*\s*){0,3}(?:compartido|compartieron|compartir|veces compartido)')
+
+# (patrón, texto, valor esperado)
+BUSQUEDAS = [
+    (_ME_GUSTA, '1.234 Me gusta', 1234),
+    (_ME_GUSTA, 'A 1,2 mil personas... 3,4 mil Me gusta', 3400),
+    (_ME_GUSTA, 'Te gusta esto', None),
+    (_ARIA, 'Me gusta: 134 personas', 134),
+    (_ARIA, 'Me gusta: 2,5 mil personas', 2500),
+    (_COMENTARIOS, 'Ver los 56 comentarios', 56),
+    (_COMENTARIOS, 'Ver los 1,1 mil comentarios', 1100),
+    (_COMENTARIOS, '12 Comentarios', 12),
+    (_COMPARTIDO, '12 veces compartido', 12),
+    (_COMPARTIDO, '3 mil veces compartido', 3000),
+]
+
+# Lo que hacía cada scraper antes, como referencia del micro-benchmark
+def _antes_tiktok(valor: str) -> int:
+    valor = valor.upper().replace(",", "").strip()
+    if valor.endswith("K"):
+        return int(float(valor[:-1]) * 1000)
+    if valor.endswith("M"):
+        return int(float(valor[:-1]) * 1_000_000)
+    return int(float(valor))
+
+
+def _antes_me_gusta(texto: str):
+    match = re.search(r'(\d+[\d,\.]*)\s*Me gusta', texto)
+    return int(match.group(1).replace(',', '').replace('.', '')) if match else None
+
+
+def comprobar() -> list:
+    fallos = []
+    for texto, esperado in CORPUS:
+        obtenido = a_entero(texto)
+        if obtenido != esperado:
+            fallos.append(f"a_entero({texto!r}) = {obtenido!r}, se esperaba {esperado!r}")
+    for compilado, texto, esperado in BUSQUEDAS:
+        obtenido = buscar(compilado, texto)
+        if obtenido != esperado:
+            fallos.append(f"buscar({compilado.pattern[-30:]!r}, {texto!r}) = {obtenido!r}, se esperaba {esperado!r}")
+    return fallos
+
+
+def medir(funcion, entradas: list, iteraciones: int) -> float:
+    """ns por llamada, repartiendo `iteraciones` entre las entradas"""
+    vueltas = max(1, iteraciones // len(entradas))
+    inicio = time.perf_counter_ns()
+    for _ in range(vueltas):
+        for entrada in entradas:
+            funcion(entrada)
+    return (time.perf_counter_ns() - inicio) / (vueltas * len(entradas))
+
+
+def main(argumentos=None) -> int:
+    parser = argparse.ArgumentParser(description="Corpus y micro-benchmark del parser de contadores")
+    parser.add_argument('--iteraciones', type=int, default=100_000)
+    args = parser.parse_args(argumentos)
+
+    fallos = comprobar()
+    for fallo in fallos:
+        print(f"FALLO {fallo}")
+    print(f"{len(CORPUS) + len(BUSQUEDAS) - len(fallos)}/{len(CORPUS) + len(BUSQUEDAS)} casos correctos")
+
+    tiktok = ['219', '16.6K', '1.3K', '2.5M', '850']
+    textos = [t for c, t, _ in BUSQUEDAS if c is _ME_GUSTA]
+    for nombre, funcion, entradas in [
+        ('a_entero (TikTok)', a_entero, tiktok),
+        ('_convert_tiktok_number', _antes_tiktok, tiktok),
+        ('buscar Me gusta', lambda t: buscar(_ME_GUSTA, t), textos),
+        ('re.search en línea', _antes_me_gusta, textos),
+    ]:
+        print(f"{nombre:24} {medir(funcion, entradas, args.iteraciones):8.0f} ns/llamada")
+
+    return 1 if fallos else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+Comprueba la expulsión de perfiles de salida (app/services/egreso.py) contra
+los proxies locales de bench/proxy.py.
+
+    python -m bench.egreso
+
+Un navegador se queda con su perfil toda su vida, así que un perfil quemado
+sigue recibiendo URLs hasta que su salud lo expulsa. Aquí un "navegador"
+lanzado con el perfil bloqueado scrapea una y otra vez por su proxy (que
+devuelve un muro de login) y se comprueba que:
+
+- se expulsa justo al llegar a EGRESS_MIN_SAMPLES resultados malos;
+- mientras está expulsado, elegir() no lo devuelve y el pool reciclaría el navegador;
+- pasado EGRESS_EVICTION_SECONDS vuelve con la puntuación limpia y se elige de nuevo;
+- el último perfil activo nunca se expulsa.
+
+Sale con código 1 si algo no se cumple.
+"""
+import sys
+import time
+import types
+
+import requests
+
+from app import config
+from app.services.egreso import PerfilEgreso, configurar_egreso, perfil_vigente
+from app.services.extraccion import candidatos_html
+from app.services.ritmo import es_malo, registrar_egreso
+from app.services.scrapers import SCRAPERS_PROFILE
+from app.services.detectors import Plataforma
+from bench.proxy import iniciar_proxy
+from bench.servidor import iniciar_servidor
+
+EXPULSION = 0.5
+
+
+def _scrapear(driver, url: str) -> dict:
+    """Como un scraper del pool: descarga por el proxy del perfil del driver y puntúa el resultado"""
+    scraper = SCRAPERS_PROFILE[Plataforma.TIKTOK]
+    try:
+        respuesta = requests.get(url, timeout=10, proxies=driver._egreso.proxies())
+        respuesta.raise_for_status()
+        candidatos = candidatos_html(respuesta.text, scraper.CONSULTAS)
+        result = {'url': url, **scraper.__new__(scraper).interpretar(candidatos), 'status': 'success'}
+    except requests.RequestException as e:
+        result = {'status': 'error', 'error_message': str(e)}
+    registrar_egreso(driver, result)
+    return result
+
+
+def comprobar() -> list:
+    fallos = []
+
+    def esperar(condicion: bool, mensaje: str):
+        if not condicion:
+            fallos.append(mensaje)
+
+    config.EGRESS_EVICTION_SECONDS = EXPULSION
+    servidor = iniciar_servidor()
+    url = f"http://127.0.0.1:{servidor.server_address[1]}/tiktok/profile"
+    sano_proxy, bloqueado_proxy = iniciar_proxy(), iniciar_proxy(bloquear=True)
+    try:
+        sano = PerfilEgreso('sano', proxy=f"http://127.0.0.1:{sano_proxy.server_address[1]}")
+        bloqueado = PerfilEgreso('bloqueado', proxy=f"http://127.0.0.1:{bloqueado_proxy.server_address[1]}")
+        egresos = configurar_egreso([sano, bloqueado])
+
+        # El perfil sano funciona por su proxy
+        driver_sano = types.SimpleNamespace(_egreso=sano)
+        esperar(not es_malo(_scrapear(driver_sano, url)), "el perfil sano no obtiene métricas")
+
+        # Navegador lanzado con el perfil bloqueado: sigue con él hasta que se expulsa
+        driver = types.SimpleNamespace(_egreso=bloqueado)
+        egresos.tomar(bloqueado)
+        usos = 0
+        while bloqueado.activo() and usos < 50:
+            esperar(es_malo(_scrapear(driver, url)), "el proxy bloqueado devolvió métricas")
+            usos += 1
+        esperar(not bloqueado.activo(), f"no se expulsó tras {usos} resultados bloqueados")
+        esperar(usos == config.EGRESS_MIN_SAMPLES,
+                f"expulsado tras {usos} resultados, se esperaban {config.EGRESS_MIN_SAMPLES}")
+        esperar(bloqueado.expulsiones == 1, f"{bloqueado.expulsiones} expulsiones, se esperaba 1")
+        esperar(bloqueado_proxy.peticiones == usos,
+                f"el proxy bloqueado atendió {bloqueado_proxy.peticiones} peticiones, se esperaban {usos}")
+        esperar(not perfil_vigente(driver), "el pool no reciclaría el navegador del perfil expulsado")
+        egresos.soltar(bloqueado)
+
+        # Expulsado: nadie lo elige aunque tenga menos navegadores
+        egresos.tomar(sano)
+        esperar(all(egresos.elegir() is sano for _ in range(5)), "se eligió el perfil expulsado")
+        # Los resultados de navegadores lanzados antes de la expulsión no cuentan
+        resultados = bloqueado.resultados
+        _scrapear(driver, url)
+        esperar(bloqueado.resultados == resultados, "se puntuó un resultado del perfil expulsado")
+
+        # Vuelve con la puntuación limpia y se elige de nuevo (tiene menos navegadores)
+        time.sleep(EXPULSION + 0.1)
+        esperar(bloqueado.activo(), "el perfil no volvió tras EGRESS_EVICTION_SECONDS")
+        esperar(bloqueado.puntuacion == 1.0, f"volvió con puntuación {bloqueado.puntuacion}")
+        esperar(egresos.elegir() is bloqueado, "el perfil readmitido no se eligió")
+        egresos.soltar(sano)
+
+        # El último perfil activo no se expulsa: sin alternativa solo dejaría de scrapear
+        solo = configurar_egreso([PerfilEgreso('unico', proxy=bloqueado.proxy)])
+        unico = types.SimpleNamespace(_egreso=solo.perfiles[0])
+        for _ in range(3 * config.EGRESS_MIN_SAMPLES):
+            _scrapear(unico, url)
+        esperar(solo.perfiles[0].activo(), "se expulsó el último perfil activo")
+    finally:
+        for proceso in (servidor, sano_proxy, bloqueado_proxy):
+            proceso.shutdown()
+    return fallos
+
+
+def main() -> int:
+    fallos = comprobar()
+    for fallo in fallos:
+        print(f"FALLO {fallo}")
+    print("expulsión y readmisión correctas" if not fallos else f"{len(fallos)} fallos")
+    return 1 if fallos else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
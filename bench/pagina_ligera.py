@@ -0,0 +1,79 @@
+"""
+Comprueba los patrones de bloqueo del modo página ligera (app/services/pagina_ligera.py).
+
+    python -m bench.pagina_ligera
+
+Network.setBlockedURLs también bloquea el documento principal: ninguna URL
+de PAGINAS puede coincidir con los patrones que se le envían al navegador, y
+cada recurso de RECURSOS tiene que coincidir con alguno. Sale con código 1
+si algún caso falla.
+"""
+import sys
+
+from app.services.detectors import Plataforma
+from app.services.pagina_ligera import coincide, patrones_bloqueados
+from app.services.urls import normalizar_url
+
+# Páginas que se scrapean (se normalizan antes, como hace la API)
+PAGINAS = [
+    'https://www.facebook.com/travelchannel',
+    'https://www.facebook.com/trevornoah/posts/123',
+    'https://www.facebook.com/tr.oficial',
+    'https://www.facebook.com/watch/?v=1234567890',
+    'https://www.facebook.com/photo/?fbid=987654321',
+    'https://www.instagram.com/the.iconic/',
+    'https://www.instagram.com/fonts.woff/',
+    'https://www.instagram.com/p/C1a2b3c4d5e/',
+    'https://www.instagram.com/reel/C1a2b3c4d5e/',
+    'https://www.tiktok.com/@funny.gifs',
+    'https://www.tiktok.com/@clip.mp4',
+    'https://www.tiktok.com/@funny.gif/video/7312345678901234567',
+    'https://www.tiktok.com/@video/video/7312345678901234567',
+]
+
+# Recursos que el modo página ligera debe seguir bloqueando
+RECURSOS = [
+    (Plataforma.FACEBOOK, 'https://scontent.xx.fbcdn.net/v/t39.30808-6/foto.jpg?stp=dst-jpg'),
+    (Plataforma.FACEBOOK, 'https://static.xx.fbcdn.net/rsrc.php/yb/r/icono.png'),
+    (Plataforma.FACEBOOK, 'https://www.facebook.com/tr?id=1&ev=PageView'),
+    (Plataforma.FACEBOOK, 'https://www.facebook.com/tr/?id=1&ev=PageView'),
+    (Plataforma.FACEBOOK, 'https://connect.facebook.net/en_US/fbevents.js'),
+    (Plataforma.INSTAGRAM, 'https://scontent.cdninstagram.com/v/t51.2885-15/foto.webp?efg=1'),
+    (Plataforma.INSTAGRAM, 'https://static.cdninstagram.com/rsrc.php/fuente.woff2'),
+    (Plataforma.INSTAGRAM, 'https://www.googletagmanager.com/gtag/js?id=G-1'),
+    (Plataforma.TIKTOK, 'https://v16-webapp.tiktok.com/video/tos/useast2a/clip/?a=1988'),
+    (Plataforma.TIKTOK, 'https://p16-sign.tiktokcdn-us.com/avatar.jpeg?x-expires=1'),
+    (Plataforma.TIKTOK, 'https://mon.tiktokv.com/monitor_browser/collect/batch/'),
+    (Plataforma.TIKTOK, 'https://analytics.tiktok.com/i18n/pixel/events.js'),
+]
+
+
+def comprobar() -> list:
+    fallos = []
+    for pagina in PAGINAS:
+        destino = normalizar_url(pagina)
+        enviados = patrones_bloqueados(destino.plataforma, destino.url)
+        for patron in enviados:
+            if coincide(patron, destino.url):
+                fallos.append(f"{destino.url} quedaría bloqueada por {patron!r}")
+        # Sin el filtro por URL, solo puede sobrar algún patrón de extensión
+        # (p. ej. '*.gif' con '@funny.gif'), nunca uno de rastreador
+        for patron in patrones_bloqueados(destino.plataforma):
+            if coincide(patron, destino.url) and patron.startswith('*://'):
+                fallos.append(f"{destino.url} coincide con el rastreador {patron!r}")
+    for plataforma, recurso in RECURSOS:
+        if not any(coincide(p, recurso) for p in patrones_bloqueados(plataforma)):
+            fallos.append(f"{recurso} no se bloquea")
+    return fallos
+
+
+def main() -> int:
+    fallos = comprobar()
+    for fallo in fallos:
+        print(f"FALLO {fallo}")
+    print(f"{len(PAGINAS)} páginas y {len(RECURSOS)} recursos comprobados, {len(fallos)} fallos")
+    return 1 if fallos else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
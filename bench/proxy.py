@@ -0,0 +1,106 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+import http.client
+import select
+import socket
+import threading
+
+# Lo que devuelve un proxy "quemado": un muro de login sin ningún contador
+PAGINA_BLOQUEO = (
+    b"<html><head><title>Log in</title></head><body>"
+    b"<form id='login_form'><input name='email'><input name='pass' type='password'></form>"
+    b"</body></html>"
+)
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    """
+    Proxy de reenvío mínimo: GET con URL absoluta (HTTP) y CONNECT (HTTPS).
+    Con `bloquear` responde a todo con PAGINA_BLOQUEO, como un proxy cuya IP
+    ya tiene marcada la plataforma.
+    """
+
+    bloquear = False
+
+    def do_GET(self):
+        self.server.peticiones += 1
+        if self.bloquear:
+            self._responder(200, PAGINA_BLOQUEO, 'text/html; charset=utf-8')
+            return
+
+        partes = urlsplit(self.path)
+        if not partes.hostname:
+            self.send_error(400, "Se esperaba una URL absoluta")
+            return
+
+        ruta = partes.path or '/'
+        if partes.query:
+            ruta += '?' + partes.query
+        conexion = http.client.HTTPConnection(partes.hostname, partes.port or 80, timeout=30)
+        try:
+            cabeceras = {k: v for k, v in self.headers.items() if k.lower() not in ('proxy-connection', 'connection')}
+            conexion.request('GET', ruta, headers=cabeceras)
+            respuesta = conexion.getresponse()
+            cuerpo = respuesta.read()
+        except OSError as e:
+            self.send_error(502, str(e))
+            return
+        finally:
+            conexion.close()
+
+        self._responder(respuesta.status, cuerpo, respuesta.getheader('Content-Type', 'text/html'))
+
+    def do_CONNECT(self):
+        self.server.peticiones += 1
+        if self.bloquear:
+            self.send_error(403, "Bloqueado")
+            return
+
+        host, _, puerto = self.path.rpartition(':')
+        try:
+            destino = socket.create_connection((host, int(puerto)), timeout=30)
+        except (OSError, ValueError) as e:
+            self.send_error(502, str(e))
+            return
+
+        self.send_response(200, 'Connection Established')
+        self.end_headers()
+        conexiones = [self.connection, destino]
+        try:
+            while True:
+                legibles, _, _ = select.select(conexiones, [], [], 30)
+                if not legibles:
+                    return
+                for origen in legibles:
+                    datos = origen.recv(65536)
+                    if not datos:
+                        return
+                    (destino if origen is self.connection else self.connection).sendall(datos)
+        finally:
+            destino.close()
+
+    def _responder(self, estado: int, cuerpo: bytes, tipo: str):
+        self.send_response(estado)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def iniciar_proxy(puerto: int = 0, bloquear: bool = False) -> ThreadingHTTPServer:
+    """
+    Arranca un proxy local en un hilo aparte.
+
+    Returns:
+        ThreadingHTTPServer: `server_address[1]` es el puerto, `peticiones` las
+        peticiones atendidas; parar con shutdown().
+    """
+    manejador = type('Manejador', (_Manejador,), {'bloquear': bloquear})
+    servidor = ThreadingHTTPServer(('127.0.0.1', puerto), manejador)
+    servidor.daemon_threads = True
+    servidor.peticiones = 0
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
@@ -0,0 +1,340 @@
+"""
+Benchmark offline de los scrapers contra páginas guardadas (bench/fixtures).
+
+    python -m bench.run --concurrencia 1,2,4 --pool 1,2 --peticiones 20
+    python -m bench.run --modo html --comparar data/bench_anterior.json
+    python -m bench.run --pool 1 --pestanas 1,4 --concurrencia 4
+    python -m bench.run --modo html --proxies 2 --proxies-bloqueados 1
+
+Modos:
+    navegador  las seis clases de scraper completas (Chrome/Edge + pool)
+    html       descarga por HTTP y analiza con el motor 'html' (sin navegador)
+
+Con --proxies / --proxies-bloqueados el tráfico sale por proxies locales
+(bench/proxy.py), los bloqueados devuelven un muro de login, y el informe
+incluye la salud de cada perfil de salida.
+
+El informe JSON se guarda en --salida; con --comparar se sale con código 1
+si p95 o el throughput empeoran más que --tolerancia respecto a otro informe.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import os
+import platform as plataforma_sistema
+import sys
+import threading
+import time
+
+import requests
+
+from app import config
+from app.services import browser_pool
+from app.services.detectors import Plataforma
+from app.services.egreso import PerfilEgreso, configurar_egreso, obtener_egreso
+from app.services.extraccion import candidatos_html
+from app.services.ritmo import es_malo
+from app.services.scrapers import SCRAPERS_PROFILE, SCRAPERS_PUBLICACION, extraer
+from bench.proxy import iniciar_proxy
+from bench.servidor import iniciar_servidor
+
+ESCENARIOS = [
+    (Plataforma.FACEBOOK, 'publicacion', 'facebook/post'),
+    (Plataforma.INSTAGRAM, 'publicacion', 'instagram/post'),
+    (Plataforma.TIKTOK, 'publicacion', 'tiktok/post'),
+    (Plataforma.FACEBOOK, 'profile', 'facebook/profile'),
+    (Plataforma.INSTAGRAM, 'profile', 'instagram/profile'),
+    (Plataforma.TIKTOK, 'profile', 'tiktok/profile'),
+]
+
+TIPOS = {
+    'profile': SCRAPERS_PROFILE,
+    'publicacion': SCRAPERS_PUBLICACION,
+}
+
+# Métricas que deben salir distintas de cero en cada fixture
+METRICAS = {
+    'publicacion': ('likes', 'comments'),
+    'profile': ('followers',),
+}
+
+
+def _rss(pid: int) -> int:
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def rss_arbol(pid: int) -> int:
+    """RSS en bytes de `pid` y todos sus descendientes (navegadores y drivers incluidos)"""
+    hijos = {}
+    for entrada in os.listdir('/proc'):
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entrada}/stat') as f:
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        hijos.setdefault(ppid, []).append(int(entrada))
+
+    total = 0
+    pendientes = [pid]
+    while pendientes:
+        actual = pendientes.pop()
+        total += _rss(actual)
+        pendientes.extend(hijos.get(actual, []))
+    return total
+
+
+class MuestreoMemoria:
+    """Guarda el pico de RSS del árbol de procesos mientras dura el bloque `with`"""
+
+    def __init__(self, intervalo: float = 0.1):
+        self.intervalo = intervalo
+        self.pico = 0
+        self._detener = threading.Event()
+
+    def _muestrear(self):
+        while not self._detener.is_set():
+            self.pico = max(self.pico, rss_arbol(os.getpid()))
+            self._detener.wait(self.intervalo)
+
+    def __enter__(self):
+        if os.path.isdir('/proc'):
+            self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+            self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._detener.set()
+        if os.path.isdir('/proc'):
+            self._hilo.join()
+        else:
+            import resource
+            self.pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados))) - 1))
+    return ordenados[indice]
+
+
+def _extraer_html(plataforma, tipo, url, perfil):
+    scraper = TIPOS[tipo][plataforma](usar_pool=False)
+    try:
+        respuesta = requests.get(
+            url,
+            timeout=30,
+            proxies=perfil.proxies(),
+            headers={'User-Agent': perfil.user_agent or browser_pool.USER_AGENT},
+        )
+        respuesta.raise_for_status()
+        candidatos = candidatos_html(respuesta.text, scraper.CONSULTAS)
+        result = {'url': url, **scraper.interpretar(candidatos), 'status': 'success'}
+    except Exception as e:
+        result = {'status': 'error', 'error_message': str(e)}
+    obtener_egreso().registrar(perfil, es_malo(result))
+    return result
+
+
+def _trabajador(modo, plataforma, tipo, url, cantidad, latencias, resultados):
+    service = TIPOS[tipo][plataforma]() if modo == 'navegador' else None
+    # En modo html cada trabajador hace de navegador: sigue con su perfil de
+    # salida hasta que lo expulsan, y entonces "relanza" con otro
+    egresos = obtener_egreso()
+    perfil = None
+    try:
+        for _ in range(cantidad):
+            inicio = time.perf_counter()
+            try:
+                if modo == 'navegador':
+                    result = extraer(service, plataforma, url)
+                else:
+                    if perfil is None or not perfil.activo():
+                        if perfil is not None:
+                            egresos.soltar(perfil)
+                        perfil = egresos.elegir()
+                        egresos.tomar(perfil)
+                    result = _extraer_html(plataforma, tipo, url, perfil)
+            except Exception as e:
+                result = {'status': 'error', 'error_message': str(e)}
+            latencias.append(time.perf_counter() - inicio)
+            resultados.append(result)
+    finally:
+        if service is not None:
+            service.close()
+        if perfil is not None:
+            egresos.soltar(perfil)
+
+
+def _reiniciar_pools(tamano: int, pestanas: int = 1):
+    """Cierra los pools y cambia su tamaño: se vuelven a crear en el siguiente préstamo"""
+    browser_pool.cerrar_pools()
+    browser_pool._pools.clear()
+    config.POOL_SIZE_CHROME = tamano
+    config.POOL_SIZE_EDGE = tamano
+    config.BROWSER_TABS = pestanas
+
+
+def medir_escenario(modo, plataforma, tipo, url, concurrencia, peticiones) -> dict:
+    latencias = []
+    resultados = []
+    repartos = [peticiones // concurrencia + (1 if i < peticiones % concurrencia else 0)
+                for i in range(concurrencia)]
+
+    with MuestreoMemoria() as memoria:
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrencia) as hilos:
+            tareas = [
+                hilos.submit(_trabajador, modo, plataforma, tipo, url, n, latencias, resultados)
+                for n in repartos if n
+            ]
+            for tarea in tareas:
+                tarea.result()
+        duracion = time.perf_counter() - inicio
+
+    errores = sum(1 for r in resultados if r.get('status') != 'success')
+    vacios = sum(
+        1 for r in resultados
+        if r.get('status') == 'success' and any(r.get(m) in (0, '0', None) for m in METRICAS[tipo])
+    )
+    return {
+        'platform': plataforma.value,
+        'tipo': tipo,
+        'requests': len(resultados),
+        'errors': errores,
+        'zero_results': vacios,
+        'duration_s': round(duracion, 3),
+        'throughput_rps': round(len(resultados) / duracion, 3) if duracion else 0.0,
+        'p50_ms': round(percentil(latencias, 50) * 1000, 1),
+        'p95_ms': round(percentil(latencias, 95) * 1000, 1),
+        'max_ms': round(max(latencias, default=0) * 1000, 1),
+        'peak_rss_mb': round(memoria.pico / 2**20, 1),
+    }
+
+
+def comparar(actual: dict, anterior: dict, tolerancia: float) -> list:
+    """Regresiones de p95 y throughput respecto a `anterior`, por escenario"""
+    def clave(r):
+        return (r['platform'], r['tipo'], r['concurrency'], r['pool_size'], r.get('tabs', 1))
+
+    previos = {clave(r): r for r in anterior.get('results', [])}
+    regresiones = []
+    for r in actual['results']:
+        previo = previos.get(clave(r))
+        if previo is None:
+            continue
+        if previo['p95_ms'] and r['p95_ms'] > previo['p95_ms'] * (1 + tolerancia):
+            regresiones.append(f"{clave(r)} p95 {previo['p95_ms']} -> {r['p95_ms']} ms")
+        if r['throughput_rps'] < previo['throughput_rps'] * (1 - tolerancia):
+            regresiones.append(f"{clave(r)} throughput {previo['throughput_rps']} -> {r['throughput_rps']} rps")
+        if r['errors'] + r['zero_results'] > previo['errors'] + previo['zero_results']:
+            regresiones.append(f"{clave(r)} resultados vacíos o con error {previo['errors'] + previo['zero_results']} -> {r['errors'] + r['zero_results']}")
+    return regresiones
+
+
+def _enteros(texto: str) -> list:
+    return [int(x) for x in texto.split(',') if x.strip()]
+
+
+def main(argumentos=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark offline de los scrapers")
+    parser.add_argument('--modo', choices=('navegador', 'html'), default='navegador')
+    parser.add_argument('--concurrencia', type=_enteros, default=[1, 2, 4])
+    parser.add_argument('--pool', type=_enteros, default=[2])
+    parser.add_argument('--pestanas', type=_enteros, default=[1], help="Pestañas por navegador")
+    parser.add_argument('--peticiones', type=int, default=20, help="Peticiones por escenario")
+    parser.add_argument('--retardo', type=float, default=0.0, help="Latencia simulada del servidor (s)")
+    parser.add_argument('--plataformas', default='facebook,instagram,tiktok')
+    parser.add_argument('--salida', default='data/bench_report.json')
+    parser.add_argument('--comparar', help="Informe anterior contra el que buscar regresiones")
+    parser.add_argument('--tolerancia', type=float, default=0.2)
+    parser.add_argument('--proxies', type=int, default=0, help="Proxies locales sanos")
+    parser.add_argument('--proxies-bloqueados', type=int, default=0, help="Proxies locales que devuelven un muro de login")
+    args = parser.parse_args(argumentos)
+
+    plataformas = set(args.plataformas.split(','))
+    servidor = iniciar_servidor(retardo=args.retardo)
+    base = f"http://127.0.0.1:{servidor.server_address[1]}"
+
+    proxies = [iniciar_proxy() for _ in range(args.proxies)]
+    proxies += [iniciar_proxy(bloquear=True) for _ in range(args.proxies_bloqueados)]
+    if proxies:
+        configurar_egreso([
+            PerfilEgreso(
+                f"{'bloqueado' if p.RequestHandlerClass.bloquear else 'sano'}-{i}",
+                proxy=f"http://127.0.0.1:{p.server_address[1]}",
+            )
+            for i, p in enumerate(proxies)
+        ])
+
+    informe = {
+        'generated_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'mode': args.modo,
+        'engine': config.EXTRACTION_ENGINE,
+        'server_delay_s': args.retardo,
+        'python': plataforma_sistema.python_version(),
+        'results': [],
+    }
+
+    try:
+        # En modo html no hay navegadores, así que el tamaño del pool no influye
+        tamanos = args.pool if args.modo == 'navegador' else [0]
+        pestanas = args.pestanas if args.modo == 'navegador' else [1]
+        for tamano, n_pestanas in [(t, p) for t in tamanos for p in pestanas]:
+            if args.modo == 'navegador':
+                _reiniciar_pools(tamano, n_pestanas)
+            for concurrencia in args.concurrencia:
+                for plataforma, tipo, ruta in ESCENARIOS:
+                    if plataforma.value not in plataformas:
+                        continue
+                    fila = medir_escenario(
+                        args.modo, plataforma, tipo, f"{base}/{ruta}", concurrencia, args.peticiones
+                    )
+                    fila.update({'concurrency': concurrencia, 'pool_size': tamano, 'tabs': n_pestanas})
+                    informe['results'].append(fila)
+                    print(
+                        f"{plataforma.value:9} {tipo:11} c={concurrencia} pool={tamano} tabs={n_pestanas} "
+                        f"{fila['throughput_rps']:8.2f} rps  p50={fila['p50_ms']:8.1f} ms  "
+                        f"p95={fila['p95_ms']:8.1f} ms  rss={fila['peak_rss_mb']:7.1f} MB  "
+                        f"err={fila['errors']} vacios={fila['zero_results']}"
+                    )
+    finally:
+        servidor.shutdown()
+        for proxy in proxies:
+            proxy.shutdown()
+        browser_pool.cerrar_pools()
+
+    if proxies:
+        informe['egress'] = obtener_egreso().stats()
+        for nombre, datos in informe['egress'].items():
+            print(
+                f"salida {nombre:12} puntuación={datos['score']:.2f} resultados={datos['results']} "
+                f"bloqueos={datos['blocked']} expulsiones={datos['evictions']}"
+            )
+
+    directorio = os.path.dirname(args.salida)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        json.dump(informe, f, indent=2, ensure_ascii=False)
+    print(f"Informe guardado en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            regresiones = comparar(informe, json.load(f), args.tolerancia)
+        for regresion in regresiones:
+            print(f"REGRESIÓN {regresion}")
+        if regresiones:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import os
+import threading
+import time
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    """Sirve /<plataforma>/<pagina> desde bench/fixtures/<plataforma>/<pagina>.html"""
+
+    # Simula la latencia de red del sitio real (segundos)
+    retardo = 0.0
+
+    def do_GET(self):
+        ruta = self.path.split('?', 1)[0].strip('/')
+        archivo = os.path.join(FIXTURES, *ruta.split('/')) + '.html'
+
+        if '..' in ruta or not os.path.isfile(archivo):
+            self.send_error(404)
+            return
+
+        with open(archivo, 'rb') as f:
+            cuerpo = f.read()
+
+        if self.retardo:
+            time.sleep(self.retardo)
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        pass
+
+
+def iniciar_servidor(puerto: int = 0, retardo: float = 0.0) -> ThreadingHTTPServer:
+    """
+    Arranca el servidor de páginas guardadas en un hilo aparte.
+
+    Returns:
+        ThreadingHTTPServer: `server_address[1]` es el puerto asignado; parar con shutdown().
+    """
+    manejador = type('Manejador', (_Manejador,), {'retardo': retardo})
+    servidor = ThreadingHTTPServer(('127.0.0.1', puerto), manejador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
@@ -0,0 +1,56 @@
+"""
+Comprueba el parser del JSON embebido de TikTok (app/services/tiktok_http.py)
+contra las páginas guardadas en bench/fixtures/tiktok.
+
+    python -m bench.tiktok
+
+Sale con código 1 si alguna página no da lo esperado en ESPERADO.
+"""
+import os
+import sys
+
+from app.services.tiktok_http import datos_embebidos, metricas_perfil, metricas_publicacion
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures', 'tiktok')
+
+_POST = {'likes': 1534, 'comments': 219, 'saves': 148, 'shares': 87}
+_PERFIL = {'followers': 1250000, 'likes': 48700000}
+
+# Página -> (métricas de publicación, métricas de perfil)
+ESPERADO = {
+    'post.html': (_POST, None),
+    'post_universal.html': (_POST, None),
+    'post_sigi.html': (_POST, None),
+    'post_no_disponible.html': (None, None),
+    'profile.html': (None, _PERFIL),
+    'profile_universal.html': (None, _PERFIL),
+    'profile_sigi.html': (None, _PERFIL),
+    'sin_estado.html': (None, None),
+}
+
+
+def interpretar(ruta: str):
+    with open(ruta, encoding='utf-8') as f:
+        nombre, datos = datos_embebidos(f.read())
+    if datos is None:
+        return nombre, (None, None)
+    return nombre, (metricas_publicacion(nombre, datos), metricas_perfil(nombre, datos))
+
+
+def main() -> int:
+    fallos = 0
+    for pagina, esperado in ESPERADO.items():
+        nombre, obtenido = interpretar(os.path.join(FIXTURES, pagina))
+        correcto = obtenido == esperado
+        fallos += not correcto
+        print(f"{'OK' if correcto else 'FALLO':5} {pagina} [{nombre or 'sin JSON embebido'}]")
+        if not correcto:
+            print(f"      obtenido: {obtenido}")
+            print(f"      esperado: {esperado}")
+
+    print(f"{len(ESPERADO) - fallos}/{len(ESPERADO)} páginas correctas")
+    return 1 if fallos else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())